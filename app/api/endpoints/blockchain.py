@@ -1,177 +1,298 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from typing import Any, Dict, List
-from app.services.blockchain_service import blockchain_service
-from app.db.database import db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional
+from app.services.blockchain_service import blockchain_service, MAX_RECORDS_PAGE_SIZE
+from app.services.reward_service import REWARD_AMOUNTS
+from app.services.transaction_watcher import TERMINAL_STATUSES
+from app.core.container import services
+from app.db.database import async_db
+from app.utils.hashing import content_digest, current_digest
+from app.utils.merkle import hash_leaf
+from app.utils.security import (
+    STREAM_TOKEN_TTL, create_stream_token, current_principal, get_current_user_id, get_stream_user_id,
+    get_token_claims
+)
+from app.utils.serialization import dumps
+from datetime import datetime
 from bson import ObjectId
+import asyncio
+import json
 import logging
+import os
+import time
 
-blockchain_bp = Blueprint('blockchain', __name__)
+# Every route here uses the blockchain service; build it off the event loop on cold start
+router = APIRouter(dependencies=[Depends(services.require("blockchain_service"))])
 logger = logging.getLogger(__name__)
 
-@blockchain_bp.route('/status', methods=['GET'])
+TX_STREAM_MAX_HASHES = int(os.environ.get("TX_STREAM_MAX_HASHES", 50))
+TX_STREAM_KEEPALIVE = float(os.environ.get("TX_STREAM_KEEPALIVE", 15))
+TX_STREAM_MAX_SECONDS = float(os.environ.get("TX_STREAM_MAX_SECONDS", 900))
+
+@router.get('/status')
 async def get_blockchain_status():
     """
     Get the current status of the blockchain connection
+    Served from the last background telemetry sample, never from the node
     """
-    status = await blockchain_service.get_connection_status()
-    return jsonify(status)
+    status = blockchain_service.get_connection_status()
+    return status
 
-@blockchain_bp.route('/verify-medicine/<medicine_id>', methods=['GET'])
-async def verify_medicine_on_blockchain(medicine_id):
+@router.get('/verify-medicine/{medicine_id}')
+async def verify_medicine_on_blockchain(medicine_id: str):
     """
     Verify a medicine's authenticity on the blockchain
     """
     # Get medicine data
-    medicine = await db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
+    medicine = await async_db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
     
     if not medicine:
-        return jsonify({"detail": "Medicine not found"}), 404
+        raise HTTPException(status_code=404, detail="Medicine not found")
     
     # Convert ObjectId to string for JSON serialization
     medicine["_id"] = str(medicine["_id"])
     
-    # Verify on blockchain
-    verification_result = await blockchain_service.verify_medicine(
-        medicine_id=medicine_id,
-        medicine_data=medicine
-    )
+    # Verify on blockchain (web3 calls block, so they run in the threadpool)
+    verification_result = await run_in_threadpool(blockchain_service.verify_medicine, medicine)
     
-    return jsonify({
+    return {
         "medicine_id": medicine_id,
         "medicine_name": medicine.get("name", "Unknown"),
         "verification_result": verification_result
-    })
+    }
 
-@blockchain_bp.route('/verify-diagnosis/<diagnosis_id>', methods=['GET'])
-@jwt_required()
-async def verify_diagnosis_on_blockchain(diagnosis_id):
+@router.get('/verify-diagnosis/{diagnosis_id}')
+async def verify_diagnosis_on_blockchain(diagnosis_id: str, user_id: str = Depends(get_current_user_id)):
     """
     Verify a diagnosis record on the blockchain
     """
-    user_id = get_jwt_identity()
-    
     # Get diagnosis data
-    diagnosis = await db.diagnoses_collection().find_one({
+    diagnosis = await async_db.diagnoses_collection().find_one({
         "_id": ObjectId(diagnosis_id),
         "user_id": user_id
     })
     
     if not diagnosis:
-        return jsonify({"detail": "Diagnosis not found"}), 404
+        raise HTTPException(status_code=404, detail="Diagnosis not found")
     
     # Convert ObjectId to string for JSON serialization
     diagnosis["_id"] = str(diagnosis["_id"])
     
     # Verify on blockchain
-    verification_result = await blockchain_service.verify_diagnosis(
+    verification_result = await run_in_threadpool(
+        blockchain_service.verify_diagnosis,
         diagnosis_id=diagnosis_id,
         diagnosis_data=diagnosis
     )
     
-    return jsonify({
+    return {
         "diagnosis_id": diagnosis_id,
         "verification_result": verification_result
-    })
+    }
 
-@blockchain_bp.route('/records', methods=['GET'])
-@jwt_required()
-async def get_blockchain_records():
+@router.post('/verify-records')
+async def verify_records(data: Dict[str, Any] = Body(...), user_id: str = Depends(get_current_user_id)):
     """
-    Get all blockchain records associated with the current user
+    Verify many diagnoses and medicines at once
+    Body: {"records": [{"record_type": "diagnosis" | "medicine", "record_id": "..."}]}
+    Records are checked against their current content in one or two chain round trips
     """
-    user_id = get_jwt_identity()
-    
-    # Get all verified diagnoses for this user
-    cursor = db.diagnoses_collection().find({
-        "user_id": user_id,
-        "blockchain_verified": True
-    })
-    
-    diagnoses = await cursor.to_list(length=100)
-    
-    # Convert ObjectId to string for JSON serialization
-    for diagnosis in diagnoses:
-        diagnosis["_id"] = str(diagnosis["_id"])
-    
-    # Get blockchain verification details for each diagnosis
-    blockchain_records = []
-    for diagnosis in diagnoses:
-        verification = await blockchain_service.get_verification_details(
-            record_id=str(diagnosis["_id"]),
-            record_type="diagnosis"
-        )
-        
-        blockchain_records.append({
-            "record_id": str(diagnosis["_id"]),
-            "record_type": "diagnosis",
-            "condition": diagnosis.get("condition_name", "Unknown"),
-            "created_at": diagnosis.get("created_at"),
-            "blockchain_hash": diagnosis.get("blockchain_hash"),
-            "verification_details": verification
-        })
-    
-    return jsonify(blockchain_records)
+    requested = data.get("records") or []
+    if len(requested) > MAX_RECORDS_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RECORDS_PAGE_SIZE} records per request")
+    ids: Dict[str, List[ObjectId]] = {"diagnosis": [], "medicine": []}
+    for record in requested:
+        if record.get("record_type") not in ids or not ObjectId.is_valid(record.get("record_id", "")):
+            raise HTTPException(status_code=400, detail="Each record needs a record_type and a valid record_id")
+        ids[record["record_type"]].append(ObjectId(record["record_id"]))
+    
+    # Diagnoses are private to their owner, medicines are public
+    documents = {}
+    for record_type, collection, query in (
+        ("diagnosis", async_db.diagnoses_collection(), {"user_id": user_id}),
+        ("medicine", async_db.medicines_collection(), {})
+    ):
+        if ids[record_type]:
+            async for document in collection.find({"_id": {"$in": ids[record_type]}, **query}):
+                documents[(record_type, str(document["_id"]))] = document
+    
+    records = [
+        {"record_type": record_type, "record_id": record_id, "data_hash": current_digest(record_type, document)}
+        for (record_type, record_id), document in documents.items()
+    ]
+    verifications = await run_in_threadpool(blockchain_service.verify_records_bulk, records)
+    
+    return {
+        "results": [
+            {
+                "record_type": record["record_type"],
+                "record_id": record["record_id"],
+                **verifications.get(record["record_id"], {"verified": False, "anchor_status": "not_found"})
+            }
+            for record in requested
+        ]
+    }
 
-@blockchain_bp.route('/transactions/<tx_hash>', methods=['GET'])
-async def get_transaction_details(tx_hash):
+@router.get('/records')
+async def get_blockchain_records(limit: int = Query(50), cursor: Optional[str] = Query(None),
+                                 user_id: str = Depends(get_current_user_id)):
     """
-    Get details of a blockchain transaction by its hash
+    Get the current user's blockchain records and verified diagnoses, newest first
+    Rows are streamed from a single aggregation; pass next_cursor as cursor for the next page
     """
-    transaction = await blockchain_service.get_transaction_details(tx_hash)
-    
-    if not transaction:
-        return jsonify({"detail": "Transaction not found"}), 404
-    
-    return jsonify(transaction)
+    if cursor and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    limit = max(1, min(limit, MAX_RECORDS_PAGE_SIZE))
+    rows = blockchain_service.list_records(user_id, limit=limit, cursor=cursor)
+    
+    async def generate():
+        yield b'{"items":['
+        last_id = None
+        has_more = False
+        index = 0
+        try:
+            async for row in rows:
+                if index == limit:
+                    has_more = True
+                    break
+                row["verification_details"] = blockchain_service.record_verification(row)
+                last_id = row["_id"]
+                yield (b"," if index else b"") + dumps(row)
+                index += 1
+        finally:
+            await rows.close()
+        yield b'],"next_cursor":' + dumps(last_id if has_more else None) + b'}'
+    
+    return StreamingResponse(generate(), media_type="application/json")
 
-@blockchain_bp.route('/records', methods=['GET'])
-@jwt_required()
-async def get_blockchain_records():
+async def _owned_transaction_hashes(user_id: str, hashes: List[str]) -> set:
+    """The given hashes that belong to the user's records or to anchors of their diagnoses"""
+    owned = set(await async_db.blockchain_records_collection().distinct(
+        "transaction_hash", {"user_id": user_id, "transaction_hash": {"$in": hashes}}
+    ))
+    missing = [h for h in hashes if h not in owned]
+    if not missing:
+        return owned
+    
+    leaves = await async_db.anchor_leaves_collection().find(
+        {"record_type": "diagnosis", "transaction_hash": {"$in": missing}},
+        {"record_id": 1, "transaction_hash": 1}
+    ).to_list(None)
+    diagnosis_ids = [ObjectId(leaf["record_id"]) for leaf in leaves if ObjectId.is_valid(leaf["record_id"])]
+    if diagnosis_ids:
+        own_diagnoses = {
+            str(diagnosis_id) for diagnosis_id in await async_db.diagnoses_collection().distinct(
+                "_id", {"_id": {"$in": diagnosis_ids}, "user_id": user_id}
+            )
+        }
+        owned.update(leaf["transaction_hash"] for leaf in leaves if leaf["record_id"] in own_diagnoses)
+    return owned
+
+@router.post('/transactions/stream-token')
+async def issue_stream_token(claims: Dict[str, Any] = Depends(get_token_claims)):
     """
-    Get blockchain records associated with the current user
+    Issue a short-lived token for /transactions/stream
+    Browsers' EventSource cannot send an Authorization header, so it goes in ?token=
     """
-    user_id = get_jwt_identity()
-    
-    query = {"user_id": user_id}
+    return {"token": create_stream_token(claims["sub"], claims.get("tv", 0)), "expires_in": STREAM_TOKEN_TTL}
+
+@router.get('/transactions/stream')
+async def stream_transaction_status(tx: str = Query(""), user_id: str = Depends(get_stream_user_id)):
+    """
+    Stream status transitions of the given transactions as Server-Sent Events
+    Pass hashes as ?tx=0x..,0x.. and a stream token as ?token=; the stream ends once
+    all are confirmed or failed. Only transactions of the caller's own records can be watched
+    """
+    hashes = list(dict.fromkeys(
+        h.strip().lower() for h in tx.split(",") if h.strip()
+    ))
+    if not hashes:
+        raise HTTPException(status_code=400, detail="No transaction hashes given")
+    if len(hashes) > TX_STREAM_MAX_HASHES:
+        raise HTTPException(status_code=400, detail=f"At most {TX_STREAM_MAX_HASHES} transactions per stream")
+    
+    # Unknown hashes would otherwise make the watcher poll the node on the caller's behalf
+    owned = await _owned_transaction_hashes(user_id, hashes)
+    unknown = [h for h in hashes if h not in owned]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Transaction not found: {unknown[0]}")
+    
+    watcher = blockchain_service.transaction_watcher
+    subscriber = watcher.subscribe(hashes)
+    # Send the current state straight away, later events only on change
+    try:
+        initial = await run_in_threadpool(watcher.snapshot, hashes)
+    except Exception:
+        watcher.unsubscribe(subscriber, hashes)
+        raise
+    
+    async def events():
+        open_hashes = set(hashes)
+        deadline = time.monotonic() + TX_STREAM_MAX_SECONDS
+        try:
+            for state in initial.values():
+                yield f"event: status\ndata: {json.dumps(state)}\n\n"
+                if state["status"] in TERMINAL_STATUSES:
+                    open_hashes.discard(state["transaction_hash"])
+            while open_hashes and time.monotonic() < deadline:
+                try:
+                    state = await subscriber.get(timeout=TX_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: status\ndata: {json.dumps(state)}\n\n"
+                if state["status"] in TERMINAL_STATUSES:
+                    open_hashes.discard(state["transaction_hash"])
+            yield "event: end\ndata: {}\n\n"
+        finally:
+            watcher.unsubscribe(subscriber, hashes)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@router.get('/transactions/{tx_hash}')
+async def get_transaction_details(tx_hash: str):
+    """
+    Get details of a blockchain transaction by its hash
+    """
+    transaction = await run_in_threadpool(blockchain_service.get_transaction_status, tx_hash)
     
-    cursor = db.blockchain_records_collection().find(query).sort("created_at", -1)
-    records = await cursor.to_list(length=100)
+    if transaction.get("status") == "not_found":
+        raise HTTPException(status_code=404, detail="Transaction not found")
     
-    # Convert ObjectId to string for JSON serialization
-    for record in records:
-        record["_id"] = str(record["_id"])
-    
-    return jsonify(records)
+    return transaction
 
-@blockchain_bp.route('/verify-medicine', methods=['POST'])
-@jwt_required()
-async def verify_medicine_on_blockchain():
+@router.post('/verify-medicine')
+async def record_medicine_verification(data: Dict[str, Any] = Body(...),
+                                       user_id: str = Depends(get_current_user_id)):
     """
     Verify a medicine's information on the blockchain
     This creates a tamper-proof record of the medicine details
     """
-    user_id = get_jwt_identity()
-    medicine_id = request.json.get("medicine_id")
+    medicine_id = data.get("medicine_id")
     
     # Check if medicine exists
-    medicine = await db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
+    medicine = await async_db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
     
     if not medicine:
-        return jsonify({"detail": "Medicine not found"}), 404
+        raise HTTPException(status_code=404, detail="Medicine not found")
     
     # Convert ObjectId to string for JSON serialization and blockchain storage
     medicine["_id"] = str(medicine["_id"])
     
-    # Verify medicine on blockchain
-    result = await blockchain_service.verify_medicine(medicine)
+    # Queue the medicine hash for the next anchored Merkle batch
+    result = await run_in_threadpool(blockchain_service.record_medicine, medicine)
     
-    # Create a blockchain record
+    # Create a blockchain record; it gets a transaction hash once its leaf's batch is submitted
     record_data = {
         "user_id": user_id,
         "record_type": "medicine_verification",
         "data_hash": result.get("hash"),
-        "transaction_hash": result.get("transaction_hash"),
+        "anchor_leaf": result.get("merkle_leaf"),
         "smart_contract_address": blockchain_service.contract_address,
         "chain_id": blockchain_service.chain_id,
         "metadata": {
@@ -179,16 +300,22 @@ async def verify_medicine_on_blockchain():
             "medicine_name": medicine.get("name"),
             "verification_result": result
         },
-        "status": "confirmed" if result.get("verified") else "pending",
+        "status": "queued" if result.get("success") else "failed",
+        "error": result.get("error"),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
     
-    await db.blockchain_records_collection().insert_one(record_data)
+    inserted = await async_db.blockchain_records_collection().insert_one(record_data)
+    if result.get("success"):
+        await run_in_threadpool(
+            blockchain_service.track_anchored_record,
+            str(inserted.inserted_id), "medicine", medicine_id, result["hash"]
+        )
     
-    # Update medicine verification status if verified
-    if result.get("verified") and not medicine.get("verified_on_blockchain"):
-        await db.medicines_collection().update_one(
+    # Update medicine verification status once its hash is queued for anchoring
+    if result.get("success") and not medicine.get("verified_on_blockchain"):
+        await async_db.medicines_collection().update_one(
             {"_id": ObjectId(medicine_id)},
             {"$set": {
                 "verified_on_blockchain": True,
@@ -197,135 +324,125 @@ async def verify_medicine_on_blockchain():
             }}
         )
     
-    return jsonify({
+    return {
         "medicine_id": medicine_id,
         "verification_result": result,
         "message": "Medicine verification processed"
-    })
+    }
 
-@blockchain_bp.route('/store-medical-record', methods=['POST'])
-@jwt_required()
-async def store_medical_record_hash():
+@router.post('/store-medical-record')
+async def store_medical_record_hash(record_data: Dict[str, Any] = Body(...),
+                                    user_id: str = Depends(get_current_user_id)):
     """
     Store a hash of medical record data on the blockchain
     Only the hash is stored, preserving privacy
     """
-    user_id = get_jwt_identity()
-    record_data = request.json
     
-    # Generate a hash of the medical record data
-    record_str = str(record_data)
-    data_hash = hashlib.sha256(record_str.encode()).hexdigest()
+    # Generate a canonical hash of the medical record data
+    data_hash = content_digest(record_data)
+    record_id = ObjectId()
     
-    # Create blockchain record
+    # Create blockchain record before queueing, so the anchoring batch finds it
     blockchain_data = {
+        "_id": record_id,
         "user_id": user_id,
         "record_type": "medical_record",
         "data_hash": data_hash,
+        "anchor_leaf": hash_leaf("medical_record", str(record_id), data_hash).hex(),
         "chain_id": blockchain_service.chain_id,
         "metadata": {
             "record_type": record_data.get("record_type", "general"),
             "timestamp": datetime.utcnow().isoformat()
         },
-        "status": "pending",
+        "status": "queued",
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
+    await async_db.blockchain_records_collection().insert_one(blockchain_data)
+    
+    # Anchored in the next Merkle batch, whose transaction the record then tracks
+    result = await run_in_threadpool(blockchain_service.store_medical_record, str(record_id), data_hash)
+    if not result.get("success"):
+        await async_db.blockchain_records_collection().update_one(
+            {"_id": record_id},
+            {"$set": {"status": "failed", "error": result.get("error"), "updated_at": datetime.utcnow()}}
+        )
+        raise HTTPException(status_code=503, detail="Could not queue the medical record for anchoring")
     
-    # Insert record
-    result = await db.blockchain_records_collection().insert_one(blockchain_data)
-    record_id = str(result.inserted_id)
-    
-    # In a real application, this would initiate a blockchain transaction
-    # For now, we'll just simulate the process
-    
-    return jsonify({
-        "record_id": record_id,
+    record = await async_db.blockchain_records_collection().find_one(
+        {"_id": record_id}, {"status": 1, "transaction_hash": 1}
+    )
+    return {
+        "record_id": str(record_id),
         "data_hash": data_hash,
-        "status": "pending",
-        "message": "Medical record hash prepared for blockchain storage"
-    })
+        "merkle_leaf": result["merkle_leaf"],
+        "status": record["status"],
+        "transaction_hash": record.get("transaction_hash"),
+        "message": "Medical record hash queued for blockchain anchoring"
+    }
 
-@blockchain_bp.route('/token-info', methods=['GET'])
-@jwt_required()
-async def get_token_info():
+@router.get('/token-info')
+async def get_token_info(principal: Optional[Dict[str, Any]] = Depends(current_principal)):
     """
     Get information about the platform's utility token
     Including user balance if available
     """
-    user_id = get_jwt_identity()
-    
-    # Check if user has a wallet address
-    wallet_address = await db.users_collection().find_one({"_id": ObjectId(user_id)}, {"wallet_address": 1})
-    user_balance = 0.0
+    # The wallet address comes from the principal cache
+    # Balances and supply come from the local MedToken Transfer event index
+    token_state = await run_in_threadpool(
+        blockchain_service.get_token_state,
+        principal.get("wallet_address") if principal else None
+    )
     
-    if wallet_address and wallet_address.get("wallet_address"):
-        # In a real app, we'd query the token contract for balance
-        # For demo purposes, we'll generate a random balance
-        import random
-        user_balance = round(random.uniform(0, 100), 2)
+    # Rewards credited but not yet minted count towards the balance users see
+    rewards = (
+        await run_in_threadpool(blockchain_service.rewards.get_balance, principal["wallet_address"])
+        if principal and principal.get("wallet_address") else None
+    )
     
-    return jsonify({
+    return {
         "token_name": "MedToken",
         "token_symbol": "MED",
-        "token_address": "0x1234567890123456789012345678901234567890",  # Simulated address
-        "user_balance": user_balance,
-        "total_supply": 1000000.0
-    })
+        "token_address": blockchain_service.token_contract_address,
+        "user_balance": rewards["balance"] if rewards else token_state["user_balance"],
+        "minted_balance": token_state["user_balance"],
+        "unsettled_rewards": rewards["unsettled_rewards"] if rewards else 0.0,
+        "total_supply": token_state["total_supply"]
+    }
 
-@blockchain_bp.route('/mint-reward', methods=['POST'])
-@jwt_required()
-async def mint_reward_tokens():
+@router.post('/mint-reward')
+async def mint_reward_tokens(data: Dict[str, Any] = Body(...),
+                             user_id: str = Depends(get_current_user_id),
+                             principal: Optional[Dict[str, Any]] = Depends(current_principal)):
     """
     Mint reward tokens for user actions like completing a diagnosis
     or verifying medicine information
     """
-    user_id = get_jwt_identity()
-    action_type = request.json.get("action_type")
+    action_type = data.get("action_type")
     
-    wallet_address = await db.users_collection().find_one({"_id": ObjectId(user_id)}, {"wallet_address": 1})
-    
-    if not wallet_address or not wallet_address.get("wallet_address"):
-        return jsonify({"detail": "User does not have a registered wallet address"}), 400
-    
-    # Determine reward amount based on action type
-    reward_amounts = {
-        "diagnosis": 5.0,
-        "medicine_verification": 2.0,
-        "profile_completion": 1.0,
-        "referral": 10.0
-    }
+    if action_type not in REWARD_AMOUNTS:
+        raise HTTPException(
+            status_code=400, detail=f"action_type must be one of: {', '.join(REWARD_AMOUNTS)}"
+        )
     
-    amount = reward_amounts.get(action_type, 1.0)
+    if not principal or not principal.get("wallet_address"):
+        raise HTTPException(status_code=400, detail="User does not have a registered wallet address")
     
-    # In a real app, we'd call the token contract to mint tokens
-    # For demo purposes, we'll simulate the transaction
+    # Credit the off-chain reward ledger; pending rewards are minted in periodic
+    # per-wallet batches instead of one transaction per action
+    result = await run_in_threadpool(
+        blockchain_service.rewards.credit, user_id, principal["wallet_address"], action_type
+    )
     
-    transaction = {
-        "from_address": "0x0000000000000000000000000000000000000000",  # Zero address for minting
-        "to_address": wallet_address.get("wallet_address"),
-        "amount": amount,
-        "transaction_hash": f"0x{hashlib.sha256(f'{wallet_address.get("wallet_address")}{datetime.utcnow().isoformat()}'.encode()).hexdigest()}",
-        "status": "pending",
-        "timestamp": datetime.utcnow()
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "Failed to credit reward"))
+    
+    return {
+        "to_address": result["wallet_address"],
+        "action_type": action_type,
+        "amount": result["amount"],
+        "status": "credited",
+        "balance": result["balance"],
+        "minted_balance": result["minted_balance"],
+        "unsettled_rewards": result["unsettled_rewards"]
     }
-    
-    # Record transaction in database
-    await db.blockchain_records_collection().insert_one({
-        "user_id": user_id,
-        "record_type": "transaction",
-        "data_hash": transaction["transaction_hash"],
-        "transaction_hash": transaction["transaction_hash"],
-        "chain_id": blockchain_service.chain_id,
-        "metadata": {
-            "transaction_type": "mint",
-            "action_type": action_type,
-            "amount": amount,
-            "wallet_address": wallet_address.get("wallet_address")
-        },
-        "status": "pending",
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    })
-    
-    return jsonify(transaction)
@@ -1,26 +1,31 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from typing import Any, Dict, List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional
 from app.services.diagnosis_service import diagnosis_service
 from app.services.medicine_service import medicine_service
-from app.db.database import db
+from app.services.blockchain_service import blockchain_service
+from app.core.container import services
+from app.db.database import async_db
 from datetime import datetime
 from bson import ObjectId
+from app.utils.hashing import stamp_digest
+from app.utils.security import get_current_user_id
+from app.utils.serialization import BSONResponse
 import logging
-import hashlib
 
-diagnosis_bp = Blueprint('diagnosis', __name__)
+router = APIRouter()
+
+# Routes that touch the chain wait for the blockchain service off the event loop on cold start
+requires_blockchain = [Depends(services.require("blockchain_service"))]
 logger = logging.getLogger(__name__)
 
-@diagnosis_bp.route('/analyze', methods=['POST'])
-@jwt_required()
-async def analyze_symptoms():
+@router.post('/analyze', dependencies=requires_blockchain)
+async def analyze_symptoms(request_data: Dict[str, Any] = Body(...),
+                           user_id: str = Depends(get_current_user_id)):
     """
     Analyze symptoms using AI and suggest possible diagnoses and medicines
     This is a supplementary tool and not a replacement for professional medical advice
     """
-    user_id = get_jwt_identity()
-    request_data = request.json
     
     # Prepare request data including user information
     request_data["user_id"] = user_id
@@ -39,99 +44,101 @@ async def analyze_symptoms():
         "confidence_score": diagnosis_result.get("confidence", 0) / 100.0,  # Convert to 0-1 scale
         "status": "completed",
         "recommended_medicines": [],  # Will be populated after getting medicine IDs
-        "blockchain_verified": "blockchain_verification" in diagnosis_result,
-        "blockchain_hash": diagnosis_result.get("blockchain_verification", {}).get("hash"),
+        "blockchain_verified": False,
+        "blockchain_hash": None,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
+    diagnosis_data["_id"] = ObjectId()
+    diagnosis_id = str(diagnosis_data["_id"])
     
-    # Insert diagnosis record
-    result = await db.diagnoses_collection().insert_one(diagnosis_data)
-    diagnosis_id = str(result.inserted_id)
+    # Compute the content digest once, at write time
+    stamp_digest("diagnosis", diagnosis_data)
     
-    # Update the user's medical history to include this diagnosis
-    await db.users_collection().update_one(
-        {"_id": ObjectId(user_id)},
-        {"$push": {"medical_history": diagnosis_id}}
+    # Add blockchain verification if requested
+    if request_data.get("verify_on_blockchain", False):
+        blockchain_verification = await run_in_threadpool(
+            blockchain_service.store_diagnosis_hash, diagnosis_id, diagnosis_data
+        )
+        diagnosis_result["blockchain_verification"] = blockchain_verification
+        if blockchain_verification.get("success"):
+            diagnosis_data["blockchain_verified"] = True
+            diagnosis_data["blockchain_hash"] = blockchain_verification.get("hash")
+    
+    # Insert diagnosis record
+    await async_db.diagnoses_collection().insert_one(diagnosis_data)
+    diagnosis_result["diagnosis_id"] = diagnosis_id
+    
+    # Keep the per-user history rollup current
+    await diagnosis_service.record_diagnosis_rollup(
+        user_id,
+        condition=diagnosis_data["condition_name"],
+        created_at=diagnosis_data["created_at"],
+        verified=diagnosis_data["blockchain_verified"]
     )
     
-    return jsonify(diagnosis_result)
+    # Record this diagnosis in the user's bucketed medical history
+    await diagnosis_service.append_medical_history(user_id, diagnosis_id)
+    
+    return diagnosis_result
 
-@diagnosis_bp.route('/history', methods=['GET'])
-@jwt_required()
-async def get_diagnosis_history():
+@router.get('/history')
+async def get_diagnosis_history(limit: int = Query(20), cursor: Optional[str] = Query(None),
+                                user_id: str = Depends(get_current_user_id)):
     """
-    Get the user's diagnosis history
+    Get the user's diagnosis history as summary rows, newest first
+    Use the returned next_cursor as the cursor parameter to get the next page
     """
-    user_id = get_jwt_identity()
-    
-    cursor = db.diagnoses_collection().find(
-        {"user_id": user_id}
-    ).sort("created_at", -1)
+    if cursor and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    diagnoses = await cursor.to_list(length=100)
+    history = await diagnosis_service.get_diagnosis_history(user_id, limit=limit, cursor=cursor)
     
-    # Convert ObjectId to string for JSON serialization
-    for diagnosis in diagnoses:
-        diagnosis["_id"] = str(diagnosis["_id"])
+    return BSONResponse(history)
+
+@router.get('/history/summary')
+async def get_diagnosis_summary(user_id: str = Depends(get_current_user_id)):
+    """
+    Get the user's precomputed history rollup
+    (counts by condition, last visit, verification coverage)
+    """
+    summary = await diagnosis_service.get_diagnosis_summary(user_id)
     
-    return jsonify(diagnoses)
+    return BSONResponse(summary)
 
-@diagnosis_bp.route('/<diagnosis_id>', methods=['GET'])
-@jwt_required()
-async def get_diagnosis_by_id(diagnosis_id):
+@router.get('/{diagnosis_id}')
+async def get_diagnosis_by_id(diagnosis_id: str, user_id: str = Depends(get_current_user_id)):
     """
     Get a specific diagnosis by ID
     """
-    user_id = get_jwt_identity()
-    
-    diagnosis = await db.diagnoses_collection().find_one({
+    diagnosis = await async_db.diagnoses_collection().find_one({
         "_id": ObjectId(diagnosis_id),
         "user_id": user_id
     })
     
     if not diagnosis:
-        return jsonify({"detail": "Diagnosis not found"}), 404
-    
-    # Convert ObjectId to string for JSON serialization
-    diagnosis["_id"] = str(diagnosis["_id"])
+        raise HTTPException(status_code=404, detail="Diagnosis not found")
     
-    return jsonify(diagnosis)
+    # Raw document; ObjectIds and datetimes are encoded by the response
+    return BSONResponse(diagnosis)
 
-@diagnosis_bp.route('/<diagnosis_id>/verify', methods=['POST'])
-@jwt_required()
-async def verify_diagnosis_on_blockchain(diagnosis_id):
+@router.post('/{diagnosis_id}/verify', dependencies=requires_blockchain)
+async def verify_diagnosis_on_blockchain(diagnosis_id: str, user_id: str = Depends(get_current_user_id)):
     """
     Verify a diagnosis on the blockchain
     This creates a tamper-proof record of the diagnosis
     """
-    user_id = get_jwt_identity()
-    
     # Get the diagnosis
-    diagnosis = await db.diagnoses_collection().find_one({
+    diagnosis = await async_db.diagnoses_collection().find_one({
         "_id": ObjectId(diagnosis_id),
         "user_id": user_id
     })
     
     if not diagnosis:
-        return jsonify({"detail": "Diagnosis not found"}), 404
-    
-    # Call blockchain service to store diagnosis hash
-    from app.services.blockchain_service import blockchain_service
-    
-    # Prepare data for blockchain storage (exclude sensitive fields)
-    blockchain_data = {
-        "diagnosis_id": str(diagnosis["_id"]),
-        "condition": diagnosis.get("condition_name"),
-        "confidence_score": diagnosis.get("confidence_score"),
-        "timestamp": diagnosis.get("created_at").isoformat(),
-        "user_id_hash": hashlib.sha256(str(diagnosis["user_id"]).encode()).hexdigest()
-    }
+        raise HTTPException(status_code=404, detail="Diagnosis not found")
     
-    result = await blockchain_service.store_diagnosis_hash(
-        str(diagnosis["_id"]),
-        blockchain_data
-    )
+    # Only the canonical digest of the hashed fields leaves the database
+    result = await run_in_threadpool(blockchain_service.store_diagnosis_hash, str(diagnosis["_id"]), diagnosis)
     
     # Update diagnosis record with blockchain verification
     if result.get("stored") or result.get("ready_for_storage"):
@@ -141,38 +148,38 @@ async def verify_diagnosis_on_blockchain(diagnosis_id):
             "updated_at": datetime.utcnow()
         }
         
-        await db.diagnoses_collection().update_one(
+        await async_db.diagnoses_collection().update_one(
             {"_id": ObjectId(diagnosis_id)},
             {"$set": update_data}
         )
+        
+        if not diagnosis.get("blockchain_verified"):
+            await diagnosis_service.record_verification_rollup(user_id)
     
-    return jsonify({
+    return {
         "diagnosis_id": diagnosis_id,
         "blockchain_result": result,
         "message": "Diagnosis verification processed"
-    })
+    }
 
-@diagnosis_bp.route('/<diagnosis_id>/recommended-medicines', methods=['GET'])
-@jwt_required()
-async def get_recommended_medicines(diagnosis_id):
+@router.get('/{diagnosis_id}/recommended-medicines')
+async def get_recommended_medicines(diagnosis_id: str, location: Optional[str] = Query(None),
+                                    user_id: str = Depends(get_current_user_id)):
     """
     Get medicines recommended for a specific diagnosis
     """
-    user_id = get_jwt_identity()
-    location = request.args.get('location')
-    
     # Get the diagnosis
-    diagnosis = await db.diagnoses_collection().find_one({
+    diagnosis = await async_db.diagnoses_collection().find_one({
         "_id": ObjectId(diagnosis_id),
         "user_id": user_id
     })
     
     if not diagnosis:
-        return jsonify({"detail": "Diagnosis not found"}), 404
+        raise HTTPException(status_code=404, detail="Diagnosis not found")
     
     condition = diagnosis.get("condition_name")
     if not condition:
-        return jsonify({"detail": "Diagnosis has no condition name"}), 400
+        raise HTTPException(status_code=400, detail="Diagnosis has no condition name")
     
     # Get medicines for this condition
     medicines = await medicine_service.get_medicines_by_diagnosis(
@@ -182,4 +189,4 @@ async def get_recommended_medicines(diagnosis_id):
         skip=0
     )
     
-    return jsonify(medicines)
+    return BSONResponse(medicines)
@@ -1,27 +1,24 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from typing import Any, List, Dict, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
 from app.services.medicine_service import medicine_service
-from app.services.blockchain_service import blockchain_service
-from app.db.database import db
+from app.utils.http_cache import cached_json
+from app.utils.serialization import BSONResponse
 import logging
 
-medicines_bp = Blueprint('medicines', __name__)
+router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@medicines_bp.route('/search', methods=['GET'])
-async def search_medicines():
+@router.get('/search')
+async def search_medicines(request: Request,
+                           diagnosis: Optional[str] = Query(None),
+                           location: Optional[str] = Query(None),
+                           name: Optional[str] = Query(None),
+                           ingredients: Optional[str] = Query(None),
+                           limit: int = Query(10),
+                           skip: int = Query(0)):
     """
     Search for medicines based on various criteria
     """
-    # Extract query parameters
-    diagnosis = request.args.get('diagnosis')
-    location = request.args.get('location')
-    name = request.args.get('name')
-    ingredients = request.args.get('ingredients')
-    limit = request.args.get('limit', default=10, type=int)
-    skip = request.args.get('skip', default=0, type=int)
-    
     # Get medicines based on search criteria
     medicines = await medicine_service.search_medicines(
         diagnosis=diagnosis,
@@ -32,17 +29,18 @@ async def search_medicines():
         skip=skip
     )
     
-    return jsonify(medicines)
+    # Revalidated against the results' ids and updated_at, so an unchanged
+    # result set is answered with a 304 before anything is serialized
+    return cached_json(request, medicines, medicines, variant=f"search?{request.url.query}", collection=True)
 
-@medicines_bp.route('/by-diagnosis/<diagnosis>', methods=['GET'])
-async def get_medicines_by_diagnosis(diagnosis):
+@router.get('/by-diagnosis/{diagnosis}')
+async def get_medicines_by_diagnosis(diagnosis: str,
+                                     location: Optional[str] = Query(None),
+                                     limit: int = Query(10),
+                                     skip: int = Query(0)):
     """
     Get medicines recommended for a specific diagnosis
     """
-    location = request.args.get('location')
-    limit = request.args.get('limit', default=10, type=int)
-    skip = request.args.get('skip', default=0, type=int)
-    
     medicines = await medicine_service.get_medicines_by_diagnosis(
         diagnosis=diagnosis,
         location=location,
@@ -50,34 +48,34 @@ async def get_medicines_by_diagnosis(diagnosis):
         skip=skip
     )
     
-    return jsonify(medicines)
+    return BSONResponse(medicines)
 
-@medicines_bp.route('/<medicine_id>', methods=['GET'])
-async def get_medicine_by_id(medicine_id):
+@router.get('/{medicine_id}')
+async def get_medicine_by_id(medicine_id: str, request: Request):
     """
     Get detailed information about a specific medicine
     """
     medicine = await medicine_service.get_medicine_by_id(medicine_id)
     
     if not medicine:
-        return jsonify({"detail": "Medicine not found"}), 404
+        raise HTTPException(status_code=404, detail="Medicine not found")
     
-    return jsonify(medicine)
+    return cached_json(request, medicine, [medicine], variant="medicine")
 
-@medicines_bp.route('/<medicine_id>/popularity', methods=['GET'])
-async def get_medicine_popularity(medicine_id):
+@router.get('/{medicine_id}/popularity')
+async def get_medicine_popularity(medicine_id: str):
     """
     Get popularity metrics for a medicine
     """
     popularity = await medicine_service.get_medicine_popularity(medicine_id)
     
     if "error" in popularity:
-        return jsonify({"detail": popularity["error"]}), 404
+        raise HTTPException(status_code=404, detail=popularity["error"])
     
-    return jsonify(popularity)
+    return popularity
 
-@medicines_bp.route('/<medicine_id>/prices', methods=['GET'])
-async def get_medicine_prices(medicine_id):
+@router.get('/{medicine_id}/prices')
+async def get_medicine_prices(medicine_id: str, request: Request, location: Optional[str] = Query(None)):
     """
     Get pricing information for a medicine
     Optionally filter by location
@@ -85,10 +83,9 @@ async def get_medicine_prices(medicine_id):
     medicine = await medicine_service.get_medicine_by_id(medicine_id)
     
     if not medicine:
-        return jsonify({"detail": "Medicine not found"}), 404
+        raise HTTPException(status_code=404, detail="Medicine not found")
     
     # Filter prices by location if provided
-    location = request.args.get('location')
     if location and "prices" in medicine:
         prices = [price for price in medicine["prices"] if price.get("location") == location]
     elif "prices" in medicine:
@@ -96,4 +93,4 @@ async def get_medicine_prices(medicine_id):
     else:
         prices = []
     
-    return jsonify(prices)
+    return cached_json(request, prices, [medicine], variant=f"prices?location={location or ''}")
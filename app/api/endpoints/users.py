@@ -1,107 +1,169 @@
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from typing import Any, Dict
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from typing import Any, Dict, Optional
 from app.utils.security import (
-    verify_eth_signature,
-    create_authentication_message
+    verify_eth_signature_async,
+    create_access_token,
+    create_authentication_message,
+    current_principal,
+    get_current_user_id,
+    token_claims
 )
-from app.db.database import db
+from app.db.database import async_db
+from app.services.challenge_store import challenge_store
+from app.services.diagnosis_service import diagnosis_service
+from app.services.password_service import password_service, PasswordServiceBusy
+from app.services.principal_cache import principal_cache, PROFILE_EXCLUDED_FIELDS
+from app.schemas.user import UserCreate, UserUpdate
+from app.utils.serialization import BSONResponse
 from datetime import datetime, timedelta
 from app.core.config import settings
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import logging
 
-users_bp = Blueprint('users', __name__)
+router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Fields a client may set on registration and on profile updates
+REGISTRATION_FIELDS = set(UserCreate.model_fields) - {"password"}
+PROFILE_UPDATE_FIELDS = set(UserUpdate.model_fields)
+
 # Helper functions
 async def get_user_by_email(email: str):
-    return await db.users_collection().find_one({"email": email})
+    return await async_db.users_collection().find_one({"email": email})
 
 async def get_user_by_id(user_id: str):
-    return await db.users_collection().find_one({"_id": ObjectId(user_id)})
+    return await async_db.users_collection().find_one({"_id": ObjectId(user_id)})
 
 async def get_user_by_wallet(wallet_address: str):
-    return await db.users_collection().find_one({"wallet_address": wallet_address})
+    return await async_db.users_collection().find_one({"wallet_address": wallet_address})
 
 async def authenticate_user(email: str, password: str):
     user = await get_user_by_email(email)
     if not user:
         return False
-    if not check_password_hash(user.get("hashed_password", ""), password):
+    matches, upgraded_hash = await password_service.check(user.get("hashed_password", ""), password)
+    if not matches:
         return False
+    if upgraded_hash:
+        # Hash parameters changed since this password was stored; only replace
+        # the hash if nobody changed the password in the meantime
+        await async_db.users_collection().update_one(
+            {"_id": user["_id"], "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": upgraded_hash, "updated_at": datetime.utcnow()}}
+        )
     return user
 
+def server_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
 # Endpoints
-@users_bp.route('/register', methods=['POST'])
-async def register_user():
+@router.post('/register', status_code=201)
+async def register_user(user_data: Dict[str, Any] = Body(...)):
     """
     Register a new user
     """
-    user_data = request.json
+    if not user_data.get('email') or not user_data.get('password'):
+        raise HTTPException(status_code=400, detail="Email and password are required")
     
     # Check if user already exists
     user = await get_user_by_email(user_data.get('email'))
     if user:
-        return jsonify({"detail": "Email already registered"}), 400
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = generate_password_hash(user_data.get('password'))
-    user_data.pop('password', None)
-    user_data["hashed_password"] = hashed_password
-    user_data["created_at"] = datetime.utcnow()
-    user_data["updated_at"] = datetime.utcnow()
-    
-    result = await db.users_collection().insert_one(user_data)
+    try:
+        hashed_password = await password_service.hash(user_data.get('password'))
+    except PasswordServiceBusy:
+        raise server_busy()
     
-    # Get the created user
-    created_user = await get_user_by_id(str(result.inserted_id))
-    created_user["_id"] = str(created_user["_id"])
+    now = datetime.utcnow()
+    new_user = {k: v for k, v in user_data.items() if k in REGISTRATION_FIELDS}
+    new_user.update({
+        "_id": ObjectId(),
+        "hashed_password": hashed_password,
+        "created_at": now,
+        "updated_at": now
+    })
     
-    # Remove sensitive fields
-    created_user.pop('hashed_password', None)
+    # Insert and read back the projected post-image in one round trip; keyed on
+    # email so a concurrent registration of the same address cannot insert twice
+    created_user = await async_db.users_collection().find_one_and_update(
+        {"email": new_user.get("email")},
+        {"$setOnInsert": new_user},
+        projection=PROFILE_EXCLUDED_FIELDS,
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if created_user["_id"] != new_user["_id"]:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
-    return jsonify(created_user), 201
+    return BSONResponse(created_user, status_code=201)
 
-@users_bp.route('/login', methods=['POST'])
-async def login():
+@router.post('/login')
+async def login(data: Dict[str, Any] = Body(...)):
     """
     Login to get an access token for future requests
     """
-    data = request.json
-    user = await authenticate_user(data.get('email'), data.get('password'))
+    try:
+        user = await authenticate_user(data.get('email'), data.get('password'))
+    except PasswordServiceBusy:
+        raise server_busy()
     if not user:
-        return jsonify({"detail": "Incorrect email or password"}), 401
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
     
     # Create access token
     expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        identity=str(user["_id"]), 
-        expires_delta=expires_delta
+        identity=str(user["_id"]),
+        expires_delta=expires_delta,
+        additional_claims=token_claims(user)
     )
     
-    return jsonify({
+    return {
         "access_token": access_token,
         "token_type": "bearer"
-    })
+    }
 
-@users_bp.route('/web3-login', methods=['POST'])
-async def web3_login():
+@router.get('/web3-challenge')
+async def get_web3_challenge(wallet_address: Optional[str] = Query(None)):
+    """
+    Issue a one-time message for a wallet to sign and send to web3-login
+    """
+    if not wallet_address:
+        raise HTTPException(status_code=400, detail="wallet_address is required")
+    
+    message = await challenge_store.issue(
+        wallet_address,
+        lambda nonce: create_authentication_message(wallet_address, nonce)
+    )
+    
+    return {"message": message, "expires_in": int(challenge_store.ttl)}
+
+@router.post('/web3-login')
+async def web3_login(data: Dict[str, Any] = Body(...)):
     """
     Web3 wallet-based authentication
     """
-    data = request.json
+    # Unknown, altered, expired or reused challenges are rejected by a lookup,
+    # before any signature recovery
+    if not await challenge_store.is_valid(data.get('message'), data.get('wallet_address')):
+        raise HTTPException(status_code=401, detail="Invalid or expired challenge")
     
-    # Verify signature
-    is_valid = verify_eth_signature(
+    # Verify signature (recovery runs in the signature worker pool)
+    is_valid = await verify_eth_signature_async(
         message=data.get('message'),
         signature=data.get('signature'),
         wallet_address=data.get('wallet_address')
     )
     
     if not is_valid:
-        return jsonify({"detail": "Invalid signature"}), 401
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    
+    # Each challenge logs in once
+    if not await challenge_store.consume(data.get('message'), data.get('wallet_address')):
+        raise HTTPException(status_code=401, detail="Invalid or expired challenge")
     
     # Get user by wallet address
     user = await get_user_by_wallet(data.get('wallet_address'))
@@ -109,60 +171,124 @@ async def web3_login():
     if not user:
         # In a production app, you might want to create a new user here
         # or require registration first
-        return jsonify({"detail": "Wallet address not registered"}), 404
+        raise HTTPException(status_code=404, detail="Wallet address not registered")
     
     # Create access token
     expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         identity=str(user["_id"]),
-        expires_delta=expires_delta
+        expires_delta=expires_delta,
+        additional_claims=token_claims(user)
     )
     
-    return jsonify({
+    return {
         "access_token": access_token,
         "token_type": "bearer"
-    })
+    }
 
-@users_bp.route('/me', methods=['GET'])
-@jwt_required()
-async def get_me():
+@router.get('/me')
+async def get_me(user: Optional[Dict[str, Any]] = Depends(current_principal)):
     """
     Get current user information
     """
-    user_id = get_jwt_identity()
-    user = await get_user_by_id(user_id)
-    
+    # Projected profile from the principal cache, usually without a users read
     if not user:
-        return jsonify({"detail": "User not found"}), 404
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return BSONResponse(user)
+
+@router.get('/me/medical-history')
+async def get_my_medical_history(bucket: Optional[str] = Query(None),
+                                 user_id: str = Depends(get_current_user_id)):
+    """
+    Get the diagnosis ids in one bucket of the current user's medical history
+    Use the returned next_cursor as the bucket parameter to page to older entries
+    """
+    if bucket and not ObjectId.is_valid(bucket):
+        raise HTTPException(status_code=400, detail="Invalid bucket")
     
-    user["_id"] = str(user["_id"])
-    # Remove sensitive fields
-    user.pop('hashed_password', None)
+    history = await diagnosis_service.get_medical_history_bucket(user_id, bucket)
     
-    return jsonify(user)
+    return history
 
-@users_bp.route('/me', methods=['PUT'])
-@jwt_required()
-async def update_user():
+@router.put('/me')
+async def update_user(user_data: Dict[str, Any] = Body(...),
+                      user_id: str = Depends(get_current_user_id)):
     """
     Update current user information
     """
-    user_id = get_jwt_identity()
-    user_data = request.json
     
-    # Filter out None values
-    update_data = {k: v for k, v in user_data.items() if v is not None}
+    # Only profile fields from UserUpdate can be changed, and None means "leave as is"
+    update_data = {k: v for k, v in user_data.items() if k in PROFILE_UPDATE_FIELDS and v is not None}
     update_data["updated_at"] = datetime.utcnow()
     
-    # Update user
-    await db.users_collection().update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": update_data}
-    )
+    # Update and read back the projected post-image in one round trip
+    try:
+        updated_user = await async_db.users_collection().find_one_and_update(
+            {"_id": ObjectId(user_id)},
+            {"$set": update_data},
+            projection=PROFILE_EXCLUDED_FIELDS,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError as e:
+        # Email and wallet address each belong to one account
+        field = next(iter((e.details or {}).get("keyPattern", {})), "email")
+        detail = "Wallet address already registered" if field == "wallet_address" else "Email already registered"
+        raise HTTPException(status_code=400, detail=detail)
+    
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Get updated user
-    updated_user = await get_user_by_id(user_id)
     updated_user["_id"] = str(updated_user["_id"])
-    updated_user.pop('hashed_password', None)
+    token_version = updated_user.pop("token_version", 0)
+    
+    # Drop the stale profile and serve the fresh one straight away
+    principal_cache.invalidate(user_id)
+    principal_cache.put(updated_user, token_version)
+    
+    return BSONResponse(updated_user)
+
+@router.post('/me/password')
+async def change_password(data: Dict[str, Any] = Body(...),
+                          user_id: str = Depends(get_current_user_id)):
+    """
+    Change the current user's password
+    Every token issued before the change stops working; a fresh access token is returned
+    """
+    if not data.get('new_password'):
+        raise HTTPException(status_code=400, detail="new_password is required")
+    
+    user = await get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    return jsonify(updated_user)
+    try:
+        matches, _ = await password_service.check(user.get("hashed_password", ""), data.get('current_password') or "")
+        if not matches:
+            raise HTTPException(status_code=401, detail="Incorrect password")
+        hashed_password = await password_service.hash(data['new_password'])
+    except PasswordServiceBusy:
+        raise server_busy()
+    
+    # The new hash and the token version bump land in one write
+    token_version = await principal_cache.revoke(user_id, {"hashed_password": hashed_password})
+    if token_version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    access_token = create_access_token(
+        identity=user_id,
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        additional_claims=token_claims({"token_version": token_version})
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer"
+    }
+
+@router.post('/logout', status_code=204)
+async def logout(user_id: str = Depends(get_current_user_id)):
+    """
+    Revoke every token issued to the current user, on all devices
+    """
+    await principal_cache.revoke(user_id)
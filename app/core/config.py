@@ -1,11 +1,7 @@
 import os
 from pydantic import BaseModel
-from dotenv import load_dotenv
 from typing import Optional, Dict, Any, List
 
-# Load environment variables
-load_dotenv()
-
 class Settings(BaseModel):
     """Application settings"""
     # API Settings
@@ -35,9 +31,6 @@ class Settings(BaseModel):
         "http://localhost:3000",
         "http://localhost:8000",
     ]
-    
-    class Config:
-        case_sensitive = True
 
 # Create settings instance
 settings = Settings()
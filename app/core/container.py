@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ServiceProxy:
+    """
+    Stand-in for a shared service that builds it on first attribute access
+    Lets modules keep `from ... import db` style imports without paying for
+    client construction or network handshakes at import time
+    """
+
+    __slots__ = ("_container", "_name")
+
+    def __init__(self, container: "ServiceContainer", name: str):
+        object.__setattr__(self, "_container", container)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._container.get(self._name), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._container.get(self._name), attr, value)
+
+    def __repr__(self) -> str:
+        state = "initialized" if self._container.initialized(self._name) else "not initialized"
+        return f"<ServiceProxy {self._name} ({state})>"
+
+
+class ServiceContainer:
+    """
+    Registry of shared services, each built once on first use.
+
+    Every service has its own lock, so a slow start (e.g. the blockchain
+    service probing RPC endpoints) only holds up callers of that service.
+    Async code should await require(name) before touching a service whose
+    construction does network I/O, so the build runs off the event loop.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def lazy(self, name: str, factory: Callable[[], Any]) -> ServiceProxy:
+        """Register a service factory and return a proxy that builds it on first use"""
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+        return ServiceProxy(self, name)
+
+    def get(self, name: str) -> Any:
+        """The service instance, building it if this is the first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                logger.info(f"Initializing service: {name}")
+                instance = self._factories[name]()
+                self._instances[name] = instance
+        return instance
+
+    def initialized(self, name: str) -> bool:
+        """Whether the service has been built"""
+        return name in self._instances
+
+    def require(self, name: str) -> Callable:
+        """
+        Async dependency that builds a service in a worker thread if needed,
+        so handlers never block the event loop on its construction
+        """
+        async def dependency() -> None:
+            if not self.initialized(name):
+                await asyncio.to_thread(self.get, name)
+        return dependency
+
+    def override(self, name: str, instance: Any) -> None:
+        """Replace a service instance (e.g. with a fake in tests)"""
+        self._instances[name] = instance
+
+    def reset(self, name: str) -> None:
+        """Forget a service instance so the next use builds a fresh one"""
+        self._instances.pop(name, None)
+
+# Create singleton instance
+services = ServiceContainer()
@@ -1,11 +1,9 @@
 import os
 from pymongo import MongoClient
-from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.container import services
 import logging
 
-# Load environment variables
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
 class Database:
@@ -26,6 +24,49 @@ class Database:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
     
+    def ensure_indexes(self):
+        """Create the indexes the API query paths rely on"""
+        try:
+            # Diagnosis history is paged per user by descending _id
+            self.diagnoses_collection().create_index([("user_id", 1), ("_id", -1)])
+            # Appends look up the user's open bucket, reads walk buckets newest first
+            self.medical_history_buckets_collection().create_index([("user_id", 1), ("_id", -1)])
+            # At most one open (below capacity) bucket per user, even under concurrent appends
+            self.medical_history_buckets_collection().create_index(
+                "user_id", unique=True, partialFilterExpression={"open": True}
+            )
+            # The anchoring loop drains pending leaves in insertion order
+            self.anchor_leaves_collection().create_index([("status", 1), ("_id", 1)])
+            self.anchor_leaves_collection().create_index([("record_type", 1), ("record_id", 1), ("_id", -1)])
+            # Enqueueing upserts on the record hash, so repeated verifications share one leaf
+            self.anchor_leaves_collection().create_index(
+                [("record_type", 1), ("record_id", 1), ("data_hash", 1)], unique=True
+            )
+            self.anchor_leaves_collection().create_index("batch_id")
+            self.anchor_leaves_collection().create_index("root")
+            # The confirmation tracker scans pending transactions, status lookups go by hash
+            self.blockchain_records_collection().create_index([("status", 1), ("transaction_hash", 1)])
+            self.blockchain_records_collection().create_index("transaction_hash")
+            self.blockchain_records_collection().create_index("anchor_leaf", sparse=True)
+            # Record listings page per user by descending _id
+            self.blockchain_records_collection().create_index([("user_id", 1), ("_id", -1)])
+            self.anchor_batches_collection().create_index([("status", 1), ("transaction_hash", 1)])
+            # Reward settlement claims and finalizes wallets by settlement
+            self.reward_ledger_collection().create_index("settlement_id")
+            self.blockchain_records_collection().create_index("metadata.settlement_id", sparse=True)
+            # Web3 login challenges are removed by MongoDB once they expire
+            self.auth_challenges_collection().create_index("expires_at", expireAfterSeconds=0)
+            # Registration upserts on email; uniqueness makes concurrent sign-ups safe
+            self.users_collection().create_index("email", unique=True)
+            # A wallet logs in to exactly one account
+            self.users_collection().create_index(
+                "wallet_address", unique=True, partialFilterExpression={"wallet_address": {"$type": "string"}}
+            )
+            # Every process polls for recently revoked tokens
+            self.users_collection().create_index("tokens_revoked_at", sparse=True)
+        except Exception as e:
+            logger.error(f"Failed to create MongoDB indexes: {e}")
+    
     def close(self):
         """Close the database connection"""
         if self.client:
@@ -44,10 +85,50 @@ class Database:
         """Get the diagnoses collection"""
         return self.db.diagnoses
     
+    def medical_history_buckets_collection(self):
+        """Get the medical_history_buckets collection (bucketed diagnosis ids per user)"""
+        return self.db.medical_history_buckets
+    
+    def diagnosis_rollups_collection(self):
+        """Get the diagnosis_rollups collection (per-user history summaries)"""
+        return self.db.diagnosis_rollups
+    
     def blockchain_records_collection(self):
         """Get the blockchain_records collection"""
         return self.db.blockchain_records
     
+    def anchor_leaves_collection(self):
+        """Get the anchor_leaves collection (record hashes queued for Merkle anchoring)"""
+        return self.db.anchor_leaves
+    
+    def anchor_batches_collection(self):
+        """Get the anchor_batches collection (anchored Merkle roots)"""
+        return self.db.anchor_batches
+    
+    def chain_records_collection(self):
+        """Get the chain_records collection (indexed DiagnosisRecorded/MedicineVerified events)"""
+        return self.db.chain_records
+    
+    def token_transfers_collection(self):
+        """Get the token_transfers collection (indexed MedToken Transfer events)"""
+        return self.db.token_transfers
+    
+    def token_balances_collection(self):
+        """Get the token_balances collection (MedToken balances folded from Transfer events)"""
+        return self.db.token_balances
+    
+    def reward_ledger_collection(self):
+        """Get the reward_ledger collection (per-wallet MedToken rewards not yet minted)"""
+        return self.db.reward_ledger
+    
+    def indexer_checkpoints_collection(self):
+        """Get the indexer_checkpoints collection"""
+        return self.db.indexer_checkpoints
+    
+    def auth_challenges_collection(self):
+        """Get the auth_challenges collection (outstanding Web3 login challenges)"""
+        return self.db.auth_challenges
+    
     def feedback_collection(self):
         """Get the feedback collection"""
         return self.db.feedback
@@ -60,8 +141,24 @@ class Database:
         """Get the locations collection"""
         return self.db.locations
 
-# Create a singleton instance
-db = Database()
+class AsyncDatabase(Database):
+    """
+    Motor (asyncio) client with the same collection accessors as Database
+    Used on the request path; background worker threads keep the pymongo client
+    """
+    
+    def initialize(self):
+        """Initialize the async database client (connects on first use)"""
+        try:
+            self.client = AsyncIOMotorClient(self.mongodb_url)
+            self.db = self.client[self.db_name]
+        except Exception as e:
+            logger.error(f"Failed to create async MongoDB client: {e}")
+            raise
+
+# Singleton instances, created on first use (MongoClient starts connecting on construction)
+db = services.lazy("db", Database)
+async_db = services.lazy("async_db", AsyncDatabase)
 
 # Function to get the database instance
 def get_database():
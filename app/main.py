@@ -1,40 +1,151 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import fcntl
+import os
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.api.endpoints import medicines, diagnosis, users, blockchain
-from app.core.config import settings
-
-app = FastAPI(
-    title="TeleMedChain",
-    description="A telemedicine platform with AI diagnostics and Web3.0 integration",
-    version="1.0.0"
-)
-
-# Set up CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # For production, specify actual origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include API routes
-app.include_router(users.router, prefix="/api/users", tags=["users"])
-app.include_router(diagnosis.router, prefix="/api/diagnosis", tags=["diagnosis"])
-app.include_router(medicines.router, prefix="/api/medicines", tags=["medicines"])
-app.include_router(blockchain.router, prefix="/api/blockchain", tags=["blockchain"])
-
-# Serve static files for frontend
-try:
-    app.mount("/", StaticFiles(directory="frontend/build", html=True), name="static")
-except RuntimeError:
-    # Handling the case when frontend build directory doesn't exist yet
-    pass
-
-@app.get("/api/health", tags=["health"])
-async def health_check():
+from app.core.container import services
+from app.db.database import db
+from app.services.blockchain_service import blockchain_service
+from app.services.password_service import password_service
+from app.services.signature_service import signature_service
+from app.utils.compression import CompressionMiddleware
+from app.utils.serialization import BSONResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+FRONTEND_BUILD = Path(__file__).resolve().parent.parent / "frontend" / "build"
+
+def _acquire_worker_lock():
+    """
+    Elect the one process per host that runs the chain-writing background workers
+    Returns the locked file (held until shutdown), or None if another worker has it
+    """
+    path = os.environ.get(
+        "BACKGROUND_WORKER_LOCK", os.path.join(tempfile.gettempdir(), "telemedchain-workers.lock")
+    )
+    handle = open(path, "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+def _start_workers(leader: bool) -> list:
+    """
+    Start background workers and return them in start order
+    Transaction submission, confirmation tracking, reward settlement, Merkle
+    anchoring and event indexing write to the chain or shared state, so only
+    the leader runs them; the read caches run in every process
+    """
+    workers = []
+    if leader:
+        # Only real, signed transactions can be confirmed or minted
+        if blockchain_service.transactions:
+            workers += [blockchain_service.transactions, blockchain_service.confirmations, blockchain_service.rewards]
+        workers.append(blockchain_service.anchoring)
+        if blockchain_service.web3:
+            workers.append(blockchain_service.indexer)
+    workers += [blockchain_service.token_state, blockchain_service.telemetry, blockchain_service.transaction_watcher]
+    for worker in workers:
+        worker.start()
+    return workers
+
+def _warm_up(state: dict) -> None:
     """
-    Health check endpoint to verify the API is running
+    Build the database and blockchain clients and start background workers
+    Runs in a thread so the server answers requests while RPC endpoints are probed
     """
-    return {"status": "ok", "message": "TeleMedChain API is running"}
+    try:
+        # Make sure query paths are backed by indexes
+        db.ensure_indexes()
+        state["worker_lock"] = _acquire_worker_lock()
+        state["workers"] = _start_workers(state["worker_lock"] is not None)
+        logger.info(
+            f"Started {len(state['workers'])} background workers (leader: {state['worker_lock'] is not None})"
+        )
+    except Exception as e:
+        logger.error(f"Error warming up services: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the database and Web3 clients and workers; tear everything down on shutdown"""
+    state = {"worker_lock": None, "workers": []}
+    warm_up = threading.Thread(target=_warm_up, args=(state,), name="service-warm-up", daemon=True)
+    warm_up.start()
+    try:
+        yield
+    finally:
+        await run_in_threadpool(warm_up.join)
+        for worker in reversed(state["workers"]):
+            await run_in_threadpool(worker.stop)
+        # Only close what was actually created
+        if services.initialized("blockchain_service"):
+            await run_in_threadpool(blockchain_service.close)
+        signature_service.shutdown()
+        password_service.shutdown()
+        for name in ("async_db", "db"):
+            if services.initialized(name):
+                services.get(name).close()
+        if state["worker_lock"]:
+            state["worker_lock"].close()
+
+def create_app() -> FastAPI:
+    """Create and configure the ASGI application"""
+    app = FastAPI(
+        title="TeleMedChain",
+        description="A telemedicine platform with AI diagnostics and Web3.0 integration",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=BSONResponse
+    )
+
+    # Set up CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # For production, specify actual origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Compress JSON bodies above COMPRESSION_MIN_SIZE with brotli or gzip
+    app.add_middleware(CompressionMiddleware)
+
+    # Include API routes
+    app.include_router(users.router, prefix="/api/users", tags=["users"])
+    app.include_router(diagnosis.router, prefix="/api/diagnosis", tags=["diagnosis"])
+    app.include_router(medicines.router, prefix="/api/medicines", tags=["medicines"])
+    app.include_router(blockchain.router, prefix="/api/blockchain", tags=["blockchain"])
+
+    @app.get("/api/health", tags=["health"])
+    async def health_check():
+        """
+        Health check endpoint to verify the API is running
+        """
+        return {"status": "ok", "message": "TeleMedChain API is running"}
+
+    @app.exception_handler(StarletteHTTPException)
+    async def not_found(request: Request, exc: StarletteHTTPException):
+        # For SPA routing - return index.html for all non-API routes
+        if exc.status_code == 404 and not request.url.path.startswith("/api/") \
+                and (FRONTEND_BUILD / "index.html").is_file():
+            return FileResponse(FRONTEND_BUILD / "index.html")
+        return JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+    # Serve the frontend build, if there is one
+    if FRONTEND_BUILD.is_dir():
+        app.mount("/", StaticFiles(directory=FRONTEND_BUILD, html=True), name="static")
+
+    return app
+
+app = create_app()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -20,6 +20,8 @@ class BlockchainBase(BaseModel):
     chain_id: int  # Which blockchain network
     metadata: Optional[Dict[str, Any]] = {}
     status: str = "pending"  # pending, confirmed, failed
+    block_number: Optional[int] = None  # Set by the confirmation tracker once mined
+    confirmations: Optional[int] = None
 
 class BlockchainCreate(BlockchainBase):
     pass
@@ -27,6 +29,8 @@ class BlockchainCreate(BlockchainBase):
 class BlockchainUpdate(BaseModel):
     transaction_hash: Optional[str] = None
     status: Optional[str] = None
+    block_number: Optional[int] = None
+    confirmations: Optional[int] = None
     metadata: Optional[Dict[str, Any]] = None
 
 class BlockchainInDB(BlockchainBase):
@@ -34,9 +38,7 @@ class BlockchainInDB(BlockchainBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        orm_mode = True
-        allow_population_by_field_name = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 class BlockchainRecord(BlockchainInDB):
     """Blockchain record returned to clients"""
@@ -66,9 +68,27 @@ class SmartContractInteraction(BaseModel):
     estimated_gas: Optional[int] = None
     transaction_hash: Optional[str] = None
     
+class RpcLatency(BaseModel):
+    p50: float
+    p95: float
+    p99: float
+
+class RpcStatsSummary(BaseModel):
+    window_seconds: float
+    requests: int
+    errors: int
+    error_rate: float
+    latency_ms: Optional[RpcLatency] = None
+
 class Web3ConnectionStatus(BaseModel):
     connected: bool
     network_name: str
     chain_id: int
     latest_block: int
     gas_price: str
+    base_fee: Optional[str] = None
+    block_age_seconds: Optional[int] = None
+    rpc: Optional[RpcStatsSummary] = None
+    endpoints: List[Dict[str, Any]] = []
+    pending_transactions: int = 0
+    sampled_at: Optional[datetime] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -48,10 +48,10 @@ class DiagnosisInDB(DiagnosisBase):
     created_at: datetime
     updated_at: datetime
     status: DiagnosisStatus = DiagnosisStatus.PENDING
+    content_digest: Optional[str] = None  # sha256 of the canonical hashed fields
+    content_digest_at: Optional[datetime] = None  # updated_at the digest was computed for
     
-    class Config:
-        orm_mode = True
-        allow_population_by_field_name = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
         
 class Diagnosis(DiagnosisInDB):
     """Diagnosis model returned to clients"""
@@ -72,3 +72,24 @@ class DiagnosisResponse(BaseModel):
     recommended_medicines: List[Dict[str, Any]]
     recommended_actions: List[str]
     disclaimer: str = "This AI-generated diagnosis is for informational purposes only and is not a substitute for professional medical advice. Please consult with a healthcare provider for proper diagnosis and treatment."
+
+class DiagnosisHistoryItem(BaseModel):
+    """Projected diagnosis row returned by the history listing"""
+    id: str
+    condition_name: Optional[str] = None
+    confidence_score: Optional[float] = None
+    status: Optional[DiagnosisStatus] = None
+    blockchain_verified: bool = False
+    created_at: datetime
+
+class DiagnosisHistoryPage(BaseModel):
+    items: List[DiagnosisHistoryItem]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to get the next page
+
+class DiagnosisSummary(BaseModel):
+    """Per-user history rollup maintained on write"""
+    total_diagnoses: int = 0
+    by_condition: Dict[str, int] = {}
+    last_visit: Optional[datetime] = None
+    verified_diagnoses: int = 0
+    verification_coverage: float = 0.0  # Fraction of diagnoses verified on blockchain
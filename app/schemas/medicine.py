@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -48,10 +48,10 @@ class MedicineInDB(MedicineBase):
     id: str = Field(..., alias="_id")
     created_at: datetime
     updated_at: datetime
+    content_digest: Optional[str] = None  # sha256 of the canonical hashed fields
+    content_digest_at: Optional[datetime] = None  # updated_at the digest was computed for
     
-    class Config:
-        orm_mode = True
-        allow_population_by_field_name = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 class Medicine(MedicineInDB):
     """Medicine model returned to clients"""
@@ -64,8 +64,7 @@ class MedicinePrice(BaseModel):
     currency: str = "USD"
     last_updated: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class MedicineSearchParams(BaseModel):
     diagnosis: Optional[str] = None
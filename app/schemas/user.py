@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import Optional
 from datetime import datetime
 from enum import Enum
 
@@ -32,11 +32,10 @@ class UserInDBBase(UserBase):
     created_at: datetime
     updated_at: datetime
     wallet_address: Optional[str] = None
-    medical_history: Optional[List[str]] = []  # IDs of diagnoses
+    medical_history_count: int = 0  # Number of diagnoses in the bucketed history
+    latest_history_bucket: Optional[str] = None  # ID of the newest medical_history_buckets document
     
-    class Config:
-        orm_mode = True
-        allow_population_by_field_name = True
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 class User(UserInDBBase):
     """User model returned to clients"""
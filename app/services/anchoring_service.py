@@ -0,0 +1,327 @@
+import hashlib
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.db.database import db
+from app.utils.merkle import build_tree, hash_leaf, merkle_proof, merkle_root, verify_proof
+
+logger = logging.getLogger(__name__)
+
+class AnchoringService:
+    """
+    Accumulates record hashes and anchors them on-chain as a single Merkle root.
+
+    Leaves are queued in the anchor_leaves collection. A batch is flushed when
+    ANCHOR_BATCH_SIZE leaves are pending or the oldest pending leaf has waited
+    ANCHOR_WINDOW_SECONDS. Each leaf then stores its inclusion proof, so
+    verification is a local proof recomputation plus a lookup of the root.
+    Leaves left claimed by a crashed flush, or whose anchor transaction
+    failed, go back to pending for a later batch.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService providing web3, the MedicalRecords contract and the signer
+        self.blockchain = blockchain
+        self.batch_size = int(os.environ.get("ANCHOR_BATCH_SIZE", 256))
+        self.window_seconds = float(os.environ.get("ANCHOR_WINDOW_SECONDS", 60))
+        self.poll_interval = float(os.environ.get("ANCHOR_POLL_INTERVAL", 5))
+        # A flush claims and anchors leaves in well under this, so older claims were abandoned
+        self.claim_timeout = timedelta(seconds=float(os.environ.get("ANCHOR_CLAIM_TIMEOUT", 600)))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background flush loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="anchoring-service", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background flush loop"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.recover()
+                while self._batch_ready():
+                    if not self.flush():
+                        break
+            except Exception as e:
+                logger.error(f"Error in anchoring loop: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def _batch_ready(self) -> bool:
+        leaves = db.anchor_leaves_collection()
+        oldest = leaves.find_one({"status": "pending"}, {"created_at": 1}, sort=[("_id", 1)])
+        if not oldest:
+            return False
+        if oldest["created_at"] <= datetime.utcnow() - timedelta(seconds=self.window_seconds):
+            return True
+        return leaves.count_documents({"status": "pending"}, limit=self.batch_size) >= self.batch_size
+
+    def enqueue(self, record_type: str, record_id: str, data_hash: str) -> Dict[str, Any]:
+        """
+        Queue a record hash for the next anchored batch
+        A hash that is already queued or anchored for the record is returned as is
+        """
+        leaf = hash_leaf(record_type, record_id, data_hash)
+        now = datetime.utcnow()
+        key = {"record_type": record_type, "record_id": record_id, "data_hash": data_hash}
+        update = {"$setOnInsert": {
+            "leaf": leaf.hex(),
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now
+        }}
+        try:
+            entry = db.anchor_leaves_collection().find_one_and_update(
+                key, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # A concurrent enqueue of the same hash inserted it first
+            entry = db.anchor_leaves_collection().find_one(key)
+        return {
+            "leaf_id": str(entry["_id"]),
+            "leaf": entry["leaf"],
+            "anchor_status": entry["status"]
+        }
+
+    def recover(self) -> int:
+        """
+        Put abandoned claims and leaves of failed anchor transactions back to pending
+        Returns the number of leaves re-queued
+        """
+        leaves_collection = db.anchor_leaves_collection()
+        batches_collection = db.anchor_batches_collection()
+        now = datetime.utcnow()
+        requeue = {
+            "$set": {"status": "pending", "updated_at": now},
+            "$unset": {"batch_id": "", "claimed_at": "", "root": "", "proof": "", "transaction_hash": ""}
+        }
+
+        # A flush that crashed after claiming never anchors its leaves
+        requeued = leaves_collection.update_many(
+            {"status": "batching", "claimed_at": {"$lt": now - self.claim_timeout}}, requeue
+        ).modified_count
+
+        # Reverted or dropped anchor transactions leave their roots unanchored
+        for batch in batches_collection.find({"status": "failed", "requeued_at": {"$exists": False}}, {"_id": 1}):
+            query = {"batch_id": batch["_id"], "root_block": {"$exists": False}}
+            leaf_hashes = [doc["leaf"] for doc in leaves_collection.find(query, {"leaf": 1})]
+            requeued += leaves_collection.update_many(query, requeue).modified_count
+            # Records tracked through these leaves wait for the next batch again
+            db.blockchain_records_collection().update_many(
+                {"anchor_leaf": {"$in": leaf_hashes}},
+                {"$set": {"status": "queued", "updated_at": now},
+                 "$unset": {"transaction_hash": "", "replaced_transaction_hashes": "", "error": ""}}
+            )
+            batches_collection.update_one({"_id": batch["_id"]}, {"$set": {"requeued_at": now}})
+
+        if requeued:
+            logger.warning(f"Re-queued {requeued} leaves from abandoned or failed anchor batches")
+        return requeued
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        Anchor up to batch_size pending leaves under one Merkle root
+        Returns the batch document, or None if nothing was pending
+        """
+        leaves_collection = db.anchor_leaves_collection()
+        batch_id = uuid.uuid4().hex
+
+        # Claim pending leaves so concurrent workers never anchor the same leaf twice
+        pending_ids = [
+            doc["_id"] for doc in
+            leaves_collection.find({"status": "pending"}, {"_id": 1}).sort("_id", 1).limit(self.batch_size)
+        ]
+        if not pending_ids:
+            return None
+        leaves_collection.update_many(
+            {"_id": {"$in": pending_ids}, "status": "pending"},
+            {"$set": {"status": "batching", "batch_id": batch_id, "claimed_at": datetime.utcnow()}}
+        )
+        claimed = list(leaves_collection.find({"batch_id": batch_id}, {"leaf": 1}).sort("_id", 1))
+        if not claimed:
+            return None
+
+        levels = build_tree([bytes.fromhex(doc["leaf"]) for doc in claimed])
+        root = merkle_root(levels)
+        simulated = not (self.blockchain.contract and self.blockchain.transactions)
+
+        try:
+            tx_hash = self._send_anchor_transaction(root, len(claimed))
+        except Exception as e:
+            logger.error(f"Error anchoring Merkle root: {e}")
+            # Release the claim so the leaves go into a later batch
+            leaves_collection.update_many(
+                {"batch_id": batch_id},
+                {"$set": {"status": "pending"}, "$unset": {"batch_id": "", "claimed_at": ""}}
+            )
+            return None
+
+        now = datetime.utcnow()
+        batch = {
+            "_id": batch_id,
+            "root": root.hex(),
+            "leaf_count": len(claimed),
+            "transaction_hash": tx_hash,
+            "chain_id": self.blockchain.chain_id,
+            "contract_address": self.blockchain.contract_address,
+            # Simulated roots never reach the chain, so the confirmation tracker skips them
+            "status": "simulated" if simulated else "submitted",
+            "created_at": now,
+            "updated_at": now
+        }
+        db.anchor_batches_collection().insert_one(batch)
+
+        leaves_collection.bulk_write([
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {
+                    "status": "anchored",
+                    "root": root.hex(),
+                    "proof": [node.hex() for node in merkle_proof(levels, index)],
+                    "transaction_hash": tx_hash,
+                    "updated_at": now
+                }}
+            )
+            for index, doc in enumerate(claimed)
+        ], ordered=False)
+        # blockchain_records rows queued for these leaves now have a transaction to track
+        db.blockchain_records_collection().update_many(
+            {"anchor_leaf": {"$in": [doc["leaf"] for doc in claimed]}, "status": "queued"},
+            {"$set": {"transaction_hash": tx_hash, "status": batch["status"], "updated_at": now}}
+        )
+
+        logger.info(f"Anchored {len(claimed)} records under root {root.hex()} in {tx_hash}")
+        return batch
+
+    def _send_anchor_transaction(self, root: bytes, leaf_count: int) -> str:
+        """Submit MedicalRecords.anchorRoot, or simulate it when no signer is configured"""
+        contract = self.blockchain.contract
+        transactions = self.blockchain.transactions
+
+        if not (contract and transactions):
+            # For demo setups without a signer, simulate the transaction like the rest of the service
+            logger.warning("No contract signer configured, simulating anchor transaction")
+            return "0x" + hashlib.sha256(b"anchor:" + root).hexdigest()
+
+        return transactions.submit(contract.functions.anchorRoot(root, leaf_count))
+
+    def get_inclusion(self, record_type: str, record_id: str,
+                      data_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the queue entry for a record hash, anchored or not
+        Falls back to the record's most recent entry when the hash was never queued
+        """
+        leaves = db.anchor_leaves_collection()
+        if data_hash:
+            entry = leaves.find_one({"record_type": record_type, "record_id": record_id, "data_hash": data_hash})
+            if entry:
+                return entry
+        return leaves.find_one({"record_type": record_type, "record_id": record_id}, sort=[("_id", -1)])
+
+    def get_inclusions(self, keys: List[Tuple[str, str, Optional[str]]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Get queue entries for many (record_type, record_id, data_hash) keys in one query
+        Like get_inclusion, an entry for the exact hash wins over the record's most recent one
+        """
+        if not keys:
+            return {}
+        wanted = {(record_type, record_id): data_hash for record_type, record_id, data_hash in keys}
+        entries = db.anchor_leaves_collection().find(
+            {"$or": [{"record_type": record_type, "record_id": record_id} for record_type, record_id in wanted]}
+        ).sort("_id", 1)
+        inclusions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for entry in entries:
+            key = (entry["record_type"], entry["record_id"])
+            current = inclusions.get(key)
+            # Later entries overwrite earlier ones unless the earlier one is the exact hash
+            if current is None or current["data_hash"] != wanted[key]:
+                inclusions[key] = entry
+        return inclusions
+
+    def record_fields(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Status fields for a blockchain_records row anchored through a queue entry
+        Rows stay "queued" until their leaf is in a submitted batch
+        """
+        if entry["status"] != "anchored":
+            return {"status": "queued"}
+        if entry.get("root_block") is not None:
+            return {"status": "confirmed", "transaction_hash": entry["transaction_hash"],
+                    "block_number": entry["root_block"]}
+        batch = db.anchor_batches_collection().find_one({"_id": entry.get("batch_id")}, {"status": 1})
+        status = batch["status"] if batch else "submitted"
+        if status == "failed":
+            # recover() puts the leaf back into the queue
+            return {"status": "queued"}
+        return {"status": status, "transaction_hash": entry["transaction_hash"]}
+
+    def verify(self, record_type: str, record_id: str, data_hash: str) -> Dict[str, Any]:
+        """
+        Verify a record hash by recomputing its inclusion proof locally
+        Answered from the leaf document; the event indexer marks it once its root is on-chain
+        """
+        return self.verify_entry(
+            self.get_inclusion(record_type, record_id, data_hash), record_type, record_id, data_hash
+        )
+
+    def verify_entry(self, entry: Optional[Dict[str, Any]], record_type: str,
+                     record_id: str, data_hash: str) -> Dict[str, Any]:
+        """
+        Verify a record hash against an already fetched queue entry
+        Only a valid proof under a root mined on-chain counts as verified
+        """
+        if not entry:
+            return self._verify_indexed_record(record_type, record_id, data_hash)
+        if entry["status"] != "anchored":
+            return {"verified": False, "anchor_status": "pending"}
+
+        leaf = hash_leaf(record_type, record_id, data_hash)
+        root = bytes.fromhex(entry["root"])
+        proof: List[bytes] = [bytes.fromhex(node) for node in entry.get("proof", [])]
+        proof_valid = leaf.hex() == entry["leaf"] and verify_proof(leaf, proof, root)
+
+        if entry.get("root_block") is not None:
+            anchor_status = "confirmed"
+        else:
+            # Not seen on-chain yet: report whether the root is still on its way, failed or simulated
+            batch = db.anchor_batches_collection().find_one({"_id": entry.get("batch_id")}, {"status": 1})
+            anchor_status = batch["status"] if batch and batch["status"] in ("failed", "simulated") else "submitted"
+
+        return {
+            "verified": proof_valid and anchor_status == "confirmed",
+            "proof_valid": proof_valid,
+            "anchor_status": anchor_status,
+            "merkle_root": entry["root"],
+            "merkle_proof": entry.get("proof", []),
+            "anchored_hash": entry["data_hash"],
+            "block_number": entry.get("root_block"),
+            "transaction_hash": entry.get("transaction_hash")
+        }
+
+    def _verify_indexed_record(self, record_type: str, record_id: str, data_hash: str) -> Dict[str, Any]:
+        """Fall back to records written one per transaction (recordDiagnosis/verifyMedicine)"""
+        record = db.chain_records_collection().find_one({"_id": f"{record_type}:{record_id}"})
+        if not record:
+            return {"verified": False, "anchor_status": "not_found"}
+
+        return {
+            "verified": record["data_hash"] == data_hash,
+            "anchor_status": "confirmed",
+            "anchored_hash": record["data_hash"],
+            "block_number": record.get("block_number"),
+            "transaction_hash": record.get("transaction_hash")
+        }
@@ -0,0 +1,102 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+import logging
+import os
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+class BlockHeaderTracker:
+    """
+    Polls the node for new block headers in a background thread and serves
+    the latest block number, timestamp and gas price from memory.
+
+    Readers never touch the node; a snapshot older than ``max_staleness``
+    seconds is treated as unavailable.
+    """
+
+    def __init__(self, web3, poll_interval: Optional[float] = None,
+                 max_staleness: Optional[float] = None):
+        self.web3 = web3
+        self.poll_interval = poll_interval or float(os.environ.get("BLOCK_POLL_INTERVAL", 2))
+        self.max_staleness = max_staleness or float(os.environ.get("BLOCK_MAX_STALENESS", 30))
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background polling thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="block-header-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background polling thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.poll_interval)
+
+    def refresh(self) -> bool:
+        """Fetch the latest header and gas price from the node"""
+        try:
+            block = self.web3.eth.get_block('latest')
+            with self._lock:
+                previous = self._snapshot
+            # Gas price only needs refreshing when a new block arrives
+            if previous and previous["block_number"] == block.number:
+                gas_price = previous["gas_price"]
+            else:
+                gas_price = self.web3.eth.gas_price
+            snapshot = {
+                "block_number": block.number,
+                "block_hash": Web3.to_hex(block.hash) if block.hash else None,
+                "timestamp": block.timestamp,
+                "gas_price": gas_price,
+                "base_fee": block.get("baseFeePerGas"),
+                "fetched_at": time.monotonic()
+            }
+            with self._lock:
+                self._snapshot = snapshot
+            return True
+        except Exception as e:
+            logger.warning(f"Error polling latest block: {e}")
+            return False
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Get the latest header snapshot, or None if it is missing or stale"""
+        with self._lock:
+            snapshot = self._snapshot
+        if not snapshot or time.monotonic() - snapshot["fetched_at"] > self.max_staleness:
+            return None
+        return snapshot
+
+    @property
+    def block_number(self) -> int:
+        snapshot = self.latest()
+        return snapshot["block_number"] if snapshot else 0
+
+    @property
+    def timestamp(self) -> int:
+        snapshot = self.latest()
+        return snapshot["timestamp"] if snapshot else 0
+
+    @property
+    def gas_price(self) -> int:
+        snapshot = self.latest()
+        return snapshot["gas_price"] if snapshot else 0
+
+    @property
+    def base_fee(self) -> Optional[int]:
+        """EIP-1559 base fee of the latest block, None on legacy chains or when stale"""
+        snapshot = self.latest()
+        return snapshot["base_fee"] if snapshot else None
@@ -1,142 +1,237 @@
 from web3 import Web3
-from eth_account.messages import encode_defunct
-import json
-import hashlib
-from typing import Dict, Any, Optional
+from web3.exceptions import TransactionNotFound
+from eth_account import Account
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 import logging
 import os
+from app.core.container import services
+from app.db.database import async_db, db
+from app.services.anchoring_service import AnchoringService
+from app.services.block_header_tracker import BlockHeaderTracker
+from app.services.chain_telemetry import ChainTelemetry
+from app.services.confirmation_tracker import ConfirmationTracker
+from app.services.contract_abi import MEDICAL_RECORDS_ABI, MED_TOKEN_ABI
+from app.services.event_indexer import EventIndexer
+from app.services.provider_pool import ProviderPool
+from app.services.reward_service import RewardService
+from app.services.signature_service import signature_service
+from app.services.token_state import TokenStateService
+from app.services.transaction_pipeline import TransactionPipeline
+from app.services.transaction_watcher import TransactionWatcher
+from app.utils.hashing import current_digest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCommandCursor
 
 logger = logging.getLogger(__name__)
 
+MAX_RECORDS_PAGE_SIZE = 100
+
 class BlockchainService:
     def __init__(self):
         self.provider_uri = os.environ.get("WEB3_PROVIDER_URI")
+        # Optional comma-separated list of RPC endpoints to pool, e.g. several local dev chains
+        self.provider_uris = [
+            uri.strip() for uri in os.environ.get("WEB3_PROVIDER_URIS", self.provider_uri or "").split(",")
+            if uri.strip()
+        ]
+        self.provider_pool = None
         self.chain_id = int(os.environ.get("CHAIN_ID", 1))
         self.contract_address = os.environ.get("CONTRACT_ADDRESS")
+        self.token_contract_address = os.environ.get("TOKEN_CONTRACT_ADDRESS")
         self.web3 = None
         self.contract = None
+        self.token_contract = None
+        self.account = None
+        self.block_tracker = None
+        self.transactions = None
         self.initialize_web3()
+        self.anchoring = AnchoringService(self)
+        self.confirmations = ConfirmationTracker(self)
+        self.indexer = EventIndexer(self)
+        self.rewards = RewardService(self)
+        self.token_state = TokenStateService(self)
+        self.telemetry = ChainTelemetry(self)
+        self.transaction_watcher = TransactionWatcher(self)
         
     def initialize_web3(self):
         """Initialize Web3 connection and contract"""
         try:
-            if self.provider_uri:
-                self.web3 = Web3(Web3.HTTPProvider(self.provider_uri))
+            if self.provider_uris:
+                # Route every call to the fastest healthy endpoint with transparent failover
+                self.provider_pool = ProviderPool(self.provider_uris)
+                self.provider_pool.probe()
+                self.provider_pool.start()
+                self.web3 = Web3(self.provider_pool)
                 logger.info(f"Web3 connection established: {self.web3.is_connected()}")
                 
-                # In a real application, we would load the contract ABI and initialize it
-                # For demo purposes, we'll simulate contract interactions
+                # Serve latest block metadata from memory instead of per-call RPCs
+                self.block_tracker = BlockHeaderTracker(self.web3)
+                self.block_tracker.start()
+                
                 if self.contract_address:
+                    self.contract = self.web3.eth.contract(
+                        address=Web3.to_checksum_address(self.contract_address),
+                        abi=MEDICAL_RECORDS_ABI
+                    )
                     logger.info(f"Contract address configured: {self.contract_address}")
                 else:
                     logger.warning("No contract address configured")
+                
+                if self.token_contract_address:
+                    self.token_contract = self.web3.eth.contract(
+                        address=Web3.to_checksum_address(self.token_contract_address),
+                        abi=MED_TOKEN_ABI
+                    )
+                
+                # Signer for contract writes; without it transactions are simulated
+                private_key = os.environ.get("BLOCKCHAIN_PRIVATE_KEY")
+                if private_key:
+                    self.account = Account.from_key(private_key)
+                    # Nonce-managed, non-blocking submission for all contract writes
+                    self.transactions = TransactionPipeline(self)
             else:
                 logger.warning("No Web3 provider URI configured")
         except Exception as e:
             logger.error(f"Error initializing Web3: {e}")
             self.web3 = None
     
+    def close(self):
+        """Stop the header tracker and close the RPC provider pool"""
+        if self.block_tracker:
+            self.block_tracker.stop()
+        if self.provider_pool:
+            self.provider_pool.close()
+    
+    def rpc_batch(self, calls: List[Any]) -> List[Any]:
+        """Send (method, params) calls as one JSON-RPC batch through the provider pool"""
+        if not self.provider_pool:
+            raise ConnectionError("Blockchain connection not available")
+        return self.provider_pool.batch(calls)
+    
+    def latest_block_timestamp(self) -> int:
+        """Timestamp of the latest block from the header tracker (0 if unknown or stale)"""
+        return self.block_tracker.timestamp if self.block_tracker else 0
+    
+    def get_connection_status(self) -> Dict[str, Any]:
+        """Connection status and RPC health from the last telemetry sample"""
+        return self.telemetry.snapshot()
+    
     def verify_signature(self, message: str, signature: str, address: str) -> bool:
         """Verify an Ethereum signature"""
-        try:
-            if not self.web3:
-                logger.warning("Web3 not initialized")
-                return False
-                
-            # Create the message hash that was signed
-            message_hash = encode_defunct(text=message)
-            
-            # Recover the address from the signature
-            recovered_address = self.web3.eth.account.recover_message(message_hash, signature=signature)
-            
-            # Check if the recovered address matches the expected address
-            return recovered_address.lower() == address.lower()
-        except Exception as e:
-            logger.error(f"Error verifying signature: {e}")
-            return False
+        # Recovery is local, so no Web3 connection is needed
+        return signature_service.verify(message, signature, address)
     
     def store_diagnosis_hash(self, diagnosis_id: str, diagnosis_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Store a diagnosis hash on the blockchain"""
+        """Queue a diagnosis hash for the next anchored Merkle batch"""
         try:
-            if not self.web3:
-                return {"success": False, "error": "Blockchain connection not available"}
-            
-            # Create a hash of the diagnosis data
-            diagnosis_json = json.dumps(diagnosis_data, sort_keys=True)
-            diagnosis_hash = hashlib.sha256(diagnosis_json.encode()).hexdigest()
+            # Canonical digest of the hashed fields, reused unless the record changed
+            diagnosis_hash = current_digest("diagnosis", diagnosis_data, db.diagnoses_collection())
             
-            # In a real application, we would call the contract to store the hash
-            # For demo purposes, we'll simulate the blockchain transaction
-            
-            # Simulate transaction hash
-            tx_hash = "0x" + hashlib.sha256(f"{diagnosis_id}:{diagnosis_hash}".encode()).hexdigest()
+            # The hash is anchored on-chain as part of a batch root by the anchoring service
+            anchor = self.anchoring.enqueue("diagnosis", diagnosis_id, diagnosis_hash)
             
             return {
                 "success": True,
+                "ready_for_storage": True,
                 "diagnosis_id": diagnosis_id,
                 "diagnosis_hash": diagnosis_hash,
-                "transaction_hash": tx_hash,
-                "block_number": 12345678,  # Simulated block number
-                "timestamp": self.web3.eth.get_block('latest').timestamp if self.web3.is_connected() else 0,
+                "hash": diagnosis_hash,
+                "merkle_leaf": anchor["leaf"],
+                "anchor_status": anchor["anchor_status"],
+                "timestamp": self.latest_block_timestamp(),
                 "chain_id": self.chain_id
             }
         except Exception as e:
             logger.error(f"Error storing diagnosis hash: {e}")
             return {"success": False, "error": str(e)}
     
+    def store_medical_record(self, record_id: str, data_hash: str) -> Dict[str, Any]:
+        """Queue a medical record hash for the next anchored Merkle batch"""
+        try:
+            anchor = self.anchoring.enqueue("medical_record", record_id, data_hash)
+            self.track_anchored_record(record_id, "medical_record", record_id, data_hash)
+            return {"success": True, "merkle_leaf": anchor["leaf"], "anchor_status": anchor["anchor_status"]}
+        except Exception as e:
+            logger.error(f"Error storing medical record hash: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def track_anchored_record(self, row_id: str, record_type: str, record_id: str, data_hash: str) -> Dict[str, Any]:
+        """
+        Bring a queued blockchain_records row up to date with its anchor leaf
+        Covers a batch flushed before the row was written; later batches update the row themselves
+        """
+        entry = self.anchoring.get_inclusion(record_type, record_id, data_hash)
+        if not entry or entry["data_hash"] != data_hash:
+            return {"status": "queued"}
+        fields = self.anchoring.record_fields(entry)
+        if fields["status"] != "queued":
+            db.blockchain_records_collection().update_one(
+                {"_id": ObjectId(row_id), "status": "queued"},
+                {"$set": {**fields, "updated_at": datetime.utcnow()}}
+            )
+        return fields
+    
     def verify_diagnosis(self, diagnosis_id: str, diagnosis_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Verify a diagnosis against the blockchain"""
+        """Verify a diagnosis against its anchored Merkle inclusion proof"""
         try:
-            if not self.web3:
-                return {"verified": False, "error": "Blockchain connection not available"}
-            
-            # Create a hash of the diagnosis data
-            diagnosis_json = json.dumps(diagnosis_data, sort_keys=True)
-            diagnosis_hash = hashlib.sha256(diagnosis_json.encode()).hexdigest()
+            # Canonical digest of the hashed fields, reused unless the record changed
+            diagnosis_hash = current_digest("diagnosis", diagnosis_data, db.diagnoses_collection())
             
-            # In a real application, we would call the contract to verify the hash
-            # For demo purposes, we'll simulate the verification
+            inclusion = self.anchoring.verify("diagnosis", diagnosis_id, diagnosis_hash)
             
-            # Simulate verification result (in a real app, this would check the blockchain)
-            # For demo, we'll just return success
             return {
-                "verified": True,
+                **inclusion,
                 "diagnosis_id": diagnosis_id,
                 "diagnosis_hash": diagnosis_hash,
-                "blockchain_hash": diagnosis_hash,  # In a real app, this would come from the blockchain
-                "timestamp": self.web3.eth.get_block('latest').timestamp if self.web3.is_connected() else 0,
+                "blockchain_hash": inclusion.get("anchored_hash"),
+                "timestamp": self.latest_block_timestamp(),
                 "chain_id": self.chain_id
             }
         except Exception as e:
             logger.error(f"Error verifying diagnosis: {e}")
             return {"verified": False, "error": str(e)}
     
-    def verify_medicine(self, medicine_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Verify medicine information against the blockchain"""
+    def _medicine_hash(self, medicine_data: Dict[str, Any]) -> str:
+        """Canonical digest of the medicine fields covered by verification"""
+        return current_digest("medicine", medicine_data, db.medicines_collection())
+    
+    def record_medicine(self, medicine_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a medicine hash for the next anchored Merkle batch"""
         try:
-            if not self.web3:
-                return {"verified": False, "error": "Blockchain connection not available"}
-            
             medicine_id = medicine_data.get("_id")
+            medicine_hash = self._medicine_hash(medicine_data)
             
-            # Create a hash of the medicine data (excluding verification fields)
-            # In a real app, we'd only hash the critical fields that shouldn't change
-            verification_fields = ["blockchain_verification", "blockchain_status", "prices"]
-            verification_data = {k: v for k, v in medicine_data.items() if k not in verification_fields}
+            anchor = self.anchoring.enqueue("medicine", medicine_id, medicine_hash)
             
-            medicine_json = json.dumps(verification_data, sort_keys=True)
-            medicine_hash = hashlib.sha256(medicine_json.encode()).hexdigest()
+            return {
+                "success": True,
+                "medicine_id": medicine_id,
+                "medicine_hash": medicine_hash,
+                "hash": medicine_hash,
+                "merkle_leaf": anchor["leaf"],
+                "anchor_status": anchor["anchor_status"],
+                "timestamp": self.latest_block_timestamp(),
+                "chain_id": self.chain_id
+            }
+        except Exception as e:
+            logger.error(f"Error recording medicine: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def verify_medicine(self, medicine_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Verify medicine information against its anchored Merkle inclusion proof"""
+        try:
+            medicine_id = medicine_data.get("_id")
+            medicine_hash = self._medicine_hash(medicine_data)
             
-            # In a real application, we would call the contract to verify the hash
-            # For demo purposes, we'll simulate the verification
+            inclusion = self.anchoring.verify("medicine", medicine_id, medicine_hash)
             
-            # Simulate verification result (in a real app, this would check the blockchain)
             return {
-                "verified": True,
+                **inclusion,
                 "medicine_id": medicine_id,
                 "medicine_hash": medicine_hash,
-                "blockchain_hash": medicine_hash,  # In a real app, this would come from the blockchain
-                "timestamp": self.web3.eth.get_block('latest').timestamp if self.web3.is_connected() else 0,
+                "blockchain_hash": inclusion.get("anchored_hash"),
+                "timestamp": self.latest_block_timestamp(),
                 "chain_id": self.chain_id
             }
         except Exception as e:
@@ -146,23 +241,279 @@ class BlockchainService:
     def get_transaction_status(self, tx_hash: str) -> Dict[str, Any]:
         """Get the status of a blockchain transaction"""
         try:
+            # Statuses of our own transactions are kept current by the confirmation tracker
+            record = db.blockchain_records_collection().find_one(
+                {"transaction_hash": tx_hash},
+                {"status": 1, "block_number": 1, "confirmations": 1, "error": 1}
+            ) or db.anchor_batches_collection().find_one(
+                {"transaction_hash": tx_hash},
+                {"status": 1, "block_number": 1, "confirmations": 1, "error": 1}
+            )
+            
+            if record:
+                return {
+                    "success": True,
+                    "transaction_hash": tx_hash,
+                    "status": "pending" if record.get("status") == "submitted" else record.get("status"),
+                    "block_number": record.get("block_number"),
+                    "confirmations": record.get("confirmations", 0),
+                    "error": record.get("error"),
+                    "timestamp": self.latest_block_timestamp()
+                }
+            
             if not self.web3:
                 return {"success": False, "error": "Blockchain connection not available"}
             
-            # In a real application, we would check the actual transaction status
-            # For demo purposes, we'll simulate a successful transaction
+            # Not one of ours, ask the node directly
+            receipt = self.web3.eth.get_transaction_receipt(tx_hash)
+            latest_block = self.block_tracker.block_number if self.block_tracker else 0
             
             return {
                 "success": True,
                 "transaction_hash": tx_hash,
-                "status": "confirmed",
-                "block_number": 12345678,
-                "confirmations": 10,
-                "timestamp": self.web3.eth.get_block('latest').timestamp if self.web3.is_connected() else 0
+                "status": "confirmed" if receipt.status == 1 else "failed",
+                "block_number": receipt.blockNumber,
+                "confirmations": max(latest_block - receipt.blockNumber + 1, 1) if latest_block else 1,
+                "timestamp": self.latest_block_timestamp()
             }
+        except TransactionNotFound:
+            return {"success": False, "transaction_hash": tx_hash, "status": "not_found"}
         except Exception as e:
             logger.error(f"Error getting transaction status: {e}")
             return {"success": False, "error": str(e)}
 
-# Create singleton instance
-blockchain_service = BlockchainService()
+    def list_records(self, user_id: str, limit: int = 50, cursor: Optional[str] = None) -> AsyncIOMotorCommandCursor:
+        """
+        One page of a user's blockchain records and verified diagnoses, newest first
+        A single aggregation joins in the medicine and the latest anchor leaf of each row;
+        the page has limit + 1 rows so callers can tell whether another page exists.
+        Returns an async cursor to iterate with async for
+        """
+        limit = max(1, min(limit, MAX_RECORDS_PAGE_SIZE))
+        match = {"user_id": user_id}
+        if cursor:
+            match["_id"] = {"$lt": ObjectId(cursor)}
+        # Medicine verification rows are anchored and indexed under the medicine itself
+        verification_type = {"$cond": [
+            {"$eq": ["$record_type", "medicine_verification"]}, "medicine", "$record_type"
+        ]}
+        
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"_id": -1}},
+            {"$limit": limit + 1},
+            {"$project": {
+                "record_type": 1,
+                "record_id": {"$ifNull": ["$metadata.medicine_id", {"$toString": "$_id"}]},
+                "data_hash": 1,
+                "transaction_hash": 1,
+                "status": 1,
+                "block_number": 1,
+                "confirmations": 1,
+                "metadata": 1,
+                "created_at": 1
+            }},
+            # Diagnoses are anchored without a blockchain_records row of their own
+            {"$unionWith": {"coll": "diagnoses", "pipeline": [
+                {"$match": {**match, "blockchain_verified": True}},
+                {"$sort": {"_id": -1}},
+                {"$limit": limit + 1},
+                {"$project": {
+                    "record_type": {"$literal": "diagnosis"},
+                    "record_id": {"$toString": "$_id"},
+                    "data_hash": "$blockchain_hash",
+                    "condition": {"$ifNull": ["$condition_name", "Unknown"]},
+                    "created_at": 1
+                }}
+            ]}},
+            {"$sort": {"_id": -1}},
+            {"$limit": limit + 1},
+            {"$lookup": {
+                "from": "medicines",
+                "let": {"medicine_id": {"$convert": {
+                    "input": "$metadata.medicine_id", "to": "objectId", "onError": None, "onNull": None
+                }}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$medicine_id"]}}},
+                    {"$project": {"_id": 0, "name": 1, "manufacturer": 1, "verified_on_blockchain": 1}}
+                ],
+                "as": "medicine"
+            }},
+            {"$lookup": {
+                "from": "anchor_leaves",
+                "let": {"anchor_type": verification_type, "record_id": "$record_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$and": [
+                        {"$eq": ["$record_type", "$$anchor_type"]},
+                        {"$eq": ["$record_id", "$$record_id"]}
+                    ]}}},
+                    {"$sort": {"_id": -1}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 0, "status": 1, "data_hash": 1, "root": 1, "root_block": 1, "transaction_hash": 1}}
+                ],
+                "as": "anchor"
+            }},
+            # Records written one per transaction, as indexed from their contract events
+            {"$lookup": {
+                "from": "chain_records",
+                "let": {"chain_record_id": {"$concat": [verification_type, ":", {"$toString": "$record_id"}]}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$chain_record_id"]}}},
+                    {"$project": {"_id": 0, "data_hash": 1, "block_number": 1, "transaction_hash": 1}}
+                ],
+                "as": "chain_record"
+            }},
+            {"$project": {
+                "_id": {"$toString": "$_id"},
+                "record_type": 1,
+                "record_id": 1,
+                "data_hash": 1,
+                "transaction_hash": 1,
+                "status": 1,
+                "block_number": 1,
+                "confirmations": 1,
+                "condition": 1,
+                "created_at": 1,
+                "medicine": {"$arrayElemAt": ["$medicine", 0]},
+                "anchor": {"$arrayElemAt": ["$anchor", 0]},
+                "chain_record": {"$arrayElemAt": ["$chain_record", 0]}
+            }}
+        ]
+        return async_db.blockchain_records_collection().aggregate(pipeline, batchSize=limit + 1)
+    
+    @staticmethod
+    def record_verification(record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Verification details of a list_records row
+        A mined Merkle anchor wins, then the indexed per-transaction chain record,
+        then the row's own transaction as tracked by the confirmation tracker,
+        then a row still queued for its anchor batch
+        """
+        anchor = record.pop("anchor", None)
+        chain_record = record.pop("chain_record", None)
+        expected = record.get("data_hash")
+        
+        if anchor and anchor.get("root_block") is not None:
+            return {
+                "verified": bool(expected) and anchor.get("data_hash") == expected,
+                "anchor_status": "confirmed",
+                "merkle_root": anchor.get("root"),
+                "block_number": anchor.get("root_block"),
+                "transaction_hash": anchor.get("transaction_hash")
+            }
+        if chain_record:
+            return {
+                "verified": bool(expected) and chain_record.get("data_hash") == expected,
+                "anchor_status": "confirmed",
+                "anchored_hash": chain_record.get("data_hash"),
+                "block_number": chain_record.get("block_number"),
+                "transaction_hash": chain_record.get("transaction_hash")
+            }
+        if anchor:
+            return {
+                "verified": False,
+                "anchor_status": "pending" if anchor.get("status") != "anchored" else "submitted",
+                "merkle_root": anchor.get("root"),
+                "transaction_hash": anchor.get("transaction_hash")
+            }
+        if record.get("transaction_hash"):
+            status = record.get("status")
+            return {
+                "verified": status == "confirmed",
+                "anchor_status": "pending" if status == "submitted" else status,
+                "block_number": record.get("block_number"),
+                "transaction_hash": record["transaction_hash"]
+            }
+        if record.get("status") == "queued":
+            # Waiting for its anchor batch to be submitted
+            return {"verified": False, "anchor_status": "pending"}
+        return {"verified": False, "anchor_status": "not_anchored"}
+    
+    def verify_records_bulk(self, records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Verify many records at once, keyed by record_id
+        Each record is a dict with record_type ("diagnosis" or "medicine"), record_id and the
+        data_hash to check. Merkle-anchored records are verified from one anchor_leaves query;
+        the rest share a single JSON-RPC batch of contract view calls.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        try:
+            entries = self.anchoring.get_inclusions([
+                (record["record_type"], record["record_id"], record.get("data_hash")) for record in records
+            ])
+            
+            on_chain = []
+            for record in records:
+                entry = entries.get((record["record_type"], record["record_id"]))
+                if entry and record.get("data_hash"):
+                    results[record["record_id"]] = self.anchoring.verify_entry(
+                        entry, record["record_type"], record["record_id"], record["data_hash"]
+                    )
+                else:
+                    on_chain.append(record)
+            
+            results.update(self._verify_on_chain_bulk(on_chain))
+        except Exception as e:
+            logger.error(f"Error verifying records in bulk: {e}")
+            for record in records:
+                results.setdefault(record["record_id"], {"verified": False, "error": str(e)})
+        
+        return results
+    
+    def _verify_on_chain_bulk(self, records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Check per-record contract entries with one batched eth_call request"""
+        if not records:
+            return {}
+        if not self.contract:
+            return {record["record_id"]: {"verified": False, "anchor_status": "not_found"} for record in records}
+        
+        calls = []
+        for record in records:
+            if record["record_type"] == "medicine":
+                function = self.contract.functions.isMedicineVerified(record["record_id"])
+            else:
+                function = self.contract.functions.getDiagnosisHash(record["record_id"])
+            calls.append((
+                "eth_call",
+                [{"to": self.contract.address, "data": function._encode_transaction_data()}, "latest"]
+            ))
+        
+        replies = self.rpc_batch(calls)
+        
+        results = {}
+        for record, reply in zip(records, replies):
+            # A reverted call (e.g. "Diagnosis not found") comes back as None
+            if not reply or reply == "0x":
+                results[record["record_id"]] = {"verified": False, "anchor_status": "not_found"}
+                continue
+            data = bytes.fromhex(reply[2:])
+            if record["record_type"] == "medicine":
+                (verified,) = self.web3.codec.decode(["bool"], data)
+                results[record["record_id"]] = {"verified": verified, "anchor_status": "confirmed"}
+            else:
+                (stored_hash,) = self.web3.codec.decode(["string"], data)
+                expected = record.get("data_hash")
+                results[record["record_id"]] = {
+                    # Without an expected hash there is nothing to compare the stored one to
+                    "verified": bool(expected) and stored_hash == expected,
+                    "anchor_status": "confirmed",
+                    "anchored_hash": stored_hash
+                }
+        return results
+    
+    def get_verification_details(self, record_id: str, record_type: str,
+                                 data_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Verify a single record; see verify_records_bulk"""
+        record = {"record_type": record_type, "record_id": record_id, "data_hash": data_hash}
+        return self.verify_records_bulk([record]).get(record_id, {"verified": False})
+    
+    def get_token_state(self, wallet_address: Optional[str] = None) -> Dict[str, float]:
+        """Get a wallet's MedToken balance and the total supply from the cached event index"""
+        try:
+            return self.token_state.get(wallet_address)
+        except Exception as e:
+            logger.error(f"Error getting token state: {e}")
+            return {"user_balance": 0.0, "total_supply": 0.0}
+
+# Singleton instance, created on first use
+blockchain_service = services.lazy("blockchain_service", BlockchainService)
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+NETWORK_NAMES = {
+    1: "mainnet",
+    5: "goerli",
+    137: "polygon",
+    1337: "localhost",
+    31337: "hardhat",
+    80001: "mumbai",
+    11155111: "sepolia"
+}
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+class RpcStats:
+    """
+    Rolling window of RPC call outcomes, recorded by the provider pool
+    Holds at most TELEMETRY_MAX_SAMPLES calls from the last TELEMETRY_WINDOW seconds
+    """
+
+    def __init__(self):
+        self.window = float(os.environ.get("TELEMETRY_WINDOW", 300))
+        # (monotonic time, latency in seconds, succeeded)
+        self._samples: deque = deque(maxlen=int(os.environ.get("TELEMETRY_MAX_SAMPLES", 10_000)))
+        self._lock = threading.Lock()
+
+    def record(self, elapsed: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), elapsed, ok))
+
+    def summary(self) -> Dict[str, Any]:
+        """Latency percentiles (ms) and error rate over the window"""
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            samples = list(self._samples)
+
+        latencies = sorted(elapsed * 1000 for _, elapsed, ok in samples if ok)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            "window_seconds": self.window,
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "latency_ms": {
+                "p50": round(_percentile(latencies, 0.50), 2),
+                "p95": round(_percentile(latencies, 0.95), 2),
+                "p99": round(_percentile(latencies, 0.99), 2)
+            } if latencies else None
+        }
+
+
+class ChainTelemetry:
+    """
+    Samples connection status and RPC health at a fixed cadence and serves the
+    last sample from memory.
+
+    Block data comes from the block header tracker and RPC stats from the
+    provider pool, so sampling adds no calls to the node and status polling
+    by the frontend or load balancers costs nothing at all.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService providing the provider pool, header tracker and pipeline
+        self.blockchain = blockchain
+        self.interval = float(os.environ.get("TELEMETRY_INTERVAL", 5))
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background sampling loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chain-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background sampling loop"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling chain telemetry: {e}")
+            self._stop.wait(self.interval)
+
+    def sample(self) -> Dict[str, Any]:
+        """Build a fresh status snapshot from in-memory state"""
+        blockchain = self.blockchain
+        pool = blockchain.provider_pool
+        header = blockchain.block_tracker.latest() if blockchain.block_tracker else None
+        transactions = blockchain.transactions
+
+        snapshot = {
+            "connected": bool(pool and pool.is_connected() and header),
+            "network_name": NETWORK_NAMES.get(blockchain.chain_id, f"chain-{blockchain.chain_id}"),
+            "chain_id": blockchain.chain_id,
+            "latest_block": header["block_number"] if header else 0,
+            "gas_price": str(header["gas_price"]) if header else "0",
+            "base_fee": str(header["base_fee"]) if header and header["base_fee"] is not None else None,
+            "block_age_seconds": max(int(time.time()) - header["timestamp"], 0) if header else None,
+            "rpc": pool.stats.summary() if pool else None,
+            "endpoints": pool.status() if pool else [],
+            "pending_transactions": transactions.pending_count() if transactions else 0,
+            "sampled_at": datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The last sample, taking the first one on demand"""
+        with self._lock:
+            snapshot = self._snapshot
+        return snapshot or self.sample()
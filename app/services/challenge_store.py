@@ -0,0 +1,147 @@
+import hashlib
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+import os
+from app.db.database import async_db
+
+logger = logging.getLogger(__name__)
+
+NONCE_PATTERN = re.compile(r"Nonce: ([0-9a-f]{32})$")
+
+def _digest(wallet_address: str, message: str) -> bytes:
+    return hashlib.blake2b(f"{wallet_address.lower()}\n{message}".encode("utf-8"), digest_size=16).digest()
+
+class ChallengeStore:
+    """
+    Outstanding Web3 login challenges.
+
+    Each challenge is a random nonce mapped to a 16-byte digest of the wallet
+    and the exact message issued, so web3-login can reject unknown, altered,
+    expired or reused messages with one dict lookup before any signature
+    recovery. Expiry uses a timer wheel with one slot per CHALLENGE_TICK
+    seconds: advancing the clock clears only the slots that passed, so expiry
+    costs O(1) per challenge and never scans the store. At most
+    CHALLENGE_MAX_OUTSTANDING challenges are kept; past that the slot closest
+    to expiry is dropped early.
+
+    With CHALLENGE_STORE=mongo challenges live in the auth_challenges
+    collection instead (TTL-indexed), so any worker can accept a challenge
+    another one issued.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.environ.get("AUTH_CHALLENGE_TTL", 300))
+        self.tick = float(os.environ.get("CHALLENGE_TICK", 1))
+        self.max_outstanding = int(os.environ.get("CHALLENGE_MAX_OUTSTANDING", 1_000_000))
+        self.use_mongo = os.environ.get("CHALLENGE_STORE", "memory").lower() == "mongo"
+        self._ttl_ticks = max(1, int(-(-self.ttl // self.tick)))
+        # nonce -> (digest, expiry tick)
+        self._challenges: Dict[str, Tuple[bytes, int]] = {}
+        # slot -> nonces expiring at the tick that maps to it
+        self._wheel: List[Set[str]] = [set() for _ in range(self._ttl_ticks + 1)]
+        self._current_tick = self._now_tick()
+        self._lock = threading.Lock()
+
+    def _now_tick(self) -> int:
+        return int(time.monotonic() // self.tick)
+
+    def _advance(self) -> None:
+        """Expire every slot whose tick has passed (caller holds the lock)"""
+        now_tick = self._now_tick()
+        if now_tick <= self._current_tick:
+            return
+        slots = len(self._wheel)
+        for tick in range(self._current_tick + 1, min(now_tick, self._current_tick + slots) + 1):
+            self._expire_slot(tick % slots)
+        self._current_tick = now_tick
+
+    def _expire_slot(self, slot: int) -> None:
+        for nonce in self._wheel[slot]:
+            self._challenges.pop(nonce, None)
+        self._wheel[slot] = set()
+
+    async def issue(self, wallet_address: str, message_for_nonce) -> str:
+        """
+        Create and store a challenge for a wallet
+        message_for_nonce builds the message to sign from the new nonce
+        """
+        nonce = secrets.token_hex(16)
+        message = message_for_nonce(nonce)
+        digest = _digest(wallet_address, message)
+
+        if self.use_mongo:
+            await async_db.auth_challenges_collection().insert_one({
+                "_id": nonce,
+                "digest": digest,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)
+            })
+            return message
+
+        with self._lock:
+            self._advance()
+            # Shed the challenges closest to expiry rather than grow without bound
+            ahead = 1
+            while len(self._challenges) >= self.max_outstanding and ahead < len(self._wheel):
+                self._expire_slot((self._current_tick + ahead) % len(self._wheel))
+                ahead += 1
+            expiry_tick = self._current_tick + self._ttl_ticks
+            self._challenges[nonce] = (digest, expiry_tick)
+            self._wheel[expiry_tick % len(self._wheel)].add(nonce)
+        return message
+
+    async def _lookup(self, message: Optional[str]) -> Tuple[Optional[str], Optional[bytes]]:
+        match = NONCE_PATTERN.search(message or "")
+        if not match:
+            return None, None
+        nonce = match.group(1)
+
+        if self.use_mongo:
+            challenge = await async_db.auth_challenges_collection().find_one(
+                {"_id": nonce, "expires_at": {"$gt": datetime.utcnow()}}, {"digest": 1}
+            )
+            return nonce, bytes(challenge["digest"]) if challenge else None
+
+        with self._lock:
+            self._advance()
+            entry = self._challenges.get(nonce)
+        return nonce, entry[0] if entry else None
+
+    async def is_valid(self, message: Optional[str], wallet_address: Optional[str]) -> bool:
+        """Check that a message is an outstanding, unaltered challenge issued to this wallet"""
+        if not wallet_address:
+            return False
+        _, digest = await self._lookup(message)
+        return digest is not None and secrets.compare_digest(digest, _digest(wallet_address, message))
+
+    async def consume(self, message: str, wallet_address: str) -> bool:
+        """
+        Remove a valid challenge so it cannot be replayed
+        Returns False if it was not outstanding (e.g. another login used it first)
+        """
+        if not await self.is_valid(message, wallet_address):
+            return False
+        nonce = NONCE_PATTERN.search(message).group(1)
+
+        if self.use_mongo:
+            result = await async_db.auth_challenges_collection().delete_one({"_id": nonce})
+            return result.deleted_count == 1
+
+        with self._lock:
+            entry = self._challenges.pop(nonce, None)
+            if entry:
+                self._wheel[entry[1] % len(self._wheel)].discard(nonce)
+        return entry is not None
+
+    def outstanding(self) -> int:
+        """Number of unexpired challenges held in memory"""
+        with self._lock:
+            self._advance()
+            return len(self._challenges)
+
+# Create singleton instance
+challenge_store = ChallengeStore()
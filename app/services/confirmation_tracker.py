@@ -0,0 +1,154 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+import os
+from pymongo import UpdateMany
+from app.db.database import db
+
+logger = logging.getLogger(__name__)
+
+class ConfirmationTracker:
+    """
+    Moves pending blockchain_records and anchor_batches to confirmed or failed.
+
+    Receipts for every pending transaction are fetched in one JSON-RPC batch
+    per new block, and statuses are written back with bulk updates, so node and
+    database load follow the number of pending transactions and the block rate
+    rather than how often clients ask for a status.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService providing the RPC provider pool and the block header tracker
+        self.blockchain = blockchain
+        self.required_confirmations = int(os.environ.get("TX_REQUIRED_CONFIRMATIONS", 3))
+        self.min_interval = float(os.environ.get("CONFIRMATION_MIN_INTERVAL", 2))
+        self.max_interval = float(os.environ.get("CONFIRMATION_MAX_INTERVAL", 30))
+        self.drop_after = timedelta(seconds=float(os.environ.get("TX_DROP_AFTER", 3600)))
+        self.batch_limit = int(os.environ.get("CONFIRMATION_BATCH_LIMIT", 500))
+        self._last_block: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background reconcile loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="confirmation-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background reconcile loop"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.max_interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        interval = self.min_interval
+        while not self._stop.wait(interval):
+            try:
+                pending = self.reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling transaction confirmations: {e}")
+                pending = 0
+            # Poll at block pace while anything is pending, back off when idle
+            interval = self.min_interval if pending else min(interval * 2, self.max_interval)
+
+    def _pending_transactions(self) -> Dict[str, List[str]]:
+        """
+        Map each pending transaction hash to every hash sent at its nonce
+        A replaced transaction can still be mined, so its hash is polled along with the replacement
+        """
+        query = {"status": {"$in": ["pending", "submitted"]}, "transaction_hash": {"$ne": None}}
+        projection = {"transaction_hash": 1, "replaced_transaction_hashes": 1}
+        pending: Dict[str, List[str]] = {}
+        for collection in (db.blockchain_records_collection(), db.anchor_batches_collection()):
+            for record in collection.find(query, projection):
+                hashes = pending.setdefault(record["transaction_hash"], [record["transaction_hash"]])
+                hashes.extend(h for h in record.get("replaced_transaction_hashes", []) if h not in hashes)
+        return {tx_hash: pending[tx_hash] for tx_hash in sorted(pending)[:self.batch_limit]}
+
+    def reconcile(self) -> int:
+        """
+        Poll receipts for all pending transactions in one batch and update their records
+        Returns the number of transactions still pending
+        """
+        pending = self._pending_transactions()
+        if not pending:
+            return 0
+
+        latest_block = self.blockchain.block_tracker.block_number if self.blockchain.block_tracker else 0
+        if latest_block and latest_block == self._last_block:
+            # No new block, so no receipt or confirmation count can have changed
+            return len(pending)
+        self._last_block = latest_block
+
+        hashes = [h for candidates in pending.values() for h in candidates]
+        receipts = dict(zip(hashes, self.blockchain.rpc_batch(
+            [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes]
+        )))
+
+        now = datetime.utcnow()
+        updates = []
+        mined_replaced = []
+        unmined = []
+        still_pending = 0
+        for tx_hash, candidates in pending.items():
+            # At most one transaction per nonce is mined, whichever of them it was
+            mined_hash = next((h for h in candidates if receipts.get(h)), None)
+            fields = self._status_fields(receipts[mined_hash], latest_block) if mined_hash else None
+            if fields is None or "status" not in fields:
+                still_pending += 1
+            if fields is None:
+                unmined.append(tx_hash)
+                continue
+            if mined_hash != tx_hash:
+                # The original beat its replacement; point the records back at it
+                fields["transaction_hash"] = mined_hash
+                mined_replaced.append(
+                    UpdateMany({"transaction_hash": tx_hash}, {"$set": {"transaction_hash": mined_hash}})
+                )
+            fields["updated_at"] = now
+            updates.append(UpdateMany({"transaction_hash": tx_hash}, {"$set": fields}))
+
+        # Transactions the node never mined within the drop window are failed
+        dropped_filter = {
+            "status": {"$in": ["pending", "submitted"]},
+            "transaction_hash": {"$in": unmined},
+            "created_at": {"$lt": now - self.drop_after}
+        }
+        dropped_update = {"$set": {"status": "failed", "error": "dropped", "updated_at": now}}
+
+        for collection in (db.blockchain_records_collection(), db.anchor_batches_collection()):
+            if updates:
+                collection.bulk_write(updates, ordered=False)
+            collection.update_many(dropped_filter, dropped_update)
+        if mined_replaced:
+            db.anchor_leaves_collection().bulk_write(mined_replaced, ordered=False)
+
+        # Let streaming clients see the new statuses without waiting for a tick
+        self.blockchain.transaction_watcher.notify()
+
+        return still_pending
+
+    def _status_fields(self, receipt: Optional[Dict[str, Any]], latest_block: int) -> Optional[Dict[str, Any]]:
+        """Map a raw JSON-RPC receipt to record fields, None if not mined yet"""
+        if not receipt:
+            return None
+
+        block_number = int(receipt["blockNumber"], 16)
+        confirmations = max(latest_block - block_number + 1, 1) if latest_block else 1
+        fields = {
+            "block_number": block_number,
+            "confirmations": confirmations,
+            "gas_used": int(receipt.get("gasUsed", "0x0"), 16)
+        }
+
+        if int(receipt.get("status", "0x1"), 16) == 0:
+            fields["status"] = "failed"
+            fields["error"] = "reverted"
+        elif confirmations >= self.required_confirmations:
+            fields["status"] = "confirmed"
+        return fields
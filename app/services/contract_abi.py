@@ -0,0 +1,128 @@
+# ABI fragments for the functions and events the backend calls on
+# blockchain/contracts. Keep these in sync with the Solidity sources.
+
+MEDICAL_RECORDS_ABI = [
+    {
+        "type": "function",
+        "name": "anchorRoot",
+        "stateMutability": "nonpayable",
+        "inputs": [
+            {"name": "root", "type": "bytes32"},
+            {"name": "leafCount", "type": "uint256"}
+        ],
+        "outputs": []
+    },
+    {
+        "type": "function",
+        "name": "anchoredRoots",
+        "stateMutability": "view",
+        "inputs": [{"name": "", "type": "bytes32"}],
+        "outputs": [{"name": "", "type": "uint256"}]
+    },
+    {
+        "type": "function",
+        "name": "verifyInclusion",
+        "stateMutability": "view",
+        "inputs": [
+            {"name": "leaf", "type": "bytes32"},
+            {"name": "proof", "type": "bytes32[]"},
+            {"name": "root", "type": "bytes32"}
+        ],
+        "outputs": [{"name": "", "type": "bool"}]
+    },
+    {
+        "type": "function",
+        "name": "getDiagnosisHash",
+        "stateMutability": "view",
+        "inputs": [{"name": "diagnosisId", "type": "string"}],
+        "outputs": [{"name": "", "type": "string"}]
+    },
+    {
+        "type": "function",
+        "name": "isMedicineVerified",
+        "stateMutability": "view",
+        "inputs": [{"name": "medicineId", "type": "string"}],
+        "outputs": [{"name": "", "type": "bool"}]
+    },
+    {
+        "type": "event",
+        "name": "DiagnosisRecorded",
+        "anonymous": False,
+        "inputs": [
+            {"name": "diagnosisId", "type": "string", "indexed": False},
+            {"name": "dataHash", "type": "string", "indexed": False},
+            {"name": "timestamp", "type": "uint256", "indexed": False}
+        ]
+    },
+    {
+        "type": "event",
+        "name": "MedicineVerified",
+        "anonymous": False,
+        "inputs": [
+            {"name": "medicineId", "type": "string", "indexed": False},
+            {"name": "dataHash", "type": "string", "indexed": False},
+            {"name": "timestamp", "type": "uint256", "indexed": False}
+        ]
+    },
+    {
+        "type": "event",
+        "name": "RootAnchored",
+        "anonymous": False,
+        "inputs": [
+            {"name": "root", "type": "bytes32", "indexed": True},
+            {"name": "leafCount", "type": "uint256", "indexed": False},
+            {"name": "timestamp", "type": "uint256", "indexed": False}
+        ]
+    }
+]
+
+MED_TOKEN_ABI = [
+    {
+        "type": "function",
+        "name": "balanceOf",
+        "stateMutability": "view",
+        "inputs": [{"name": "account", "type": "address"}],
+        "outputs": [{"name": "", "type": "uint256"}]
+    },
+    {
+        "type": "function",
+        "name": "totalSupply",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "uint256"}]
+    },
+    {
+        "type": "function",
+        "name": "mintReward",
+        "stateMutability": "nonpayable",
+        "inputs": [
+            {"name": "to", "type": "address"},
+            {"name": "amount", "type": "uint256"},
+            {"name": "reason", "type": "string"}
+        ],
+        "outputs": []
+    },
+    {
+        "type": "event",
+        "name": "Transfer",
+        "anonymous": False,
+        "inputs": [
+            {"name": "from", "type": "address", "indexed": True},
+            {"name": "to", "type": "address", "indexed": True},
+            {"name": "value", "type": "uint256", "indexed": False}
+        ]
+    },
+    {
+        "type": "event",
+        "name": "RewardMinted",
+        "anonymous": False,
+        "inputs": [
+            {"name": "to", "type": "address", "indexed": True},
+            {"name": "amount", "type": "uint256", "indexed": False},
+            {"name": "reason", "type": "string", "indexed": False}
+        ]
+    }
+]
+
+# MedToken uses the ERC20 default of 18 decimals
+MED_TOKEN_DECIMALS = 18
@@ -2,43 +2,64 @@ from typing import Dict, Any, List, Optional
 import logging
 import requests
 import os
-import json
 import random
+import asyncio
 from datetime import datetime
-from app.db.database import db
-from app.services.blockchain_service import blockchain_service
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.container import services
+from app.db.database import async_db, db
+from app.services.principal_cache import principal_cache
+from app.utils.symptom_extractor import symptom_extractor
 
 logger = logging.getLogger(__name__)
 
+# Fields returned for each row of the diagnosis history listing
+HISTORY_PROJECTION = {
+    "condition_name": 1,
+    "confidence_score": 1,
+    "status": 1,
+    "blockchain_verified": 1,
+    "created_at": 1
+}
+
+MAX_HISTORY_PAGE_SIZE = 100
+
+# Number of diagnosis ids stored per medical history bucket document
+HISTORY_BUCKET_SIZE = int(os.environ.get("HISTORY_BUCKET_SIZE", 200))
+
 class DiagnosisService:
     def __init__(self):
         self.huggingface_api_key = os.environ.get("HUGGINGFACE_API_KEY")
         self.huggingface_api_url = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
         self.headers = {"Authorization": f"Bearer {self.huggingface_api_key}"}
     
-    def generate_diagnosis(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def generate_diagnosis(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate a diagnosis based on symptoms using AI
         Falls back to rule-based approach if AI model is unavailable
+        The model call is blocking HTTP, so it runs in a worker thread
         """
         try:
             symptoms = request_data.get("symptoms", [])
             medical_history = request_data.get("medical_history", "")
             
+            # Normalize free-text complaints into canonical symptoms; the history describes
+            # past conditions, so it goes to the model as context but is never extracted.
+            # When nothing is recognized, the rules still see the raw symptom text
+            extracted_symptoms = symptom_extractor.extract_all(symptoms)
+            
             # If we have a Hugging Face API key, use the model
             if self.huggingface_api_key:
-                diagnosis = self._generate_ai_diagnosis(symptoms, medical_history)
+                diagnosis = await asyncio.to_thread(
+                    self._generate_ai_diagnosis, symptoms, medical_history, extracted_symptoms
+                )
             else:
                 # Fall back to rule-based approach
-                diagnosis = self._generate_rule_based_diagnosis(symptoms)
+                diagnosis = self._generate_rule_based_diagnosis(extracted_symptoms or symptoms)
             
-            # Add blockchain verification if requested
-            if request_data.get("verify_on_blockchain", False):
-                blockchain_verification = self._verify_diagnosis_on_blockchain(
-                    diagnosis=diagnosis,
-                    user_id=request_data.get("user_id")
-                )
-                diagnosis["blockchain_verification"] = blockchain_verification
+            diagnosis["extracted_symptoms"] = extracted_symptoms
             
             return diagnosis
         except Exception as e:
@@ -49,16 +70,24 @@ class DiagnosisService:
                 "error": str(e)
             }
     
-    def _generate_ai_diagnosis(self, symptoms: List[str], medical_history: str) -> Dict[str, Any]:
+    def _generate_ai_diagnosis(self, symptoms: List[str], medical_history: str,
+                               extracted_symptoms: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Generate diagnosis using Hugging Face model
         """
+        if extracted_symptoms is None:
+            extracted_symptoms = symptom_extractor.extract_all(symptoms)
+        # Symptoms the extractor does not know may still be exact rule keys
+        rule_symptoms = extracted_symptoms or symptoms
+        
         try:
             # Prepare input for the model
             symptoms_text = ", ".join(symptoms)
             input_text = f"Patient symptoms: {symptoms_text}. "
             if medical_history:
-                input_text += f"Medical history: {medical_history}."
+                input_text += f"Medical history: {medical_history}. "
+            if extracted_symptoms:
+                input_text += f"Identified symptoms: {', '.join(extracted_symptoms)}."
             
             # Define possible conditions for classification
             candidate_conditions = [
@@ -97,11 +126,11 @@ class DiagnosisService:
             else:
                 logger.warning(f"Hugging Face API error: {response.text}")
                 # Fall back to rule-based approach
-                return self._generate_rule_based_diagnosis(symptoms)
+                return self._generate_rule_based_diagnosis(rule_symptoms)
                 
         except Exception as e:
             logger.error(f"Error in AI diagnosis: {e}")
-            return self._generate_rule_based_diagnosis(symptoms)
+            return self._generate_rule_based_diagnosis(rule_symptoms)
     
     def _generate_rule_based_diagnosis(self, symptoms: List[str]) -> Dict[str, Any]:
         """
@@ -135,7 +164,7 @@ class DiagnosisService:
         condition_counts = {}
         
         for symptom in symptoms:
-            symptom = symptom.lower()
+            symptom = str(symptom).strip().lower()
             if symptom in symptom_to_condition:
                 for condition in symptom_to_condition[symptom]:
                     condition_counts[condition] = condition_counts.get(condition, 0) + 1
@@ -171,54 +200,273 @@ class DiagnosisService:
             "differential_diagnoses": differential
         }
     
-    def _verify_diagnosis_on_blockchain(self, diagnosis: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    async def get_diagnosis_by_id(self, diagnosis_id: str) -> Optional[Dict[str, Any]]:
         """
-        Verify diagnosis on blockchain
+        Get a diagnosis by ID
         """
         try:
-            # Prepare data for blockchain storage (exclude sensitive fields)
-            blockchain_data = {
-                "diagnosis": diagnosis.get("diagnosis"),
-                "confidence": diagnosis.get("confidence"),
-                "timestamp": datetime.utcnow().isoformat(),
-                "user_id_hash": hash(user_id)  # Use hash to protect user identity
-            }
+            diagnosis = await async_db.diagnoses_collection().find_one({"_id": diagnosis_id})
+            return diagnosis
+        except Exception as e:
+            logger.error(f"Error getting diagnosis: {e}")
+            return None
+    
+    async def get_user_diagnoses(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get diagnoses for a specific user
+        """
+        try:
+            cursor = async_db.diagnoses_collection().find({"user_id": user_id}).sort("created_at", -1).limit(limit)
+            return await cursor.to_list(length=limit)
+        except Exception as e:
+            logger.error(f"Error getting user diagnoses: {e}")
+            return []
+
+    async def get_diagnosis_history(self, user_id: str, limit: int = 20,
+                                    cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of projected diagnosis summaries, newest first
+        Pass the returned next_cursor to fetch the following page
+        """
+        try:
+            limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+            query = {"user_id": user_id}
+            if cursor:
+                query["_id"] = {"$lt": ObjectId(cursor)}
             
-            # Store hash on blockchain
-            result = blockchain_service.store_diagnosis_hash(
-                diagnosis_id=f"diagnosis_{datetime.utcnow().timestamp()}",
-                diagnosis_data=blockchain_data
+            # Fetch one extra row to know whether another page exists
+            rows = await (
+                async_db.diagnoses_collection()
+                .find(query, HISTORY_PROJECTION)
+                .sort("_id", -1)
+                .limit(limit + 1)
+                .to_list(length=limit + 1)
             )
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            items = [
+                {
+                    "id": str(row["_id"]),
+                    "condition_name": row.get("condition_name"),
+                    "confidence_score": row.get("confidence_score"),
+                    "status": row.get("status"),
+                    "blockchain_verified": row.get("blockchain_verified", False),
+                    "created_at": row.get("created_at")
+                }
+                for row in rows
+            ]
             
-            return result
-        except Exception as e:
-            logger.error(f"Error verifying diagnosis on blockchain: {e}")
             return {
-                "error": "Blockchain verification failed",
-                "details": str(e)
+                "items": items,
+                "next_cursor": items[-1]["id"] if has_more else None
             }
+        except Exception as e:
+            logger.error(f"Error getting diagnosis history: {e}")
+            return {"items": [], "next_cursor": None, "error": str(e)}
     
-    def get_diagnosis_by_id(self, diagnosis_id: str) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _condition_key(condition: Optional[str]) -> str:
+        """Make a condition name safe to use as a field name in an update path"""
+        return (condition or "Unknown").replace(".", "_").replace("$", "_")
+    
+    async def record_diagnosis_rollup(self, user_id: str, condition: Optional[str],
+                                      created_at: datetime, verified: bool = False) -> None:
         """
-        Get a diagnosis by ID
+        Fold a newly written diagnosis into the user's history rollup
         """
         try:
-            diagnosis = db.diagnoses_collection().find_one({"_id": diagnosis_id})
-            return diagnosis
+            await async_db.diagnosis_rollups_collection().update_one(
+                {"_id": user_id},
+                {
+                    "$inc": {
+                        "total": 1,
+                        "verified": 1 if verified else 0,
+                        f"by_condition.{self._condition_key(condition)}": 1
+                    },
+                    "$max": {"last_visit": created_at},
+                    "$set": {"updated_at": datetime.utcnow()}
+                },
+                upsert=True
+            )
         except Exception as e:
-            logger.error(f"Error getting diagnosis: {e}")
+            logger.error(f"Error updating diagnosis rollup: {e}")
+    
+    async def record_verification_rollup(self, user_id: str) -> None:
+        """
+        Count a diagnosis that just became blockchain verified in the user's rollup
+        """
+        try:
+            await async_db.diagnosis_rollups_collection().update_one(
+                {"_id": user_id},
+                {
+                    "$inc": {"verified": 1},
+                    "$set": {"updated_at": datetime.utcnow()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error updating diagnosis rollup: {e}")
+    
+    async def get_diagnosis_summary(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get the precomputed history rollup for a user
+        """
+        try:
+            rollup = await async_db.diagnosis_rollups_collection().find_one({"_id": user_id}) or {}
+            total = rollup.get("total", 0)
+            verified = rollup.get("verified", 0)
+            
+            return {
+                "total_diagnoses": total,
+                "by_condition": rollup.get("by_condition", {}),
+                "last_visit": rollup.get("last_visit"),
+                "verified_diagnoses": verified,
+                "verification_coverage": round(verified / total, 4) if total else 0.0
+            }
+        except Exception as e:
+            logger.error(f"Error getting diagnosis summary: {e}")
+            return {"error": str(e)}
+
+    async def append_medical_history(self, user_id: str, diagnosis_id: str) -> Optional[str]:
+        """
+        Append a diagnosis id to the user's latest history bucket
+        A new bucket is started once the latest one holds HISTORY_BUCKET_SIZE ids
+        Returns the id of the bucket that received the diagnosis
+        """
+        try:
+            bucket = await self._append_to_open_bucket(user_id, diagnosis_id)
+            bucket_id = str(bucket["_id"])
+            
+            # The user document only keeps a constant-size pointer and counter
+            await async_db.users_collection().update_one(
+                {"_id": ObjectId(user_id)},
+                {
+                    "$set": {"latest_history_bucket": bucket_id},
+                    "$inc": {"medical_history_count": 1}
+                }
+            )
+            principal_cache.invalidate(user_id)
+            
+            return bucket_id
+        except Exception as e:
+            logger.error(f"Error appending medical history: {e}")
             return None
     
-    def get_user_diagnoses(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    async def _append_to_open_bucket(self, user_id: str, diagnosis_id: str) -> Dict[str, Any]:
         """
-        Get diagnoses for a specific user
+        Push a diagnosis id into the user's open bucket, creating it if needed
+        A unique partial index allows one open bucket per user; the append that
+        fills a bucket closes it, so the next one starts a new bucket
+        """
+        now = datetime.utcnow()
+        update = [
+            {"$set": {
+                "diagnosis_ids": {"$concatArrays": [{"$ifNull": ["$diagnosis_ids", []]}, [diagnosis_id]]},
+                "count": {"$add": [{"$ifNull": ["$count", 0]}, 1]},
+                "created_at": {"$ifNull": ["$created_at", now]},
+                "updated_at": now
+            }},
+            {"$set": {"open": {"$lt": ["$count", HISTORY_BUCKET_SIZE]}}}
+        ]
+        for attempt in range(2):
+            try:
+                return await async_db.medical_history_buckets_collection().find_one_and_update(
+                    {"user_id": user_id, "open": True},
+                    update,
+                    projection={"_id": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # A concurrent append opened the bucket first; append to that one
+                if attempt:
+                    raise
+    
+    async def get_medical_history_bucket(self, user_id: str,
+                                         bucket_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get the diagnosis ids in one history bucket, newest first
+        Defaults to the latest bucket; next_cursor points at the previous one
         """
         try:
-            cursor = db.diagnoses_collection().find({"user_id": user_id}).sort("created_at", -1).limit(limit)
-            return list(cursor)
+            query = {"user_id": user_id}
+            if bucket_id:
+                query["_id"] = {"$lte": ObjectId(bucket_id)}
+            
+            buckets = await (
+                async_db.medical_history_buckets_collection()
+                .find(query, {"diagnosis_ids": 1})
+                .sort("_id", -1)
+                .limit(2)
+                .to_list(length=2)
+            )
+            
+            if not buckets:
+                return {"diagnosis_ids": [], "next_cursor": None}
+            
+            return {
+                "bucket_id": str(buckets[0]["_id"]),
+                "diagnosis_ids": list(reversed(buckets[0].get("diagnosis_ids", []))),
+                "next_cursor": str(buckets[1]["_id"]) if len(buckets) > 1 else None
+            }
         except Exception as e:
-            logger.error(f"Error getting user diagnoses: {e}")
-            return []
+            logger.error(f"Error getting medical history bucket: {e}")
+            return {"diagnosis_ids": [], "next_cursor": None, "error": str(e)}
+    
+    def migrate_legacy_medical_history(self, batch_size: int = 100) -> int:
+        """
+        Move diagnosis ids from the old unbounded users.medical_history array into buckets
+        Returns the number of users migrated; run it with scripts/migrate_medical_history.py
+        """
+        migrated = 0
+        try:
+            cursor = db.users_collection().find(
+                {"medical_history": {"$exists": True}},
+                {"medical_history": 1}
+            ).batch_size(batch_size)
+            
+            for user in cursor:
+                user_id = str(user["_id"])
+                # Concurrent $push calls could land out of order; buckets hold ids oldest first.
+                # Ids carry their creation time; unparseable ones go first, in their stored order
+                history = sorted(user.get("medical_history") or [], key=self._legacy_entry_time)
+                now = datetime.utcnow()
+                
+                buckets = [
+                    {
+                        "user_id": user_id,
+                        "diagnosis_ids": history[start:start + HISTORY_BUCKET_SIZE],
+                        "count": len(history[start:start + HISTORY_BUCKET_SIZE]),
+                        # Closed, so they never clash with an open bucket appends already started
+                        "open": False,
+                        "created_at": now,
+                        "updated_at": now
+                    }
+                    for start in range(0, len(history), HISTORY_BUCKET_SIZE)
+                ]
+                
+                update = {"$unset": {"medical_history": ""}}
+                if buckets:
+                    result = db.medical_history_buckets_collection().insert_many(buckets, ordered=True)
+                    update["$set"] = {"latest_history_bucket": str(result.inserted_ids[-1])}
+                    update["$inc"] = {"medical_history_count": len(history)}
+                
+                db.users_collection().update_one({"_id": user["_id"]}, update)
+                migrated += 1
+        except Exception as e:
+            logger.error(f"Error migrating medical history: {e}")
+        
+        return migrated
+
+    @staticmethod
+    def _legacy_entry_time(diagnosis_id: Any) -> datetime:
+        """Creation time of a legacy medical_history entry, from its diagnosis ObjectId"""
+        if isinstance(diagnosis_id, ObjectId):
+            return diagnosis_id.generation_time.replace(tzinfo=None)
+        if ObjectId.is_valid(diagnosis_id):
+            return ObjectId(diagnosis_id).generation_time.replace(tzinfo=None)
+        return datetime.min
 
-# Create singleton instance
-diagnosis_service = DiagnosisService()
+# Singleton instance, created on first use
+diagnosis_service = services.lazy("diagnosis_service", DiagnosisService)
@@ -0,0 +1,207 @@
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import logging
+import os
+from bson.decimal128 import Decimal128
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from web3 import Web3
+from app.db.database import db
+
+logger = logging.getLogger(__name__)
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+CHECKPOINT_ID = "contract_events"
+
+class EventIndexer:
+    """
+    Copies MedicalRecords and MedToken logs into local collections.
+
+    Logs are fetched with eth_getLogs in block-range batches and only up to
+    latest - INDEXER_CONFIRMATION_DEPTH, so blocks that can still be reorged
+    out are never indexed. Progress is kept in indexer_checkpoints and every
+    write is idempotent, so a restart resumes from the last checkpoint.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService providing web3, both contracts and the block header tracker
+        self.blockchain = blockchain
+        self.confirmation_depth = int(os.environ.get("INDEXER_CONFIRMATION_DEPTH", 12))
+        self.block_range = int(os.environ.get("INDEXER_BLOCK_RANGE", 2000))
+        self.start_block = int(os.environ.get("INDEXER_START_BLOCK", 0))
+        self.poll_interval = float(os.environ.get("INDEXER_POLL_INTERVAL", 5))
+        self._events: Dict[bytes, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_events(self) -> None:
+        """Map each event's topic0 to its decoder"""
+        self._events = {}
+        for contract in (self.blockchain.contract, self.blockchain.token_contract):
+            if not contract:
+                continue
+            for event_abi in [item for item in contract.abi if item["type"] == "event"]:
+                signature = f"{event_abi['name']}({','.join(i['type'] for i in event_abi['inputs'])})"
+                topic = bytes(self.blockchain.web3.keccak(text=signature))
+                self._events[topic] = getattr(contract.events, event_abi["name"])()
+
+    def start(self) -> None:
+        """Start the background indexing loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._load_events()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background indexing loop"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                # Catch up range by range, then wait for new blocks
+                while self.index_next_range():
+                    if self._stop.is_set():
+                        return
+            except Exception as e:
+                logger.error(f"Error indexing contract events: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def _addresses(self) -> List[str]:
+        return [c.address for c in (self.blockchain.contract, self.blockchain.token_contract) if c]
+
+    def index_next_range(self) -> bool:
+        """
+        Index the next block range up to the confirmed head
+        Returns True if a range was indexed and more may be waiting
+        """
+        addresses = self._addresses()
+        tracker = self.blockchain.block_tracker
+        if not addresses or not tracker or not tracker.block_number:
+            return False
+
+        safe_head = tracker.block_number - self.confirmation_depth
+        checkpoint = db.indexer_checkpoints_collection().find_one({"_id": CHECKPOINT_ID}) or {}
+        from_block = checkpoint.get("last_block", self.start_block - 1) + 1
+        if from_block > safe_head:
+            return False
+        to_block = min(from_block + self.block_range - 1, safe_head)
+
+        logs = self.blockchain.web3.eth.get_logs({
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": addresses
+        })
+        self._apply(logs)
+
+        db.indexer_checkpoints_collection().update_one(
+            {"_id": CHECKPOINT_ID},
+            {"$set": {"last_block": to_block, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        return to_block < safe_head
+
+    def _apply(self, logs: List[Any]) -> None:
+        records = []
+        roots = []
+        transfers = []
+        for log in logs:
+            decoder = self._events.get(bytes(log["topics"][0])) if log["topics"] else None
+            if not decoder:
+                continue
+            event = decoder.process_log(log)
+            meta = {
+                "block_number": log["blockNumber"],
+                "transaction_hash": Web3.to_hex(log["transactionHash"]),
+                "log_index": log["logIndex"]
+            }
+            args = event["args"]
+            if event["event"] == "DiagnosisRecorded":
+                records.append(("diagnosis", args["diagnosisId"], args["dataHash"], args["timestamp"], meta))
+            elif event["event"] == "MedicineVerified":
+                records.append(("medicine", args["medicineId"], args["dataHash"], args["timestamp"], meta))
+            elif event["event"] == "RootAnchored":
+                roots.append((bytes(args["root"]).hex(), args["leafCount"], args["timestamp"], meta))
+            elif event["event"] == "Transfer":
+                transfers.append((args["from"], args["to"], args["value"], meta))
+
+        if records:
+            db.chain_records_collection().bulk_write([
+                UpdateOne(
+                    {"_id": f"{record_type}:{record_id}"},
+                    {"$set": {
+                        "record_type": record_type,
+                        "record_id": record_id,
+                        "data_hash": data_hash,
+                        "timestamp": timestamp,
+                        **meta
+                    }},
+                    upsert=True
+                )
+                for record_type, record_id, data_hash, timestamp, meta in records
+            ], ordered=True)
+
+        if roots:
+            # Mark every leaf under an anchored root, so verification is a single leaf lookup
+            db.anchor_leaves_collection().bulk_write([
+                UpdateMany(
+                    {"root": root},
+                    {"$set": {"root_block": meta["block_number"], "root_timestamp": timestamp}}
+                )
+                for root, _, timestamp, meta in roots
+            ], ordered=False)
+
+        if transfers:
+            self._apply_transfers(transfers)
+
+    def _apply_transfers(self, transfers: List[Any]) -> None:
+        """Fold Transfer events into per-wallet balances and the total supply"""
+        db.token_transfers_collection().bulk_write([
+            UpdateOne(
+                {"_id": f"{meta['transaction_hash']}:{meta['log_index']}"},
+                {"$set": {"from": sender, "to": receiver, "value": str(value), **meta}},
+                upsert=True
+            )
+            for sender, receiver, value, meta in transfers
+        ], ordered=False)
+
+        deltas: Dict[str, int] = {}
+        for sender, receiver, value, _ in transfers:
+            deltas[sender] = deltas.get(sender, 0) - value
+            deltas[receiver] = deltas.get(receiver, 0) + value
+
+        # Position of the last transfer in this batch; a balance only moves if it
+        # has not seen this position yet, which keeps replays after a crash idempotent
+        last = transfers[-1][3]
+        position = last["block_number"] * 1_000_000 + last["log_index"]
+
+        supply_delta = -deltas.pop(ZERO_ADDRESS, 0)
+        if supply_delta:
+            deltas["total_supply"] = supply_delta
+
+        for address, delta in deltas.items():
+            if not delta:
+                continue
+            try:
+                db.token_balances_collection().update_one(
+                    {"_id": address.lower(), "position": {"$not": {"$gte": position}}},
+                    {
+                        "$inc": {"balance": Decimal128(Decimal(delta))},
+                        "$set": {"position": position, "updated_at": datetime.utcnow()}
+                    },
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                # Already applied before a restart
+                pass
+
+        # Cached balances in this process pick up the change on their next read
+        self.blockchain.token_state.invalidate(deltas)
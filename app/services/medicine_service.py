@@ -2,7 +2,8 @@ import logging
 import random
 from typing import Dict, Any, List, Optional
 from bson import ObjectId
-from app.db.database import db
+from app.core.container import services
+from app.db.database import async_db
 
 logger = logging.getLogger(__name__)
 
@@ -10,12 +11,12 @@ class MedicineService:
     def __init__(self):
         pass
     
-    def search_medicines(self, diagnosis: Optional[str] = None, 
-                         location: Optional[str] = None,
-                         name: Optional[str] = None,
-                         ingredients: Optional[str] = None,
-                         limit: int = 10,
-                         skip: int = 0) -> List[Dict[str, Any]]:
+    async def search_medicines(self, diagnosis: Optional[str] = None, 
+                               location: Optional[str] = None,
+                               name: Optional[str] = None,
+                               ingredients: Optional[str] = None,
+                               limit: int = 10,
+                               skip: int = 0) -> List[Dict[str, Any]]:
         """
         Search for medicines based on various criteria
         """
@@ -37,14 +38,11 @@ class MedicineService:
                 query["ingredients"] = {"$in": ingredients_list}
             
             # Execute query
-            cursor = db.medicines_collection().find(query).skip(skip).limit(limit)
-            medicines = list(cursor)
+            cursor = async_db.medicines_collection().find(query).skip(skip).limit(limit)
+            medicines = await cursor.to_list(length=limit)
             
-            # Convert ObjectId to string for JSON serialization
+            # Filter prices by location if provided
             for medicine in medicines:
-                medicine["_id"] = str(medicine["_id"])
-                
-                # Filter prices by location if provided
                 if location and "prices" in medicine:
                     medicine["prices"] = [
                         price for price in medicine["prices"] 
@@ -56,10 +54,10 @@ class MedicineService:
             logger.error(f"Error searching medicines: {e}")
             return []
     
-    def get_medicines_by_diagnosis(self, diagnosis: str, 
-                                  location: Optional[str] = None,
-                                  limit: int = 10,
-                                  skip: int = 0) -> List[Dict[str, Any]]:
+    async def get_medicines_by_diagnosis(self, diagnosis: str, 
+                                        location: Optional[str] = None,
+                                        limit: int = 10,
+                                        skip: int = 0) -> List[Dict[str, Any]]:
         """
         Get medicines recommended for a specific diagnosis
         """
@@ -67,14 +65,11 @@ class MedicineService:
             # Find medicines that treat this condition
             query = {"conditions": {"$regex": diagnosis, "$options": "i"}}
             
-            cursor = db.medicines_collection().find(query).skip(skip).limit(limit)
-            medicines = list(cursor)
+            cursor = async_db.medicines_collection().find(query).skip(skip).limit(limit)
+            medicines = await cursor.to_list(length=limit)
             
-            # Convert ObjectId to string for JSON serialization
+            # Filter prices by location if provided
             for medicine in medicines:
-                medicine["_id"] = str(medicine["_id"])
-                
-                # Filter prices by location if provided
                 if location and "prices" in medicine:
                     medicine["prices"] = [
                         price for price in medicine["prices"] 
@@ -86,27 +81,24 @@ class MedicineService:
             logger.error(f"Error getting medicines by diagnosis: {e}")
             return []
     
-    def get_medicine_by_id(self, medicine_id: str) -> Optional[Dict[str, Any]]:
+    async def get_medicine_by_id(self, medicine_id: str) -> Optional[Dict[str, Any]]:
         """
         Get detailed information about a specific medicine
         """
         try:
-            medicine = db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
-            
-            if medicine:
-                medicine["_id"] = str(medicine["_id"])
+            medicine = await async_db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
             
             return medicine
         except Exception as e:
             logger.error(f"Error getting medicine by ID: {e}")
             return None
     
-    def get_medicine_popularity(self, medicine_id: str) -> Dict[str, Any]:
+    async def get_medicine_popularity(self, medicine_id: str) -> Dict[str, Any]:
         """
         Get popularity metrics for a medicine
         """
         try:
-            medicine = db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
+            medicine = await async_db.medicines_collection().find_one({"_id": ObjectId(medicine_id)})
             
             if not medicine:
                 return {"error": "Medicine not found"}
@@ -125,20 +117,17 @@ class MedicineService:
             logger.error(f"Error getting medicine popularity: {e}")
             return {"error": str(e)}
     
-    def get_popular_medicines(self, limit: int = 10, location: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def get_popular_medicines(self, limit: int = 10, location: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get a list of popular medicines
         """
         try:
             # Sort by popularity score
-            cursor = db.medicines_collection().find().sort("popularity_score", -1).limit(limit)
-            medicines = list(cursor)
+            cursor = async_db.medicines_collection().find().sort("popularity_score", -1).limit(limit)
+            medicines = await cursor.to_list(length=limit)
             
-            # Convert ObjectId to string for JSON serialization
+            # Filter prices by location if provided
             for medicine in medicines:
-                medicine["_id"] = str(medicine["_id"])
-                
-                # Filter prices by location if provided
                 if location and "prices" in medicine:
                     medicine["prices"] = [
                         price for price in medicine["prices"] 
@@ -150,38 +139,34 @@ class MedicineService:
             logger.error(f"Error getting popular medicines: {e}")
             return []
     
-    def get_medicines_by_ingredients(self, ingredients: List[str], 
-                                    limit: int = 10,
-                                    skip: int = 0) -> List[Dict[str, Any]]:
+    async def get_medicines_by_ingredients(self, ingredients: List[str], 
+                                          limit: int = 10,
+                                          skip: int = 0) -> List[Dict[str, Any]]:
         """
         Get medicines containing specific ingredients
         """
         try:
             query = {"ingredients": {"$in": ingredients}}
             
-            cursor = db.medicines_collection().find(query).skip(skip).limit(limit)
-            medicines = list(cursor)
-            
-            # Convert ObjectId to string for JSON serialization
-            for medicine in medicines:
-                medicine["_id"] = str(medicine["_id"])
+            cursor = async_db.medicines_collection().find(query).skip(skip).limit(limit)
+            medicines = await cursor.to_list(length=limit)
             
             return medicines
         except Exception as e:
             logger.error(f"Error getting medicines by ingredients: {e}")
             return []
     
-    def get_medicine_alternatives(self, medicine_id: str, 
-                                 medicine_data: Dict[str, Any] = None,
-                                 location: Optional[str] = None,
-                                 limit: int = 5) -> List[Dict[str, Any]]:
+    async def get_medicine_alternatives(self, medicine_id: str, 
+                                       medicine_data: Dict[str, Any] = None,
+                                       location: Optional[str] = None,
+                                       limit: int = 5) -> List[Dict[str, Any]]:
         """
         Get alternative medicines for a specific medicine
         """
         try:
             # If medicine data not provided, fetch it
             if not medicine_data:
-                medicine_data = self.get_medicine_by_id(medicine_id)
+                medicine_data = await self.get_medicine_by_id(medicine_id)
             
             if not medicine_data:
                 return []
@@ -198,13 +183,10 @@ class MedicineService:
                 ]
             }
             
-            cursor = db.medicines_collection().find(query).limit(limit)
-            alternatives = list(cursor)
+            cursor = async_db.medicines_collection().find(query).limit(limit)
+            alternatives = await cursor.to_list(length=limit)
             
-            # Convert ObjectId to string for JSON serialization
             for alt in alternatives:
-                alt["_id"] = str(alt["_id"])
-                
                 # Filter prices by location if provided
                 if location and "prices" in alt:
                     alt["prices"] = [
@@ -247,5 +229,5 @@ class MedicineService:
         
         return min(score, 1.0)  # Cap at 1.0
 
-# Create singleton instance
-medicine_service = MedicineService()
+# Singleton instance, created on first use
+medicine_service = services.lazy("medicine_service", MedicineService)
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+import logging
+import os
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+class PasswordServiceBusy(Exception):
+    """Raised when too many password operations are already queued"""
+
+
+def _check_and_upgrade(hashed_password: str, password: str, method: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password and, if it is correct but hashed with old parameters,
+    hash it again with the current ones in the same job
+    """
+    if not check_password_hash(hashed_password, password):
+        return False, None
+    if hashed_password.split("$", 1)[0] != method:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordService:
+    """
+    Hashes and checks passwords on a dedicated, bounded worker pool.
+
+    PBKDF2 and scrypt release the GIL while they run, so a small thread pool
+    keeps key stretching off the request threads and caps how many cores
+    authentication can take. At most PASSWORD_MAX_QUEUE operations may be
+    queued or running; beyond that callers get PasswordServiceBusy instead of
+    waiting, so a login storm sheds load rather than starving other routes.
+    """
+
+    def __init__(self):
+        self.method = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+        self.workers = int(os.environ.get("PASSWORD_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+        self.max_queue = int(os.environ.get("PASSWORD_MAX_QUEUE", 64))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+
+    def _submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise PasswordServiceBusy("Too many password operations in progress")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the current parameters"""
+        return await asyncio.wrap_future(self._submit(generate_password_hash, password, self.method))
+
+    async def check(self, hashed_password: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against its stored hash
+        Returns (matches, new_hash); new_hash is set when the stored hash should be upgraded
+        """
+        if not hashed_password:
+            return False, None
+        return await asyncio.wrap_future(
+            self._submit(_check_and_upgrade, hashed_password, password, self.method)
+        )
+
+    def shutdown(self) -> None:
+        """Stop the worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Create singleton instance
+password_service = PasswordService()
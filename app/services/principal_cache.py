@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import logging
+import os
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.db.database import async_db
+
+logger = logging.getLogger(__name__)
+
+# Fields never returned in profile responses
+PROFILE_EXCLUDED_FIELDS = {"hashed_password": 0, "medical_history": 0, "tokens_revoked_at": 0}
+
+class PrincipalCache:
+    """
+    Per-process cache of authenticated users' projected profiles.
+
+    Entries are keyed by user id and hold the user's current token version;
+    a token carrying an older version is rejected without a users read, a
+    newer one reloads the entry. Entries expire after PRINCIPAL_CACHE_TTL
+    seconds, so most authenticated requests need no users read. Revoking a
+    user's tokens bumps the version; this process drops the entry at once
+    and the others within PRINCIPAL_REVOCATION_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.environ.get("PRINCIPAL_CACHE_TTL", 30))
+        self.max_size = int(os.environ.get("PRINCIPAL_CACHE_SIZE", 10_000))
+        self.revocation_interval = float(os.environ.get("PRINCIPAL_REVOCATION_INTERVAL", 1))
+        # user id -> (token version, profile, expiry)
+        self._cache: "OrderedDict[str, Tuple[int, Dict[str, Any], float]]" = OrderedDict()
+        # Bumped by every invalidation; a miss only caches its read if none happened meanwhile
+        self._generation = 0
+        # Revocations up to this (database) time have been applied to the cache; the
+        # margin covers clock skew between this host and the database at startup
+        self._revoked_since = datetime.utcnow() - timedelta(minutes=5)
+        self._next_revocation_check = 0.0
+        self._lock = threading.Lock()
+
+    async def get(self, user_id: str, token_version: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's profile (without sensitive fields), reading the users collection on a miss
+        Returns a copy the caller may modify, or None if the user does not exist or
+        token_version is no longer the user's current one
+        """
+        await self._apply_revocations()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry and entry[2] > now and entry[0] >= token_version:
+                self._cache.move_to_end(user_id)
+                return dict(entry[1]) if entry[0] == token_version else None
+            generation = self._generation
+
+        if not ObjectId.is_valid(user_id):
+            return None
+        user = await async_db.users_collection().find_one({"_id": ObjectId(user_id)}, PROFILE_EXCLUDED_FIELDS)
+        if not user:
+            return None
+        user["_id"] = str(user["_id"])
+        current_version = user.pop("token_version", 0)
+
+        with self._lock:
+            # A write invalidated while we were reading, so what we read may be stale
+            if generation == self._generation:
+                self._store(user_id, current_version, user, now)
+        return dict(user) if current_version == token_version else None
+
+    def put(self, user: Dict[str, Any], token_version: int = 0) -> None:
+        """Cache a freshly written profile (already projected, _id as a string)"""
+        with self._lock:
+            self._store(user["_id"], token_version, dict(user), time.monotonic())
+
+    def _store(self, user_id: str, token_version: int, user: Dict[str, Any], now: float) -> None:
+        self._cache[user_id] = (token_version, user, now + self.ttl)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's cached profile after it changed"""
+        with self._lock:
+            self._generation += 1
+            self._cache.pop(str(user_id), None)
+
+    async def revoke(self, user_id: str, changes: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """
+        Invalidate every token issued to a user so far, optionally applying other changes in the same write
+        Returns the user's new token version, or None if the user does not exist
+        """
+        user = await async_db.users_collection().find_one_and_update(
+            {"_id": ObjectId(user_id)},
+            {
+                "$set": {**(changes or {}), "updated_at": datetime.utcnow()},
+                "$inc": {"token_version": 1},
+                # Server time, so every process compares revocations on the same clock
+                "$currentDate": {"tokens_revoked_at": True}
+            },
+            projection={"token_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        self.invalidate(user_id)
+        return user["token_version"] if user else None
+
+    async def _apply_revocations(self) -> None:
+        """Drop entries of users whose tokens another process revoked, at most once per interval"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_revocation_check:
+                return
+            self._next_revocation_check = now + self.revocation_interval
+            since = self._revoked_since
+        try:
+            revoked = await async_db.users_collection().find(
+                {"tokens_revoked_at": {"$gt": since}}, {"tokens_revoked_at": 1}
+            ).to_list(None)
+        except Exception as e:
+            logger.error(f"Error checking revoked tokens: {e}")
+            return
+        for user in revoked:
+            self.invalidate(str(user["_id"]))
+        if revoked:
+            with self._lock:
+                self._revoked_since = max(self._revoked_since, *(user["tokens_revoked_at"] for user in revoked))
+
+# Create singleton instance
+principal_cache = PrincipalCache()
@@ -0,0 +1,178 @@
+import threading
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+import logging
+import os
+import requests
+from web3 import HTTPProvider
+from web3.providers.base import JSONBaseProvider
+from app.services.chain_telemetry import RpcStats
+from app.utils.jsonrpc import batch_call
+
+logger = logging.getLogger(__name__)
+
+class ProviderEndpoint:
+    """One JSON-RPC endpoint with its own keep-alive session and health stats"""
+
+    def __init__(self, uri: str, timeout: float, alpha: float):
+        self.uri = uri
+        self.session = requests.Session()
+        # The pool fails over itself, so the provider should not retry internally
+        self.provider = HTTPProvider(
+            uri,
+            session=self.session,
+            request_kwargs={"timeout": timeout},
+            exception_retry_configuration=None
+        )
+        self.alpha = alpha
+        self.latency: Optional[float] = None  # EWMA in seconds
+        self.healthy = True
+        self.block_number = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record_success(self, elapsed: float) -> None:
+        with self._lock:
+            self.latency = elapsed if self.latency is None else self.alpha * elapsed + (1 - self.alpha) * self.latency
+            self.healthy = True
+            self.errors = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.errors += 1
+            self.healthy = False
+
+    def score(self) -> float:
+        # Endpoints never measured sort after measured ones, but before unhealthy ones
+        return self.latency if self.latency is not None else float("inf")
+
+
+class ProviderPool(JSONBaseProvider):
+    """
+    web3 provider that spreads requests over several RPC endpoints.
+
+    Each endpoint keeps a keep-alive HTTP session and an EWMA of its latency,
+    updated from real traffic and from periodic eth_blockNumber probes.
+    Requests go to the fastest healthy endpoint; on a transport error the
+    endpoint is marked unhealthy and the request fails over to the next one.
+    Endpoints lagging more than PROVIDER_MAX_BLOCK_LAG blocks behind the
+    best one are treated as unhealthy.
+    """
+
+    def __init__(self, uris: Sequence[str]):
+        super().__init__()
+        timeout = float(os.environ.get("PROVIDER_TIMEOUT", 10))
+        alpha = float(os.environ.get("PROVIDER_EWMA_ALPHA", 0.3))
+        self.probe_interval = float(os.environ.get("PROVIDER_PROBE_INTERVAL", 10))
+        self.max_block_lag = int(os.environ.get("PROVIDER_MAX_BLOCK_LAG", 5))
+        self.timeout = timeout
+        self.endpoints = [ProviderEndpoint(uri, timeout, alpha) for uri in uris]
+        # Every endpoint call, for latency percentiles and error rates
+        self.stats = RpcStats()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __str__(self) -> str:
+        return f"ProviderPool({', '.join(e.uri for e in self.endpoints)})"
+
+    def ranked(self) -> List[ProviderEndpoint]:
+        """Endpoints in routing order: healthy by latency, then unhealthy as a last resort"""
+        return sorted(self.endpoints, key=lambda e: (not e.healthy, e.score()))
+
+    def make_request(self, method, params):
+        last_error: Optional[Exception] = None
+        for endpoint in self.ranked():
+            started = time.monotonic()
+            try:
+                response = endpoint.provider.make_request(method, params)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logger.warning(f"RPC endpoint {endpoint.uri} failed, failing over: {e}")
+                endpoint.record_failure()
+                self.stats.record(time.monotonic() - started, ok=False)
+                last_error = e
+                continue
+            elapsed = time.monotonic() - started
+            endpoint.record_success(elapsed)
+            # JSON-RPC errors (reverts, bad params) still count against the error rate
+            self.stats.record(elapsed, ok="error" not in response)
+            return response
+        raise last_error or ConnectionError("No RPC endpoints configured")
+
+    def batch(self, calls: Sequence[Tuple[str, List[Any]]]) -> List[Any]:
+        """Send a JSON-RPC batch to the best endpoint, failing over like make_request"""
+        last_error: Optional[Exception] = None
+        for endpoint in self.ranked():
+            started = time.monotonic()
+            try:
+                results = batch_call(endpoint.uri, calls, session=endpoint.session, timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"RPC endpoint {endpoint.uri} failed batch, failing over: {e}")
+                endpoint.record_failure()
+                self.stats.record(time.monotonic() - started, ok=False)
+                last_error = e
+                continue
+            elapsed = time.monotonic() - started
+            endpoint.record_success(elapsed)
+            self.stats.record(elapsed, ok=True)
+            return results
+        raise last_error or ConnectionError("No RPC endpoints configured")
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return any(endpoint.healthy for endpoint in self.endpoints)
+
+    def start(self) -> None:
+        """Start periodic health probes"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="provider-pool-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop periodic health probes"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.probe_interval + 1)
+            self._thread = None
+
+    def close(self) -> None:
+        """Stop probing and close every endpoint's HTTP session"""
+        self.stop()
+        for endpoint in self.endpoints:
+            endpoint.session.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.probe_interval)
+
+    def probe(self) -> None:
+        """Measure every endpoint with eth_blockNumber and mark laggards unhealthy"""
+        for endpoint in self.endpoints:
+            started = time.monotonic()
+            try:
+                (result,) = batch_call(endpoint.uri, [("eth_blockNumber", [])],
+                                       session=endpoint.session, timeout=self.timeout)
+                endpoint.block_number = int(result, 16)
+                endpoint.record_success(time.monotonic() - started)
+            except Exception as e:
+                logger.warning(f"Health probe of {endpoint.uri} failed: {e}")
+                endpoint.record_failure()
+
+        best_block = max((e.block_number for e in self.endpoints if e.healthy), default=0)
+        for endpoint in self.endpoints:
+            if endpoint.healthy and best_block - endpoint.block_number > self.max_block_lag:
+                logger.warning(f"RPC endpoint {endpoint.uri} is {best_block - endpoint.block_number} blocks behind")
+                endpoint.healthy = False
+
+    def status(self) -> List[dict]:
+        """Health and latency of every endpoint"""
+        return [
+            {
+                "uri": endpoint.uri,
+                "healthy": endpoint.healthy,
+                "latency_ms": round(endpoint.latency * 1000, 2) if endpoint.latency is not None else None,
+                "block_number": endpoint.block_number
+            }
+            for endpoint in self.endpoints
+        ]
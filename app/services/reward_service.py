@@ -0,0 +1,336 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import logging
+import os
+from bson.decimal128 import Decimal128
+from pymongo import ReturnDocument
+from app.db.database import db
+from app.services.contract_abi import MED_TOKEN_DECIMALS
+
+logger = logging.getLogger(__name__)
+
+# MED credited per user action; anything else is rejected
+REWARD_AMOUNTS = {
+    "diagnosis": Decimal("5.0"),
+    "medicine_verification": Decimal("2.0"),
+    "profile_completion": Decimal("1.0"),
+    "referral": Decimal("10.0")
+}
+
+SCALE = Decimal(10) ** MED_TOKEN_DECIMALS
+ZERO = Decimal128("0")
+
+def _to_tokens(value: Any) -> float:
+    """Base units (Decimal128) to a MED amount for API responses"""
+    if value is None:
+        return 0.0
+    return float(value.to_decimal() / SCALE)
+
+class RewardService:
+    """
+    Accumulates MedToken rewards off-chain and mints them in periodic batches.
+
+    Each credit is a single atomic $inc on the wallet's reward_ledger document,
+    so users see their new balance immediately. Every REWARD_SETTLEMENT_INTERVAL
+    seconds the pending amount of each wallet is moved to ``settling`` and
+    minted with one mintReward transaction, so the mint count is about one per
+    wallet per window rather than one per action. Once the mint is confirmed
+    and indexed into token_balances the settling amount is cleared; a failed
+    mint, or a claim whose mint was never submitted, returns it to pending
+    for the next window once the chain shows that no transaction at its nonce
+    minted it.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService providing the MedToken contract and the transaction pipeline
+        self.blockchain = blockchain
+        self.settlement_interval = float(os.environ.get("REWARD_SETTLEMENT_INTERVAL", 900))
+        self.settlement_batch = int(os.environ.get("REWARD_SETTLEMENT_BATCH", 500))
+        # Settlement claims without a submitted mint after this were abandoned by a crash
+        self.claim_timeout = timedelta(seconds=float(os.environ.get("REWARD_SETTLEMENT_CLAIM_TIMEOUT", 600)))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background settlement loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reward-settlement", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background settlement loop"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.settlement_interval):
+            try:
+                self.finalize()
+                self.settle()
+            except Exception as e:
+                logger.error(f"Error settling rewards: {e}")
+
+    def credit(self, user_id: str, wallet_address: str, action_type: str) -> Dict[str, Any]:
+        """
+        Credit a reward for a user action to the wallet's off-chain ledger
+        Returns the credited amount and the wallet's updated balances
+        """
+        if action_type not in REWARD_AMOUNTS:
+            # The action type becomes part of a field path, so only known names are allowed
+            return {"success": False, "error": f"Unknown action type: {action_type}"}
+        amount = REWARD_AMOUNTS[action_type]
+        wallet = wallet_address.lower()
+        now = datetime.utcnow()
+        try:
+            account = db.reward_ledger_collection().find_one_and_update(
+                {"_id": wallet},
+                {
+                    "$inc": {
+                        "pending": Decimal128(amount * SCALE),
+                        "credited": Decimal128(amount * SCALE),
+                        f"actions.{action_type}": 1
+                    },
+                    "$set": {"user_id": user_id, "updated_at": now},
+                    "$setOnInsert": {"settling": ZERO, "created_at": now}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return {
+                "success": True,
+                "wallet_address": wallet_address,
+                "action_type": action_type,
+                "amount": float(amount),
+                **self._balances(wallet, account)
+            }
+        except Exception as e:
+            logger.error(f"Error crediting reward: {e}")
+            return {"success": False, "error": str(e)}
+
+    def get_balance(self, wallet_address: str) -> Dict[str, float]:
+        """
+        A wallet's minted balance plus rewards credited but not yet minted
+        """
+        wallet = wallet_address.lower()
+        try:
+            account = db.reward_ledger_collection().find_one(
+                {"_id": wallet}, {"pending": 1, "settling": 1, "settlement_id": 1}
+            )
+            return self._balances(wallet, account)
+        except Exception as e:
+            logger.error(f"Error getting reward balance: {e}")
+            return {"minted_balance": 0.0, "unsettled_rewards": 0.0, "balance": 0.0}
+
+    def _balances(self, wallet: str, account: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        account = account or {}
+        minted = self.blockchain.get_token_state(wallet)["user_balance"]
+        unsettled = _to_tokens(account.get("pending"))
+        # Until finalize runs, an indexed mint is already part of the on-chain balance
+        if account.get("settlement_id") and not self._mint_indexed(wallet, account["settlement_id"]):
+            unsettled += _to_tokens(account.get("settling"))
+        return {
+            "minted_balance": minted,
+            "unsettled_rewards": unsettled,
+            "balance": minted + unsettled
+        }
+
+    def _mint_indexed(self, wallet: str, settlement_id: str) -> bool:
+        """Whether a settlement's mint is confirmed in a block the event indexer has applied"""
+        record = db.blockchain_records_collection().find_one(
+            {"metadata.settlement_id": settlement_id, "metadata.wallet_address": wallet},
+            {"status": 1, "block_number": 1}
+        )
+        return record is not None and self._indexed(record, self._indexed_block())
+
+    @staticmethod
+    def _indexed_block() -> int:
+        checkpoint = db.indexer_checkpoints_collection().find_one({"_id": "contract_events"}) or {}
+        return checkpoint.get("last_block", -1)
+
+    @staticmethod
+    def _indexed(record: Dict[str, Any], indexed_block: int) -> bool:
+        return record.get("status") == "confirmed" and record.get("block_number", indexed_block + 1) <= indexed_block
+
+    def settle(self) -> int:
+        """
+        Mint every wallet's pending rewards, one transaction per wallet
+        Returns the number of mint transactions submitted
+        """
+        contract = self.blockchain.token_contract
+        transactions = self.blockchain.transactions
+        if not contract or not transactions:
+            # Without a token contract and signer, credits stay on the ledger
+            return 0
+
+        ledger = db.reward_ledger_collection()
+        settlement_id = uuid.uuid4().hex
+        wallets = [
+            doc["_id"] for doc in
+            ledger.find({"pending": {"$gt": ZERO}, "settlement_id": None}, {"_id": 1}).limit(self.settlement_batch)
+        ]
+        if not wallets:
+            return 0
+
+        # Move pending to settling in one atomic update per wallet; credits arriving
+        # afterwards land in pending and go out with the next window
+        ledger.update_many(
+            {"_id": {"$in": wallets}, "settlement_id": None},
+            [{"$set": {
+                "settling": "$pending",
+                "pending": ZERO,
+                "settlement_id": settlement_id,
+                "settlement_started_at": datetime.utcnow()
+            }}]
+        )
+
+        submitted = 0
+        for account in ledger.find({"settlement_id": settlement_id}, {"settling": 1, "user_id": 1}):
+            amount = int(account["settling"].to_decimal())
+            try:
+                tx_hash = transactions.submit(
+                    contract.functions.mintReward(self.blockchain.web3.to_checksum_address(account["_id"]),
+                                                  amount, "reward settlement")
+                )
+            except Exception as e:
+                logger.error(f"Error minting rewards for {account['_id']}: {e}")
+                self._release(account["_id"], settlement_id)
+                continue
+
+            now = datetime.utcnow()
+            # Kept so finalize can tell whether anything at this nonce was mined
+            nonce = transactions.nonce_of(tx_hash)
+            ledger.update_one({"_id": account["_id"]}, {"$set": {"settlement_tx_hash": tx_hash, "updated_at": now}})
+            # Tracked to confirmation like every other transaction
+            db.blockchain_records_collection().insert_one({
+                "user_id": account.get("user_id"),
+                "record_type": "transaction",
+                "data_hash": tx_hash,
+                "transaction_hash": tx_hash,
+                "chain_id": self.blockchain.chain_id,
+                "metadata": {
+                    "transaction_type": "mint",
+                    "settlement_id": settlement_id,
+                    "amount": _to_tokens(account["settling"]),
+                    "wallet_address": account["_id"],
+                    "nonce": nonce
+                },
+                "status": "pending",
+                "created_at": now,
+                "updated_at": now
+            })
+            submitted += 1
+
+        logger.info(f"Submitted {submitted} reward mint transactions for settlement {settlement_id}")
+        return submitted
+
+    def finalize(self) -> None:
+        """
+        Clear settled amounts once their mint is indexed, return failed mints to pending
+        Mints are matched by settlement id, which survives fee-bump replacements of the tx hash
+        A failed record is only released once the chain confirms nothing minted it
+        """
+        ledger = db.reward_ledger_collection()
+        settling = list(ledger.find(
+            {"settlement_id": {"$ne": None}},
+            {"settlement_id": 1, "settlement_tx_hash": 1, "settlement_started_at": 1}
+        ))
+        if not settling:
+            return
+
+        records = {
+            (record["metadata"]["settlement_id"], record["metadata"]["wallet_address"]): record for record in
+            db.blockchain_records_collection().find(
+                {"metadata.settlement_id": {"$in": list({a["settlement_id"] for a in settling})}},
+                {"metadata": 1, "status": 1, "block_number": 1, "transaction_hash": 1,
+                 "replaced_transaction_hashes": 1}
+            )
+        }
+        indexed_block = self._indexed_block()
+        abandoned_before = datetime.utcnow() - self.claim_timeout
+
+        for account in settling:
+            record = records.get((account["settlement_id"], account["_id"]))
+            if record is None:
+                # settle stopped between claiming the wallet and submitting its mint
+                started_at = account.get("settlement_started_at")
+                if not account.get("settlement_tx_hash") and (started_at is None or started_at < abandoned_before):
+                    logger.warning(f"Releasing abandoned reward settlement {account['settlement_id']}")
+                    self._release(account["_id"], account["settlement_id"])
+            elif record.get("status") == "failed":
+                # "failed" also covers slow mints the tracker gave up on, which may still have landed
+                if self._mint_unmined(record):
+                    self._release(account["_id"], account["settlement_id"])
+            elif self._indexed(record, indexed_block):
+                # The mint is now part of the indexed on-chain balance
+                ledger.update_one(
+                    {"_id": account["_id"], "settlement_id": account["settlement_id"]},
+                    [{"$set": {
+                        "minted": {"$add": [{"$ifNull": ["$minted", ZERO]}, "$settling"]},
+                        "settling": ZERO,
+                        "settlement_id": None,
+                        "settlement_tx_hash": None,
+                        "updated_at": datetime.utcnow()
+                    }}]
+                )
+
+    def _mint_unmined(self, record: Dict[str, Any]) -> bool:
+        """
+        Whether a failed mint can safely be retried: it reverted, or its nonce was used by
+        a transaction that is none of its hashes. A mint found mined is put back to tracking.
+        """
+        hashes: List[str] = [record["transaction_hash"], *record.get("replaced_transaction_hashes", [])]
+        calls = [("eth_getTransactionReceipt", [h]) for h in hashes]
+        calls += [("eth_getTransactionByHash", [h]) for h in hashes]
+        calls.append(("eth_getTransactionCount", [self.blockchain.account.address, "latest"]))
+        try:
+            results = self.blockchain.rpc_batch(calls)
+        except Exception as e:
+            logger.error(f"Error checking failed mint {record['transaction_hash']}: {e}")
+            return False
+        receipts, transactions = results[:len(hashes)], results[len(hashes):-1]
+        mined_nonce = int(results[-1], 16)
+
+        for tx_hash, receipt in zip(hashes, receipts):
+            if not receipt:
+                continue
+            if int(receipt.get("status", "0x1"), 16) == 0:
+                return True
+            # The mint landed after all; let the confirmation tracker take it from here
+            latest_block = self.blockchain.block_tracker.block_number if self.blockchain.block_tracker else 0
+            fields = self.blockchain.confirmations._status_fields(receipt, latest_block)
+            fields.setdefault("status", "submitted")
+            logger.warning(f"Reward mint {tx_hash} marked failed was mined, tracking it again")
+            db.blockchain_records_collection().update_one(
+                {"_id": record["_id"]},
+                {"$set": {**fields, "transaction_hash": tx_hash, "error": None, "updated_at": datetime.utcnow()}}
+            )
+            return False
+
+        nonce = record["metadata"].get("nonce")
+        if nonce is None:
+            nonce = next((int(tx["nonce"], 16) for tx in transactions if tx), None)
+        if nonce is None:
+            logger.warning(f"Nonce of failed mint {record['transaction_hash']} unknown, not retrying it")
+            return False
+        # Below the mined nonce count something else took the nonce, so none of our hashes can land
+        return nonce < mined_nonce
+
+    def _release(self, wallet: str, settlement_id: str) -> None:
+        """Return a wallet's settling amount to pending after a failed mint"""
+        db.reward_ledger_collection().update_one(
+            {"_id": wallet, "settlement_id": settlement_id},
+            [{"$set": {
+                "pending": {"$add": ["$pending", "$settling"]},
+                "settling": ZERO,
+                "settlement_id": None,
+                "settlement_tx_hash": None,
+                "updated_at": datetime.utcnow()
+            }}]
+        )
@@ -0,0 +1,157 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+import logging
+import os
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+logger = logging.getLogger(__name__)
+
+def recover_signer(message: str, signature: str) -> Optional[str]:
+    """
+    Recover the lower-cased signer address of a personal_sign message
+    Runs in the worker processes, so it must stay a module-level function
+    """
+    try:
+        return Account.recover_message(encode_defunct(text=message), signature=signature).lower()
+    except Exception:
+        return None
+
+def _recover_many(items: Sequence[Tuple[str, str]]) -> List[Optional[str]]:
+    return [recover_signer(message, signature) for message, signature in items]
+
+class SignatureService:
+    """
+    Verifies Ethereum signatures off the request thread.
+
+    secp256k1 recovery runs in a process pool sized to the machine's cores,
+    and recovered signers are cached by (message, signature) for the lifetime
+    of an authentication challenge, so retries and duplicate submissions
+    never pay for recovery twice.
+    """
+
+    def __init__(self):
+        self.workers = int(os.environ.get("SIGNATURE_WORKERS", os.cpu_count() or 1))
+        self.cache_ttl = float(os.environ.get("AUTH_CHALLENGE_TTL", 300))
+        self.cache_size = int(os.environ.get("SIGNATURE_CACHE_SIZE", 100_000))
+        self.timeout = float(os.environ.get("SIGNATURE_TIMEOUT", 5))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # (message, signature) -> (recovered address, expiry)
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[Optional[str], float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn, not fork: the API process runs background threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._executor_lock:
+            if self._executor:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _cached(self, key: Tuple[str, str]) -> Tuple[bool, Optional[str]]:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if not entry:
+                return False, None
+            address, expires = entry
+            if expires < time.monotonic():
+                del self._cache[key]
+                return False, None
+            return True, address
+
+    def _remember(self, key: Tuple[str, str], address: Optional[str]) -> None:
+        with self._cache_lock:
+            self._cache[key] = (address, time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def submit(self, message: str, signature: str) -> "Future[Optional[str]]":
+        """
+        Start recovering the signer of a message, returning a future of the address
+        """
+        key = (message, signature)
+        hit, address = self._cached(key)
+        if hit:
+            future: "Future[Optional[str]]" = Future()
+            future.set_result(address)
+            return future
+
+        future = self._pool().submit(recover_signer, message, signature)
+        future.add_done_callback(
+            lambda done: self._remember(key, done.result()) if not done.exception() else None
+        )
+        return future
+
+    def verify(self, message: str, signature: str, wallet_address: str) -> bool:
+        """
+        Check that a message was signed by wallet_address (blocks until recovered)
+        """
+        try:
+            recovered = self.submit(message, signature).result(timeout=self.timeout)
+            return recovered is not None and recovered == wallet_address.lower()
+        except Exception as e:
+            logger.error(f"Error verifying Ethereum signature: {e}")
+            return False
+
+    async def verify_async(self, message: str, signature: str, wallet_address: str) -> bool:
+        """
+        Check that a message was signed by wallet_address without blocking the event loop
+        """
+        try:
+            future = asyncio.wrap_future(self.submit(message, signature))
+            recovered = await asyncio.wait_for(future, timeout=self.timeout)
+            return recovered is not None and recovered == wallet_address.lower()
+        except Exception as e:
+            logger.error(f"Error verifying Ethereum signature: {e}")
+            return False
+
+    def verify_batch(self, items: Sequence[Tuple[str, str, str]]) -> List[bool]:
+        """
+        Verify many (message, signature, wallet_address) triples
+        Cache misses are split into one chunk per worker process
+        """
+        results: List[Optional[bool]] = [None] * len(items)
+        misses = []
+        for index, (message, signature, wallet_address) in enumerate(items):
+            hit, address = self._cached((message, signature))
+            if hit:
+                results[index] = address is not None and address == wallet_address.lower()
+            else:
+                misses.append(index)
+
+        if misses:
+            chunk = max(1, -(-len(misses) // self.workers))
+            chunks = [misses[i:i + chunk] for i in range(0, len(misses), chunk)]
+            try:
+                futures = [
+                    self._pool().submit(_recover_many, [(items[i][0], items[i][1]) for i in indexes])
+                    for indexes in chunks
+                ]
+                for indexes, future in zip(chunks, futures):
+                    for index, address in zip(indexes, future.result(timeout=self.timeout * len(indexes))):
+                        message, signature, wallet_address = items[index]
+                        self._remember((message, signature), address)
+                        results[index] = address is not None and address == wallet_address.lower()
+            except Exception as e:
+                logger.error(f"Error verifying Ethereum signatures in batch: {e}")
+
+        return [bool(result) for result in results]
+
+# Create singleton instance
+signature_service = SignatureService()
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+from app.db.database import db
+from app.services.contract_abi import MED_TOKEN_DECIMALS
+
+logger = logging.getLogger(__name__)
+
+SUPPLY_KEY = "total_supply"
+
+class TokenStateService:
+    """
+    Serves MedToken balances and total supply from memory.
+
+    Values come from the token_balances collection the event indexer folds
+    Transfer events into, so the request path never makes an RPC. Entries are
+    kept in a bounded LRU cache; a background loop refreshes every cached
+    wallet with one query per TOKEN_REFRESH_INTERVAL, and an entry older than
+    TOKEN_MAX_STALENESS is reloaded before it is served.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService, kept for symmetry with the other chain workers
+        self.blockchain = blockchain
+        self.cache_size = int(os.environ.get("TOKEN_CACHE_SIZE", 10_000))
+        self.refresh_interval = float(os.environ.get("TOKEN_REFRESH_INTERVAL", 15))
+        self.max_staleness = float(os.environ.get("TOKEN_MAX_STALENESS", 60))
+        self.refresh_chunk = int(os.environ.get("TOKEN_REFRESH_CHUNK", 1000))
+        # lower-cased address (or SUPPLY_KEY) -> (balance in base units, loaded at)
+        self._cache: "OrderedDict[str, Tuple[Decimal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background refresh loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-state", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh loop"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.refresh_interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing token balances: {e}")
+
+    def _load(self, keys: List[str]) -> Dict[str, Decimal]:
+        """Read balances for the given keys from the Transfer index, 0 if never seen"""
+        found = {
+            doc["_id"]: doc["balance"].to_decimal()
+            for doc in db.token_balances_collection().find({"_id": {"$in": keys}}, {"balance": 1})
+        }
+        return {key: found.get(key, Decimal(0)) for key in keys}
+
+    def _store(self, balances: Dict[str, Decimal], loaded_at: float) -> None:
+        with self._lock:
+            for key, balance in balances.items():
+                self._cache[key] = (balance, loaded_at)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def refresh(self) -> None:
+        """Reload every cached entry from the index"""
+        with self._lock:
+            keys = list(self._cache)
+        for start in range(0, len(keys), self.refresh_chunk):
+            chunk = keys[start:start + self.refresh_chunk]
+            loaded_at = time.monotonic()
+            balances = self._load(chunk)
+            with self._lock:
+                # Only refresh entries still cached; evicted ones stay evicted
+                for key in chunk:
+                    if key in self._cache:
+                        self._cache[key] = (balances[key], loaded_at)
+
+    def invalidate(self, addresses: Iterable[str]) -> None:
+        """Drop cached entries whose balance just changed"""
+        with self._lock:
+            for address in addresses:
+                self._cache.pop(address.lower(), None)
+
+    def balances(self, keys: List[str]) -> Dict[str, Decimal]:
+        """Balances in base units, from memory when fresh enough"""
+        now = time.monotonic()
+        result: Dict[str, Decimal] = {}
+        misses = []
+        with self._lock:
+            for key in keys:
+                entry = self._cache.get(key)
+                if entry and now - entry[1] <= self.max_staleness:
+                    result[key] = entry[0]
+                    self._cache.move_to_end(key)
+                else:
+                    misses.append(key)
+        if misses:
+            loaded = self._load(misses)
+            self._store(loaded, now)
+            result.update(loaded)
+        return result
+
+    def get(self, wallet_address: Optional[str] = None) -> Dict[str, float]:
+        """A wallet's MedToken balance and the total supply, in whole tokens"""
+        wallet = wallet_address.lower() if wallet_address else None
+        balances = self.balances([SUPPLY_KEY] + ([wallet] if wallet else []))
+        scale = Decimal(10) ** MED_TOKEN_DECIMALS
+        return {
+            "user_balance": float(balances[wallet] / scale) if wallet else 0.0,
+            "total_supply": float(balances[SUPPLY_KEY] / scale)
+        }
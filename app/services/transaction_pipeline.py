@@ -0,0 +1,316 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+import os
+from web3 import Web3
+from app.db.database import db
+
+logger = logging.getLogger(__name__)
+
+class NonceManager:
+    """
+    Hands out consecutive nonces for one signer from a local counter.
+    The counter is seeded from the node's pending transaction count and
+    only re-read from the node when a nonce error shows it has drifted.
+    """
+
+    def __init__(self, web3, address: str):
+        self.web3 = web3
+        self.address = address
+        self._next_nonce: Optional[int] = None
+        # Lowest nonce a re-read may hand out, so nonces still in flight are never reused
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next_nonce is None:
+                pending = self.web3.eth.get_transaction_count(self.address, "pending")
+                self._next_nonce = max(pending, self._floor)
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def release(self, nonce: int) -> bool:
+        """
+        Give back a nonce that was never signed
+        Only the most recently handed out nonce can be taken back; returns False
+        if later nonces are already out, in which case the caller must fill it
+        """
+        with self._lock:
+            if self._next_nonce == nonce + 1:
+                self._next_nonce = nonce
+                return True
+            return False
+
+    def resync(self, floor: int = 0) -> None:
+        """
+        Drop the local counter so the next nonce is read from the node
+        Nonces below floor are still in flight and will not be handed out again
+        """
+        with self._lock:
+            self._next_nonce = None
+            self._floor = floor
+
+
+class GasPriceStrategy:
+    """
+    Prices transactions from the block header tracker without extra RPCs.
+    Uses EIP-1559 fees when the chain reports a base fee, legacy gasPrice otherwise.
+    """
+
+    def __init__(self, blockchain):
+        self.blockchain = blockchain
+        self.priority_fee = int(os.environ.get("TX_PRIORITY_FEE_WEI", 1_500_000_000))
+        self.gas_price_multiplier = float(os.environ.get("TX_GAS_PRICE_MULTIPLIER", 1.1))
+
+    def fees(self) -> Dict[str, int]:
+        tracker = self.blockchain.block_tracker
+        base_fee = tracker.base_fee if tracker else None
+        if base_fee is not None:
+            # Headroom for the base fee doubling before inclusion
+            return {
+                "maxFeePerGas": 2 * base_fee + self.priority_fee,
+                "maxPriorityFeePerGas": self.priority_fee
+            }
+        gas_price = (tracker.gas_price if tracker else 0) or self.blockchain.web3.eth.gas_price
+        return {"gasPrice": int(gas_price * self.gas_price_multiplier)}
+
+    @staticmethod
+    def bump(fees: Dict[str, int], factor: float) -> Dict[str, int]:
+        """Raise fees enough for a node to accept a same-nonce replacement"""
+        return {key: int(value * factor) + 1 for key, value in fees.items()}
+
+
+class TransactionPipeline:
+    """
+    Submits contract writes from a single signer without blocking the caller.
+
+    ``submit`` assigns a nonce, prices and signs the transaction locally and
+    returns its hash straight away; broadcast workers send the raw
+    transactions. A monitor re-sends transactions that stay unmined for
+    TX_REPLACE_AFTER seconds at the same nonce with bumped fees.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService providing web3, the signer account and the header tracker
+        self.blockchain = blockchain
+        self.default_gas = int(os.environ.get("TX_DEFAULT_GAS", 300_000))
+        self.replace_after = float(os.environ.get("TX_REPLACE_AFTER", 90))
+        self.replacement_factor = float(os.environ.get("TX_REPLACEMENT_FACTOR", 1.125))
+        self.max_replacements = int(os.environ.get("TX_MAX_REPLACEMENTS", 5))
+        self.broadcast_workers = int(os.environ.get("TX_BROADCAST_WORKERS", 4))
+        self.broadcast_retries = int(os.environ.get("TX_BROADCAST_RETRIES", 3))
+        self.nonces = NonceManager(blockchain.web3, blockchain.account.address)
+        self.gas = GasPriceStrategy(blockchain)
+        # nonce -> in-flight transaction (tx dict, fees, hash, submit time, replacements)
+        self._in_flight: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        """Start the broadcast workers and the stuck-transaction monitor"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.broadcast_workers):
+            thread = threading.Thread(target=self._broadcast_loop, name=f"tx-broadcast-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        monitor = threading.Thread(target=self._monitor_loop, name="tx-monitor", daemon=True)
+        monitor.start()
+        self._threads.append(monitor)
+
+    def stop(self) -> None:
+        """Stop all pipeline threads"""
+        self._stop.set()
+        for _ in range(self.broadcast_workers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, contract_function, gas: Optional[int] = None, value: int = 0) -> str:
+        """
+        Sign a contract call with the next nonce and queue it for broadcast
+        Returns the transaction hash without waiting for the node
+        """
+        fees = self.gas.fees()
+        nonce = self.nonces.next()
+        try:
+            transaction = contract_function.build_transaction({
+                "from": self.blockchain.account.address,
+                "nonce": nonce,
+                "gas": gas or self.default_gas,
+                "value": value,
+                "chainId": self.blockchain.chain_id,
+                **fees
+            })
+            tx_hash = self._sign_and_queue(nonce, transaction, fees, replacements=0)
+        except Exception:
+            # An unsigned nonce would leave a gap that stalls every later transaction
+            if not self.nonces.release(nonce):
+                self._cancel(nonce, {"fees": fees})
+            raise
+        logger.info(f"Queued transaction {tx_hash} with nonce {nonce}")
+        return tx_hash
+
+    def _sign_and_queue(self, nonce: int, transaction: Dict[str, Any],
+                        fees: Dict[str, int], replacements: int) -> str:
+        signed = self.blockchain.account.sign_transaction(transaction)
+        tx_hash = Web3.to_hex(signed.hash)
+        with self._lock:
+            self._in_flight[nonce] = {
+                "transaction": transaction,
+                "fees": fees,
+                "hash": tx_hash,
+                "raw": signed.raw_transaction,
+                "submitted_at": time.monotonic(),
+                "replacements": replacements
+            }
+        self._queue.put(nonce)
+        return tx_hash
+
+    def _broadcast_loop(self) -> None:
+        while not self._stop.is_set():
+            nonce = self._queue.get()
+            if nonce is None:
+                return
+            with self._lock:
+                entry = self._in_flight.get(nonce)
+            if entry:
+                self._broadcast(nonce, entry)
+
+    def _broadcast(self, nonce: int, entry: Dict[str, Any]) -> None:
+        for attempt in range(self.broadcast_retries):
+            try:
+                self.blockchain.web3.eth.send_raw_transaction(entry["raw"])
+                return
+            except Exception as e:
+                message = str(e).lower()
+                if "already known" in message:
+                    return
+                if "nonce too low" in message:
+                    # Something at this nonce was mined: this transaction, one it replaced,
+                    # or one sent elsewhere. The confirmation tracker polls every hash sent
+                    # at the nonce and settles the record, so only stop tracking it here.
+                    logger.warning(f"Nonce {nonce} already mined, leaving {entry['hash']} to the confirmation tracker")
+                    with self._lock:
+                        self._in_flight.pop(nonce, None)
+                    self._resync()
+                    return
+                if "underpriced" in message:
+                    # A pricier transaction already holds the nonce; the monitor bumps again later
+                    logger.warning(f"Broadcast of {entry['hash']} underpriced, keeping nonce {nonce} in flight")
+                    return
+                logger.warning(f"Broadcast of {entry['hash']} failed (attempt {attempt + 1}): {e}")
+                time.sleep(0.5 * 2 ** attempt)
+
+        if entry["replacements"]:
+            # An earlier transaction at this nonce is already out; the monitor retries the replacement
+            return
+        # Never leave a nonce gap behind, or every later transaction stalls
+        self._mark_failed(nonce, entry, "broadcast failed")
+        self._cancel(nonce, entry)
+
+    def _resync(self) -> None:
+        """Re-read the nonce from the node without reusing nonces still in flight"""
+        with self._lock:
+            floor = max(self._in_flight, default=-1) + 1
+        self.nonces.resync(floor)
+
+    def _cancel(self, nonce: int, entry: Dict[str, Any]) -> None:
+        """Fill a nonce with a zero-value self-transfer"""
+        address = self.blockchain.account.address
+        fees = self.gas.bump(entry["fees"], self.replacement_factor)
+        transaction = {
+            "from": address,
+            "to": address,
+            "nonce": nonce,
+            "gas": 21_000,
+            "value": 0,
+            "chainId": self.blockchain.chain_id,
+            **fees
+        }
+        try:
+            signed = self.blockchain.account.sign_transaction(transaction)
+            self.blockchain.web3.eth.send_raw_transaction(signed.raw_transaction)
+        except Exception as e:
+            logger.error(f"Error cancelling nonce {nonce}: {e}")
+            with self._lock:
+                self._in_flight.pop(nonce, None)
+            self._resync()
+            return
+        with self._lock:
+            self._in_flight.pop(nonce, None)
+
+    def _monitor_loop(self) -> None:
+        interval = max(self.replace_after / 3, 1)
+        while not self._stop.wait(interval):
+            try:
+                self._replace_stuck()
+            except Exception as e:
+                logger.error(f"Error checking stuck transactions: {e}")
+
+    def _replace_stuck(self) -> None:
+        with self._lock:
+            if not self._in_flight:
+                return
+        # One RPC per tick covers every in-flight transaction: anything below
+        # the mined nonce is done, anything at or above it may be stuck
+        mined_nonce = self.blockchain.web3.eth.get_transaction_count(self.blockchain.account.address, "latest")
+        now = time.monotonic()
+        with self._lock:
+            for nonce in [n for n in self._in_flight if n < mined_nonce]:
+                del self._in_flight[nonce]
+            stuck = [
+                (nonce, entry) for nonce, entry in self._in_flight.items()
+                if now - entry["submitted_at"] > self.replace_after
+            ]
+
+        for nonce, entry in stuck:
+            if entry["replacements"] >= self.max_replacements:
+                continue
+            fees = self.gas.bump(entry["fees"], self.replacement_factor)
+            transaction = {**entry["transaction"], **fees}
+            new_hash = self._sign_and_queue(nonce, transaction, fees, entry["replacements"] + 1)
+            logger.info(f"Replacing stuck transaction {entry['hash']} with {new_hash} (nonce {nonce})")
+            self._record_replacement(entry["hash"], new_hash)
+
+    def _record_replacement(self, old_hash: str, new_hash: str) -> None:
+        """Point stored records at the replacement transaction"""
+        update = {"$set": {"transaction_hash": new_hash, "updated_at": datetime.utcnow()},
+                  "$addToSet": {"replaced_transaction_hashes": old_hash}}
+        try:
+            db.blockchain_records_collection().update_many({"transaction_hash": old_hash}, update)
+            db.anchor_batches_collection().update_many({"transaction_hash": old_hash}, update)
+            db.anchor_leaves_collection().update_many(
+                {"transaction_hash": old_hash},
+                {"$set": {"transaction_hash": new_hash}}
+            )
+        except Exception as e:
+            logger.error(f"Error recording transaction replacement: {e}")
+
+    def _mark_failed(self, nonce: int, entry: Dict[str, Any], error: str) -> None:
+        with self._lock:
+            self._in_flight.pop(nonce, None)
+        update = {"$set": {"status": "failed", "error": error, "updated_at": datetime.utcnow()}}
+        try:
+            db.blockchain_records_collection().update_many({"transaction_hash": entry["hash"]}, update)
+            db.anchor_batches_collection().update_many({"transaction_hash": entry["hash"]}, update)
+        except Exception as e:
+            logger.error(f"Error marking transaction failed: {e}")
+
+    def nonce_of(self, tx_hash: str) -> Optional[int]:
+        """Nonce of a transaction still in flight, None once it has left the pipeline"""
+        with self._lock:
+            return next((nonce for nonce, entry in self._in_flight.items() if entry["hash"] == tx_hash), None)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+import logging
+import os
+from app.db.database import db
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"confirmed", "failed"}
+
+STATUS_PROJECTION = {"transaction_hash": 1, "status": 1, "block_number": 1, "confirmations": 1, "error": 1}
+
+class Subscription:
+    """
+    One stream's queue of state changes, owned by the event loop that created it
+    The watcher thread hands states over with call_soon_threadsafe
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    def put(self, state: Dict[str, Any]) -> None:
+        """Queue a state from any thread"""
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, state)
+
+    async def get(self, timeout: float) -> Dict[str, Any]:
+        """Wait for the next state; raises asyncio.TimeoutError after timeout seconds"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+class TransactionWatcher:
+    """
+    Pushes transaction status transitions to subscribed clients.
+
+    One shared thread watches the union of every subscriber's hashes with a
+    single query per tick against the records the confirmation tracker keeps
+    current, plus one receipt batch per new block for hashes that are not
+    ours. Each change is fanned out to the subscribers' queues, which the SSE
+    endpoint awaits on the event loop. The tracker wakes the watcher as soon
+    as it writes, so clients hear about a confirmation in the same tick.
+    """
+
+    def __init__(self, blockchain):
+        # BlockchainService providing the provider pool, header tracker and confirmation tracker
+        self.blockchain = blockchain
+        self.interval = float(os.environ.get("TX_WATCH_INTERVAL", 2))
+        # tx hash -> subscriptions
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        # tx hash -> last published state
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._last_block: Optional[int] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the shared watcher thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="transaction-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the shared watcher thread"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def notify(self) -> None:
+        """Check subscribed transactions now instead of at the next tick"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error watching transactions: {e}")
+
+    def subscribe(self, hashes: Iterable[str]) -> Subscription:
+        """Register a subscription for the given transaction hashes (call from the event loop)"""
+        subscriber = Subscription()
+        with self._lock:
+            for tx_hash in hashes:
+                self._subscribers.setdefault(tx_hash.lower(), set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscription, hashes: Iterable[str]) -> None:
+        """Remove a subscription"""
+        with self._lock:
+            for tx_hash in hashes:
+                queues = self._subscribers.get(tx_hash.lower())
+                if queues is None:
+                    continue
+                queues.discard(subscriber)
+                if not queues:
+                    del self._subscribers[tx_hash.lower()]
+                    self._last.pop(tx_hash.lower(), None)
+
+    def snapshot(self, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Current states for a new subscriber, remembered so the next poll only sends changes"""
+        states = self.load([h.lower() for h in hashes])
+        with self._lock:
+            for tx_hash, state in states.items():
+                if tx_hash in self._subscribers:
+                    self._last[tx_hash] = state
+        return states
+
+    def poll(self) -> None:
+        """Load the state of every watched transaction and publish changes"""
+        with self._lock:
+            hashes = list(self._subscribers)
+        if not hashes:
+            return
+
+        states = self.load(hashes)
+        with self._lock:
+            for tx_hash, state in states.items():
+                if self._last.get(tx_hash) == state:
+                    continue
+                self._last[tx_hash] = state
+                for subscriber in self._subscribers.get(tx_hash, ()):
+                    subscriber.put(state)
+
+    def load(self, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Current state of each transaction; hashes with no known state are omitted"""
+        states: Dict[str, Dict[str, Any]] = {}
+        for collection in (db.blockchain_records_collection(), db.anchor_batches_collection()):
+            missing = [h for h in hashes if h not in states]
+            if not missing:
+                break
+            for record in collection.find({"transaction_hash": {"$in": missing}}, STATUS_PROJECTION):
+                states[record["transaction_hash"].lower()] = self._state(record["transaction_hash"], record)
+
+        external = [h for h in hashes if h not in states]
+        if external:
+            states.update(self._load_receipts(external))
+        return states
+
+    def _load_receipts(self, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Receipts of transactions we did not send, at most one batch per new block"""
+        tracker = self.blockchain.block_tracker
+        if not self.blockchain.provider_pool or not tracker or not tracker.block_number:
+            return {}
+        latest_block = tracker.block_number
+        # Called from the watcher thread and, through snapshot, from request threads
+        with self._lock:
+            if latest_block == self._last_block and all(h in self._last for h in hashes):
+                return {h: self._last[h] for h in hashes}
+            self._last_block = latest_block
+
+        receipts = self.blockchain.rpc_batch([("eth_getTransactionReceipt", [h]) for h in hashes])
+        states = {}
+        for tx_hash, receipt in zip(hashes, receipts):
+            fields = self.blockchain.confirmations._status_fields(receipt, latest_block)
+            if fields is None:
+                states[tx_hash] = self._state(tx_hash, {"status": "pending"})
+            else:
+                states[tx_hash] = self._state(tx_hash, {"status": "pending", **fields})
+        return states
+
+    @staticmethod
+    def _state(tx_hash: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        status = record.get("status")
+        return {
+            "transaction_hash": tx_hash,
+            "status": "pending" if status == "submitted" else status,
+            "block_number": record.get("block_number"),
+            "confirmations": record.get("confirmations", 0),
+            "error": record.get("error")
+        }
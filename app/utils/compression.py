@@ -0,0 +1,121 @@
+import gzip
+import os
+from typing import List, Optional, Tuple
+import logging
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ("application/json",)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick br or gzip from an Accept-Encoding header, honouring q-values
+    Brotli wins ties when it is installed
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip()] = quality
+
+    wildcard = weights.get("*", 0.0)
+    candidates = (["br"] if brotli else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = weights.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def _vary_on_encoding(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Add Accept-Encoding to the Vary header unless it is already listed"""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" in value.lower():
+                return headers
+            headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    return headers + [(b"vary", b"Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON responses with brotli or gzip when the client accepts it.
+
+    Only complete bodies of at least COMPRESSION_MIN_SIZE bytes are
+    compressed: below that the headers cost more than they save. Streamed
+    responses (record listings, Server-Sent Events) pass through untouched so
+    rows and events still reach the client as they are produced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.minimum_size = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+        self.gzip_level = int(os.environ.get("GZIP_LEVEL", 6))
+        self.brotli_quality = int(os.environ.get("BROTLI_QUALITY", 5))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            body = message.get("body", b"")
+            response_headers: List[Tuple[bytes, bytes]] = list(start_message.get("headers", []))
+            names = {name.lower() for name, _ in response_headers}
+            content_type = next(
+                (value.decode("latin-1") for name, value in response_headers if name.lower() == b"content-type"), ""
+            )
+            compressible = content_type.split(";")[0].strip() in COMPRESSIBLE_TYPES
+
+            if not compressible or b"content-encoding" in names or message.get("more_body", False) \
+                    or len(body) < self.minimum_size:
+                passthrough = True
+                if compressible:
+                    start_message["headers"] = _vary_on_encoding(response_headers)
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+            response_headers = [(name, value) for name, value in response_headers if name.lower() != b"content-length"]
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1"))
+            ]
+            start_message["headers"] = _vary_on_encoding(response_headers)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
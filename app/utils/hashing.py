@@ -0,0 +1,141 @@
+import hashlib
+import json
+import math
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, Optional
+from bson import ObjectId
+from bson.binary import Binary
+from bson.decimal128 import Decimal128
+
+# Fields covered by a record's content digest. Anything else (prices, popularity,
+# blockchain bookkeeping, timestamps of later edits) can change without
+# invalidating an anchored hash.
+HASHED_FIELDS = {
+    "diagnosis": [
+        "_id", "user_id", "symptoms", "diagnosis_type", "diagnosis_text",
+        "condition_name", "confidence_score", "created_at"
+    ],
+    "medicine": [
+        "_id", "name", "generic_name", "description", "dosage_form",
+        "active_ingredients", "ingredients", "indications", "conditions",
+        "contraindications", "side_effects", "usage_instructions", "manufacturer"
+    ]
+}
+
+def _normalize_datetime(value: datetime) -> str:
+    """UTC ISO-8601 at millisecond precision, which is what MongoDB round-trips"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    value = value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value.isoformat(timespec="milliseconds") + "Z"
+
+def _tokens(value: Any) -> Iterator[str]:
+    """
+    Yield the canonical JSON form of a value piece by piece
+    Keys are sorted, separators are compact and BSON types map to fixed strings
+    """
+    if value is None:
+        yield "null"
+    elif value is True:
+        yield "true"
+    elif value is False:
+        yield "false"
+    elif isinstance(value, int):
+        yield str(value)
+    elif isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            raise ValueError(f"Cannot canonically hash non-finite float {value}")
+        # Integral floats hash like ints so 1.0 and 1 agree across drivers
+        yield str(int(value)) if value.is_integer() else repr(value)
+    elif isinstance(value, str):
+        yield json.dumps(value, ensure_ascii=False)
+    elif isinstance(value, ObjectId):
+        # Same as the str() form handlers already use, so either hashes identically
+        yield json.dumps(str(value))
+    elif isinstance(value, datetime):
+        yield json.dumps(_normalize_datetime(value))
+    elif isinstance(value, date):
+        yield json.dumps(value.isoformat())
+    elif isinstance(value, Decimal128):
+        yield json.dumps(str(value.to_decimal().normalize()))
+    elif isinstance(value, Decimal):
+        yield json.dumps(str(value.normalize()))
+    elif isinstance(value, (bytes, bytearray, Binary)):
+        yield json.dumps(bytes(value).hex())
+    elif isinstance(value, uuid.UUID):
+        yield json.dumps(str(value))
+    elif isinstance(value, dict):
+        yield "{"
+        for index, key in enumerate(sorted(value, key=str)):
+            if index:
+                yield ","
+            yield json.dumps(str(key), ensure_ascii=False)
+            yield ":"
+            yield from _tokens(value[key])
+        yield "}"
+    elif isinstance(value, (list, tuple)):
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ","
+            yield from _tokens(item)
+        yield "]"
+    elif isinstance(value, (set, frozenset)):
+        yield from _tokens(sorted(value, key=canonical_json))
+    else:
+        raise TypeError(f"Cannot canonically hash value of type {type(value).__name__}")
+
+def canonical_json(value: Any) -> str:
+    """
+    Serialize a value (including BSON types) to its canonical JSON string
+    """
+    return "".join(_tokens(value))
+
+def content_digest(value: Any) -> str:
+    """
+    sha256 hex digest of a value's canonical form, streamed without building the full string
+    """
+    hasher = hashlib.sha256()
+    for token in _tokens(value):
+        hasher.update(token.encode("utf-8"))
+    return hasher.hexdigest()
+
+def record_digest(record_type: str, record: Dict[str, Any]) -> str:
+    """
+    Digest of the hashed fields of a diagnosis or medicine record
+    """
+    fields = HASHED_FIELDS[record_type]
+    return content_digest({field: record.get(field) for field in fields if field in record})
+
+def stamp_digest(record_type: str, record: Dict[str, Any]) -> str:
+    """
+    Compute a record's digest at write time and store it on the document
+    content_digest_at remembers which updated_at the digest belongs to
+    """
+    digest = record_digest(record_type, record)
+    record["content_digest"] = digest
+    record["content_digest_at"] = record.get("updated_at")
+    return digest
+
+def current_digest(record_type: str, record: Dict[str, Any], collection=None) -> str:
+    """
+    Get a record's digest, re-hashing only if it was updated since the digest was stored
+    When a collection is given, a recomputed digest is written back for next time
+    """
+    stored: Optional[str] = record.get("content_digest")
+    if stored and record.get("content_digest_at") == record.get("updated_at"):
+        return stored
+
+    digest = record_digest(record_type, record)
+    if collection is not None and record.get("_id") is not None:
+        record_id = record["_id"]
+        if isinstance(record_id, str) and ObjectId.is_valid(record_id):
+            record_id = ObjectId(record_id)
+        # Only write back if nobody updated the document in the meantime
+        collection.update_one(
+            {"_id": record_id, "updated_at": record.get("updated_at")},
+            {"$set": {"content_digest": digest, "content_digest_at": record.get("updated_at")}}
+        )
+    return digest
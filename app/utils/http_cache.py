@@ -0,0 +1,106 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional
+import logging
+from fastapi import Request, Response
+from app.utils.compression import choose_encoding
+from app.utils.serialization import BSONResponse, dumps
+
+logger = logging.getLogger(__name__)
+
+# Bump when the JSON shape of cached responses changes, so clients drop old representations
+ETAG_VERSION = "1"
+
+CATALOG_MAX_AGE = int(os.environ.get("CATALOG_MAX_AGE", 0))
+
+def documents_etag(documents: Iterable[Dict[str, Any]], variant: str = "") -> Optional[str]:
+    """
+    Weak ETag from each document's _id and updated_at plus the request variant (e.g. query)
+    Returns None if a document has no updated_at, since its changes would go unnoticed
+    """
+    hasher = hashlib.blake2b(f"{ETAG_VERSION}\n{variant}\n".encode("utf-8"), digest_size=16)
+    for document in documents:
+        updated_at = document.get("updated_at")
+        if not isinstance(updated_at, datetime):
+            return None
+        hasher.update(f"{document.get('_id')}:{updated_at.isoformat()}\n".encode("utf-8"))
+    return f'W/"{hasher.hexdigest()}"'
+
+def last_modified(documents: Iterable[Dict[str, Any]]) -> Optional[datetime]:
+    """Latest updated_at of the documents (naive UTC), if all have one"""
+    latest = None
+    for document in documents:
+        updated_at = document.get("updated_at")
+        if not isinstance(updated_at, datetime):
+            return None
+        if latest is None or updated_at > latest:
+            latest = updated_at
+    return latest
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def is_not_modified(request: Request, etag: Optional[str], modified: Optional[datetime]) -> bool:
+    """
+    Evaluate If-None-Match (weak comparison) or, without it, If-Modified-Since
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        opaque = etag[2:] if etag.startswith("W/") else etag
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+                return True
+        return False
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return _as_utc(modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+def cached_json(request: Request, content: Any, documents: Iterable[Dict[str, Any]],
+                variant: str = "", collection: bool = False) -> Response:
+    """
+    JSON response with ETag and Last-Modified validators for the given source documents
+    A matching conditional request gets a 304 before the content is serialized;
+    documents without updated_at fall back to an ETag over the serialized body.
+    Collections (e.g. search results) only get the ETag: documents leaving or
+    joining the set do not move the latest updated_at, but they change the ETag.
+    """
+    documents = list(documents)
+    # CompressionMiddleware encodes the body per Accept-Encoding, so each encoding gets its own tag
+    encoding = choose_encoding(request.headers.get("accept-encoding", "")) or "identity"
+    variant = f"{variant}\n{encoding}"
+    etag = documents_etag(documents, variant)
+    modified = None if collection else last_modified(documents)
+    body = None
+    if etag is None:
+        body = dumps(content)
+        etag = f'W/"{hashlib.blake2b(variant.encode("utf-8") + body, digest_size=16).hexdigest()}"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={CATALOG_MAX_AGE}" if CATALOG_MAX_AGE else "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(modified), usegmt=True)
+
+    if is_not_modified(request, etag, modified):
+        return Response(status_code=304, headers=headers)
+    if body is not None:
+        return Response(body, media_type="application/json", headers=headers)
+    return BSONResponse(content, headers=headers)
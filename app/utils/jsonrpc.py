@@ -0,0 +1,51 @@
+import itertools
+from typing import Any, List, Optional, Sequence, Tuple
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+_request_ids = itertools.count(1)
+
+class JsonRpcError(Exception):
+    """Raised when a JSON-RPC batch request fails as a whole"""
+    pass
+
+def batch_call(url: str, calls: Sequence[Tuple[str, List[Any]]],
+               session: Optional[requests.Session] = None,
+               timeout: float = 10) -> List[Any]:
+    """
+    Send several JSON-RPC calls in one HTTP request
+
+    calls is a sequence of (method, params) pairs. Results are returned in the
+    same order; a call that errored individually yields None.
+    """
+    if not calls:
+        return []
+
+    ids = [next(_request_ids) for _ in calls]
+    payload = [
+        {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+        for request_id, (method, params) in zip(ids, calls)
+    ]
+
+    http = session or requests
+    try:
+        response = http.post(url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        replies = response.json()
+    except Exception as e:
+        raise JsonRpcError(f"JSON-RPC batch of {len(calls)} calls failed: {e}") from e
+
+    if not isinstance(replies, list):
+        # Some nodes answer a rejected batch with a single error object
+        raise JsonRpcError(f"JSON-RPC batch rejected: {replies}")
+
+    by_id = {reply.get("id"): reply for reply in replies}
+    results = []
+    for request_id, (method, _) in zip(ids, calls):
+        reply = by_id.get(request_id, {})
+        if "error" in reply:
+            logger.warning(f"JSON-RPC {method} failed: {reply['error']}")
+        results.append(reply.get("result"))
+    return results
@@ -0,0 +1,63 @@
+import hashlib
+from typing import List
+
+# Pairs are hashed in sorted order so a proof is just the list of sibling
+# hashes; this matches MedicalRecords.verifyInclusion on-chain.
+
+def hash_leaf(record_type: str, record_id: str, data_hash: str) -> bytes:
+    """
+    Compute the Merkle leaf for a record, binding its type and id to its data hash
+    """
+    return hashlib.sha256(f"{record_type}:{record_id}:{data_hash}".encode()).digest()
+
+def hash_pair(left: bytes, right: bytes) -> bytes:
+    """
+    Hash two sibling nodes in sorted order
+    """
+    if right < left:
+        left, right = right, left
+    return hashlib.sha256(left + right).digest()
+
+def build_tree(leaves: List[bytes]) -> List[List[bytes]]:
+    """
+    Build all levels of a Merkle tree, from the leaves up to the root
+    An unpaired node at the end of a level is carried up unchanged
+    """
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+def merkle_root(levels: List[List[bytes]]) -> bytes:
+    """
+    Get the root of a tree built by build_tree
+    """
+    return levels[-1][0]
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[bytes]:
+    """
+    Get the sibling hashes proving inclusion of the leaf at index
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        index //= 2
+    return proof
+
+def verify_proof(leaf: bytes, proof: List[bytes], root: bytes) -> bool:
+    """
+    Recompute the root from a leaf and its proof and compare it to the expected root
+    """
+    computed = leaf
+    for sibling in proof:
+        computed = hash_pair(computed, sibling)
+    return computed == root
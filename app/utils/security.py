@@ -1,39 +1,103 @@
-import os
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt
-from flask_jwt_extended import create_access_token as flask_create_access_token
-from eth_account.messages import encode_defunct
-from eth_account import Account
-import secrets
+from app.core.config import settings
+from app.services.principal_cache import principal_cache
+from app.services.signature_service import signature_service
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-# JWT Configuration
-SECRET_KEY = os.environ.get("SECRET_KEY", secrets.token_hex(32))
+# JWT Configuration (shared by every worker process, so tokens verify on any of them)
+SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 
-def create_authentication_message(wallet_address: str) -> str:
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Stream tokens travel in a query string (EventSource cannot set headers), so they are short-lived
+STREAM_TOKEN_TTL = int(os.environ.get("STREAM_TOKEN_TTL", 60))
+
+def create_authentication_message(wallet_address: str, nonce: str) -> str:
     """
     Create a message for Web3 authentication
+    The nonce ties the message to a challenge in the challenge store
     """
     timestamp = datetime.utcnow().isoformat()
-    return f"Sign this message to authenticate with TeleMedChain: {wallet_address} at {timestamp}"
+    return f"Sign this message to authenticate with TeleMedChain: {wallet_address} at {timestamp}\nNonce: {nonce}"
 
 def verify_eth_signature(message: str, signature: str, wallet_address: str) -> bool:
     """
     Verify an Ethereum signature
+    Recovery runs in the signature service's process pool and is cached per challenge
     """
-    try:
-        message_hash = encode_defunct(text=message)
-        recovered_address = Account.recover_message(message_hash, signature=signature)
-        return recovered_address.lower() == wallet_address.lower()
-    except Exception as e:
-        logger.error(f"Error verifying Ethereum signature: {e}")
-        return False
+    return signature_service.verify(message, signature, wallet_address)
+
+async def verify_eth_signature_async(message: str, signature: str, wallet_address: str) -> bool:
+    """
+    Verify an Ethereum signature without blocking the event loop
+    """
+    return await signature_service.verify_async(message, signature, wallet_address)
+
+async def get_token_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Dict[str, Any]:
+    """
+    Claims of the request's bearer token; rejects missing, invalid or revoked tokens with 401
+    """
+    claims = decode_token(credentials.credentials) if credentials else {}
+    if claims.get("type") != "access" or not await is_current(claims):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return claims
+
+async def is_current(claims: Dict[str, Any]) -> bool:
+    """
+    Whether a token's user exists and its token version has not been revoked
+    Answered from the principal cache, so usually without a users read
+    """
+    return bool(claims.get("sub")) and await principal_cache.get(claims["sub"], claims.get("tv", 0)) is not None
 
-def create_access_token(identity: str, expires_delta: Optional[timedelta] = None) -> str:
+async def get_current_user_id(claims: Dict[str, Any] = Depends(get_token_claims)) -> str:
+    """
+    Id of the user behind the request's bearer token
+    """
+    return claims["sub"]
+
+async def get_stream_user_id(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> str:
+    """
+    Id of the user behind a streaming request
+    Browsers pass a stream token as ?token=, other clients may send their bearer token
+    """
+    if token:
+        claims = decode_token(token)
+        if claims.get("type") == "stream" and await is_current(claims):
+            return claims["sub"]
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return await get_current_user_id(await get_token_claims(credentials))
+
+async def current_principal(claims: Dict[str, Any] = Depends(get_token_claims)) -> Optional[Dict[str, Any]]:
+    """
+    Profile of the user behind the request's bearer token, from the principal cache
+    """
+    return await principal_cache.get(claims["sub"], claims.get("tv", 0))
+
+def token_claims(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Claims tying a token to the user's current token version, so revoking it invalidates the token
+    """
+    return {"tv": user.get("token_version", 0)}
+
+def create_access_token(identity: str, expires_delta: Optional[timedelta] = None,
+                        additional_claims: Optional[Dict[str, Any]] = None) -> str:
     """
     Create a JWT access token
     """
@@ -42,10 +106,22 @@ def create_access_token(identity: str, expires_delta: Optional[timedelta] = None
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     
-    return flask_create_access_token(
-        identity=identity,
-        expires_delta=expires_delta
-    )
+    claims = dict(additional_claims or {})
+    claims.update({"sub": identity, "exp": expire, "iat": datetime.utcnow(), "type": "access"})
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_stream_token(identity: str, token_version: int = 0) -> str:
+    """
+    Create a short-lived token that only authenticates event streams
+    """
+    claims = {
+        "sub": identity,
+        "tv": token_version,
+        "exp": datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_TTL),
+        "iat": datetime.utcnow(),
+        "type": "stream"
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
 
 def decode_token(token: str) -> Dict[str, Any]:
     """
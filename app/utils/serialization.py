@@ -0,0 +1,38 @@
+from decimal import Decimal
+from typing import Any
+import logging
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+def _default(value: Any) -> Any:
+    """Encode the BSON types orjson does not know; datetimes, UUIDs and dataclasses are native"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    # Decimals are money and token amounts; a float would round them, so send the exact digits
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize a value, including raw MongoDB documents, to compact JSON
+    ObjectIds, Decimal128 and Decimal become strings and
+    naive datetimes are written in ISO 8601 as stored (UTC)
+    """
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class BSONResponse(JSONResponse):
+    """
+    JSON response that serializes raw MongoDB documents directly with orjson
+    Returning one from a handler also skips FastAPI's jsonable_encoder pass
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,142 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Canonical symptom -> synonyms / colloquial phrasings found in free-text complaints
+SYMPTOM_SYNONYMS: Dict[str, List[str]] = {
+    "fever": ["fever", "feverish", "high temperature", "raised temperature", "pyrexia", "chills"],
+    "cough": ["cough", "coughing", "dry cough", "wet cough", "productive cough"],
+    "headache": ["headache", "headaches", "head ache", "head pain", "head hurts", "head is pounding"],
+    "fatigue": ["fatigue", "tired", "tiredness", "exhausted", "exhaustion", "lethargy", "lethargic", "weakness"],
+    "sore throat": ["sore throat", "throat pain", "scratchy throat", "painful swallowing", "throat hurts"],
+    "runny nose": ["runny nose", "running nose", "nasal discharge", "rhinorrhea", "stuffy nose",
+                   "nasal congestion"],
+    "shortness of breath": ["shortness of breath", "short of breath", "breathlessness", "difficulty breathing",
+                            "trouble breathing", "can't breathe", "cannot breathe", "dyspnea"],
+    "chest pain": ["chest pain", "chest tightness", "tight chest", "pain in chest", "pain in my chest"],
+    "nausea": ["nausea", "nauseous", "nauseated", "queasy", "feel sick"],
+    "vomiting": ["vomiting", "vomit", "vomited", "throwing up", "threw up"],
+    "diarrhea": ["diarrhea", "diarrhoea", "loose stools", "loose motions", "watery stool"],
+    "abdominal pain": ["abdominal pain", "stomach ache", "stomachache", "stomach pain", "belly pain",
+                       "tummy ache", "cramps", "abdominal cramps"],
+    "rash": ["rash", "rashes", "skin rash", "hives", "itchy skin", "red spots"],
+    "joint pain": ["joint pain", "joint pains", "aching joints", "arthralgia", "sore joints"],
+    "dizziness": ["dizziness", "dizzy", "lightheaded", "light headed", "vertigo", "room spinning"],
+    "ear pain": ["ear pain", "earache", "ear ache", "ear hurts"],
+    "sinus pressure": ["sinus pressure", "sinus pain", "facial pressure", "sinus congestion"],
+    "frequent urination": ["frequent urination", "urinating often", "peeing a lot", "polyuria"],
+    "burning urination": ["burning urination", "burning when urinating", "painful urination", "dysuria",
+                          "burns when i pee"],
+}
+
+# Words that deny the symptom mentioned right after them ("no fever", "denies cough")
+NEGATION_CUES = {
+    "no", "not", "without", "denies", "deny", "denied", "never", "none", "negative",
+    "don't", "doesn't", "didn't", "haven't", "hasn't", "isn't"
+}
+# How many words before a symptom a negation cue still applies to ("no fever or cough")
+NEGATION_WINDOW = 3
+# A negation does not carry past the end of its clause ("no fever, but a cough")
+CLAUSE_BREAKS = re.compile(r"[.;,!?\n]|\bbut\b")
+WORD = re.compile(r"[a-z']+")
+
+
+class SymptomExtractor:
+    """
+    Aho-Corasick automaton over the symptom vocabulary and its synonyms.
+
+    The automaton is built once; each call to ``extract`` is a single linear
+    pass over the input text regardless of vocabulary size. Negated mentions
+    ("no fever", "denies cough") are not reported.
+    """
+
+    def __init__(self, synonyms: Dict[str, Iterable[str]]):
+        # goto[state] maps a character to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # output[state] holds (pattern_length, canonical) pairs ending at that state
+        self._output: List[List[Tuple[int, str]]] = [[]]
+        for canonical, phrases in synonyms.items():
+            self._add(canonical.lower(), canonical)
+            for phrase in phrases:
+                self._add(phrase.lower(), canonical)
+        self._build()
+
+    def _add(self, pattern: str, canonical: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if (len(pattern), canonical) not in self._output[state]:
+            self._output[state].append((len(pattern), canonical))
+
+    def _build(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                # Children of the root always fail back to the root
+                self._fail[next_state] = self._goto[fallback].get(char, 0) if state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def extract(self, text: Optional[str]) -> List[str]:
+        """
+        Return canonical symptoms mentioned in the text, in order of first mention
+        """
+        if not text:
+            return []
+
+        text = text.lower()
+        length = len(text)
+        found: List[str] = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_length, canonical in self._output[state]:
+                start = index - pattern_length + 1
+                # Only accept whole-word matches ("rash" must not match "crash")
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if index + 1 < length and text[index + 1].isalnum():
+                    continue
+                if canonical not in found and not self._negated(text, start):
+                    found.append(canonical)
+        return found
+
+    @staticmethod
+    def _negated(text: str, start: int) -> bool:
+        """Whether a negation cue precedes the match at start within its clause"""
+        # A few words back is enough, and keeps long texts from being rescanned per match
+        clause = CLAUSE_BREAKS.split(text[max(0, start - 64):start])[-1]
+        return any(word in NEGATION_CUES for word in WORD.findall(clause)[-NEGATION_WINDOW:])
+
+    def extract_all(self, symptoms: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Extract canonical symptoms from a list of reported symptom strings
+        """
+        found: List[str] = []
+        for text in symptoms or []:
+            for canonical in self.extract(text):
+                if canonical not in found:
+                    found.append(canonical)
+        return found
+
+
+# Create singleton instance
+symptom_extractor = SymptomExtractor(SYMPTOM_SYNONYMS)
@@ -0,0 +1,95 @@
+"""
+Serialization benchmark for 100-document responses.
+
+Compares the per-response cost of
+  - the previous path: convert each _id with str() in a copy loop, then
+    FastAPI's jsonable_encoder and json.dumps
+  - BSONResponse: orjson over the raw documents
+
+    python benchmarks/serialization.py --documents 100 --repeat 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import Decimal128, ObjectId
+from fastapi.encoders import jsonable_encoder
+from app.utils.serialization import BSONResponse
+
+def make_documents(count: int):
+    """Medicine-shaped documents as Motor returns them"""
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Medicine {i}",
+            "manufacturer": "TeleMed Pharma",
+            "conditions": ["Common Cold", "Influenza", "Sinusitis"],
+            "active_ingredients": ["paracetamol", "phenylephrine"],
+            "ingredients": ["paracetamol", "phenylephrine", "lactose", "starch"],
+            "popularity_score": random.randint(1, 100),
+            "verified_on_blockchain": bool(i % 2),
+            "prices": [
+                {
+                    "pharmacy_id": ObjectId(),
+                    "location": location,
+                    "price": Decimal128(Decimal(random.randint(100, 5000)) / 100),
+                    "updated_at": now - timedelta(hours=i)
+                }
+                for location in ("Mumbai", "Delhi", "Pune")
+            ],
+            "created_at": now - timedelta(days=i),
+            "updated_at": now
+        }
+        for i in range(count)
+    ]
+
+def previous_path(documents) -> bytes:
+    documents = [dict(document, _id=str(document["_id"])) for document in documents]
+    # jsonable_encoder cannot encode the nested ObjectIds and Decimal128 prices on its own
+    encoded = jsonable_encoder(
+        documents, custom_encoder={ObjectId: str, Decimal128: lambda d: str(d.to_decimal())}
+    )
+    return json.dumps(encoded, separators=(",", ":")).encode("utf-8")
+
+def bson_response(documents) -> bytes:
+    return BSONResponse(documents).body
+
+def timed(fn, documents, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(documents)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    results = {}
+    for name, fn in (("str loop + jsonable_encoder", previous_path), ("BSONResponse (orjson)", bson_response)):
+        fn(documents)  # warm up
+        samples = timed(fn, documents, args.repeat)
+        results[name] = statistics.median(samples)
+        print(f"{name:<30} median {results[name] * 1e6:9.1f} us  "
+              f"p95 {sorted(samples)[int(len(samples) * 0.95)] * 1e6:9.1f} us  "
+              f"({len(fn(documents))} bytes)")
+
+    baseline, fast = results.values()
+    print(f"speedup: {baseline / fast:.1f}x for {args.documents} documents")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
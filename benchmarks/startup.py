@@ -0,0 +1,83 @@
+"""
+Cold-start benchmark for the API.
+
+Measures, each in a fresh interpreter:
+  - import time of app.main (median of --runs imports)
+  - time from launching uvicorn to the first 200 from /api/health
+
+Exits non-zero if either median exceeds its budget, so it can gate CI:
+
+    python benchmarks/startup.py --import-budget 2.0 --first-response-budget 4.0
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import() -> float:
+    """Seconds to import app.main in a new interpreter"""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_response(timeout: float) -> float:
+    """Seconds from starting a single uvicorn worker to the first 200 from /api/health"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"No response from {url} within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=float(os.environ.get("STARTUP_IMPORT_BUDGET", 2.0)))
+    parser.add_argument("--first-response-budget", type=float,
+                        default=float(os.environ.get("STARTUP_FIRST_RESPONSE_BUDGET", 4.0)))
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    first_responses = [measure_first_response(timeout=args.first_response_budget * 5) for _ in range(args.runs)]
+
+    results = [
+        ("import app.main", imports, args.import_budget),
+        ("time to first response", first_responses, args.first_response_budget)
+    ]
+    failed = False
+    for name, samples, budget in results:
+        median = statistics.median(samples)
+        ok = median <= budget
+        failed |= not ok
+        print(f"{name:<24} median {median * 1000:8.1f} ms  max {max(samples) * 1000:8.1f} ms  "
+              f"budget {budget * 1000:8.1f} ms  {'ok' if ok else 'OVER BUDGET'}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,12 +28,14 @@ contract MedicalRecords {
     mapping(string => Medicine) public medicines;
     mapping(string => DiagnosisRecord) public diagnoses;
     mapping(address => bool) public authorizedVerifiers;
+    mapping(bytes32 => uint256) public anchoredRoots; // Merkle root => anchor timestamp
     
     // Events
     event MedicineVerified(string medicineId, string dataHash, uint256 timestamp);
     event DiagnosisRecorded(string diagnosisId, string dataHash, uint256 timestamp);
     event VerifierAdded(address verifier);
     event VerifierRemoved(address verifier);
+    event RootAnchored(bytes32 indexed root, uint256 leafCount, uint256 timestamp);
     
     // Modifiers
     modifier onlyOwner() {
@@ -144,4 +146,42 @@ contract MedicalRecords {
         string memory storedHash = getDiagnosisHash(diagnosisId);
         return keccak256(abi.encodePacked(storedHash)) == keccak256(abi.encodePacked(dataHash));
     }
+    
+    /**
+     * @dev Anchor the Merkle root of a batch of record hashes
+     * @param root Merkle root over the batch's leaf hashes
+     * @param leafCount Number of records in the batch
+     */
+    function anchorRoot(bytes32 root, uint256 leafCount) public onlyAuthorized {
+        require(anchoredRoots[root] == 0, "Root already anchored");
+        anchoredRoots[root] = block.timestamp;
+        
+        emit RootAnchored(root, leafCount, block.timestamp);
+    }
+    
+    /**
+     * @dev Check a record's inclusion proof against an anchored root
+     * Pairs are hashed in sorted order with sha256, matching the off-chain tree
+     * @param leaf Leaf hash of the record
+     * @param proof Sibling hashes from the leaf up to the root
+     * @param root Anchored Merkle root
+     * @return bool True if the proof is valid and the root is anchored
+     */
+    function verifyInclusion(bytes32 leaf, bytes32[] memory proof, bytes32 root) public view returns (bool) {
+        if (anchoredRoots[root] == 0) {
+            return false;
+        }
+        
+        bytes32 computed = leaf;
+        for (uint256 i = 0; i < proof.length; i++) {
+            bytes32 sibling = proof[i];
+            if (computed <= sibling) {
+                computed = sha256(abi.encodePacked(computed, sibling));
+            } else {
+                computed = sha256(abi.encodePacked(sibling, computed));
+            }
+        }
+        
+        return computed == root;
+    }
 }
@@ -74,12 +74,13 @@ export function AuthProvider({ children }) {
   };
 
   // Login with Web3 wallet
-  const loginWithWeb3 = async (address, signature) => {
+  const loginWithWeb3 = async (address, signature, message) => {
     setError(null);
     try {
-      const response = await axios.post('/api/users/web3/login', {
+      const response = await axios.post('/api/users/web3-login', {
         wallet_address: address,
-        signature
+        signature,
+        message
       });
       
       const { access_token, user } = response.data;
@@ -96,6 +97,13 @@ export function AuthProvider({ children }) {
 
   // Logout the user
   const logout = () => {
+    const token = localStorage.getItem('token');
+    if (token) {
+      // Revoke the token server-side too; logging out locally must not wait on it
+      axios.post('/api/users/logout', null, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch(err => console.error('Error revoking token:', err));
+    }
     localStorage.removeItem('token');
     setCurrentUser(null);
     navigate('/');
@@ -279,6 +279,35 @@ export function Web3Provider({ children }) {
     }
   };
 
+  // Follow transaction status changes pushed by the backend until each is confirmed or failed
+  // Returns a function that closes the stream
+  const watchTransactions = async (hashes, onStatus) => {
+    if (!hashes || hashes.length === 0) {
+      return () => {};
+    }
+    try {
+      // EventSource cannot send an Authorization header, so the stream takes a short-lived token
+      const token = localStorage.getItem('token');
+      const response = await axios.post(
+        `/api/blockchain/transactions/stream-token`,
+        {},
+        { headers: { Authorization: `Bearer ${token}` } }
+      );
+      const params = new URLSearchParams({ tx: hashes.join(','), token: response.data.token });
+      const source = new EventSource(`/api/blockchain/transactions/stream?${params}`);
+
+      source.addEventListener('status', (event) => onStatus(JSON.parse(event.data)));
+      source.addEventListener('end', () => source.close());
+      // The token expires shortly after connecting, so reconnecting would only be refused
+      source.onerror = () => source.close();
+
+      return () => source.close();
+    } catch (error) {
+      console.error('Error watching transactions:', error);
+      return () => {};
+    }
+  };
+
   const value = {
     web3,
     accounts,
@@ -294,7 +323,8 @@ export function Web3Provider({ children }) {
     verifyMedicine,
     storeMedicalRecord,
     getTokenInfo,
-    mintReward
+    mintReward,
+    watchTransactions
   };
 
   return (
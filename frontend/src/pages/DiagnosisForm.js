@@ -52,7 +52,7 @@ const DiagnosisSchema = Yup.object().shape({
 
 const DiagnosisForm = () => {
   const { currentUser } = useAuth();
-  const { storeMedicalRecord, verifyMedicine, mintReward } = useWeb3();
+  const { storeMedicalRecord, verifyMedicine, mintReward, watchTransactions } = useWeb3();
   const [diagnosis, setDiagnosis] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
@@ -93,12 +93,29 @@ const DiagnosisForm = () => {
         setRecommendedMedicines(medicinesResponse.data);
         
         // Store diagnosis record on blockchain
-        await storeMedicalRecord({
+        const record = await storeMedicalRecord({
           record_type: 'diagnosis',
           diagnosis_id: response.data.diagnosis_id,
           timestamp: new Date().toISOString()
         });
         
+        // Tell the user once the record is on chain, without polling for it
+        if (record && record.transaction_hash) {
+          watchTransactions([record.transaction_hash], (state) => {
+            if (state.status === 'confirmed' || state.status === 'failed') {
+              toast({
+                title: state.status === 'confirmed' ? 'Record Confirmed' : 'Record Not Stored',
+                description: state.status === 'confirmed'
+                  ? `Your diagnosis record was confirmed in block ${state.block_number}.`
+                  : 'Storing your diagnosis record on the blockchain failed.',
+                status: state.status === 'confirmed' ? 'success' : 'error',
+                duration: 5000,
+                isClosable: true,
+              });
+            }
+          });
+        }
+        
         // Mint reward tokens for completing diagnosis
         await mintReward('diagnosis');
         
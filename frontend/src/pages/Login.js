@@ -19,6 +19,7 @@ import {
   VStack
 } from '@chakra-ui/react';
 import { Link as RouterLink, useNavigate } from 'react-router-dom';
+import axios from 'axios';
 import { useAuth } from '../contexts/AuthContext';
 import { useWeb3 } from '../contexts/Web3Context';
 import { Formik, Form, Field } from 'formik';
@@ -31,8 +32,8 @@ const LoginSchema = Yup.object().shape({
 });
 
 const Login = () => {
-  const { login, error: authError } = useAuth();
-  const { connected, connectWallet, signMessage, loginWithWeb3 } = useWeb3();
+  const { login, loginWithWeb3, error: authError } = useAuth();
+  const { web3, accounts, connected, connectWallet, signMessage } = useWeb3();
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(false);
   const navigate = useNavigate();
@@ -66,12 +67,18 @@ const Login = () => {
         await connectWallet();
       }
       
-      const message = `Sign this message to log in to TeleMedChain at ${new Date().toISOString()}`;
+      const [walletAddress] = accounts.length ? accounts : await web3.eth.getAccounts();
+      
+      // The server only accepts a one-time challenge it issued, signed exactly as given
+      const challenge = await axios.get('/api/users/web3-challenge', {
+        params: { wallet_address: walletAddress }
+      });
+      const { message } = challenge.data;
       const signatureData = await signMessage(message);
       
       if (signatureData) {
         const { address, signature } = signatureData;
-        const result = await loginWithWeb3(address, signature);
+        const result = await loginWithWeb3(address, signature, message);
         
         if (!result) {
           setError(authError || 'Failed to log in with wallet');
@@ -1,16 +1,21 @@
 import os
-from app import create_app
-from flask_jwt_extended import JWTManager
+import uvicorn
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-app = create_app()
-
-# Configure JWT
-app.config["JWT_SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
-jwt = JWTManager(app)
-
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=8000)
+    workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+    if workers > 1:
+        # Web3 login challenges must be visible to every worker process
+        os.environ.setdefault("CHALLENGE_STORE", "mongo")
+    uvicorn.run(
+        "app.main:app",
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", 8000)),
+        workers=workers,
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        log_level=os.environ.get("LOG_LEVEL", "info").lower()
+    )
@@ -0,0 +1,36 @@
+"""
+Move legacy users.medical_history arrays into medical_history_buckets.
+
+Each user's array is split into closed buckets of HISTORY_BUCKET_SIZE ids and
+removed from the user document. Users already migrated have no array left, so
+the script can be re-run safely. Run it once against the MONGODB_URL database:
+
+    python scripts/migrate_medical_history.py --batch-size 100
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=100, help="users fetched per cursor batch")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    from app.db.database import db
+    from app.services.diagnosis_service import diagnosis_service
+
+    db.ensure_indexes()
+    migrated = diagnosis_service.migrate_legacy_medical_history(batch_size=args.batch_size)
+    print(f"migrated medical history of {migrated} users")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
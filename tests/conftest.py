@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Unit tests never reach these; the clients are only built on first use
+os.environ.setdefault("MONGODB_URL", "mongodb://127.0.0.1:1")
@@ -0,0 +1,67 @@
+from web3 import Web3
+from app.services.blockchain_service import BlockchainService
+from app.services.contract_abi import MEDICAL_RECORDS_ABI
+
+CONTRACT = "0x" + "33" * 20
+
+
+class StubAnchoring:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get_inclusions(self, keys):
+        return {key[:2]: self.entries[key[:2]] for key in keys if key[:2] in self.entries}
+
+    def verify_entry(self, entry, record_type, record_id, data_hash):
+        return {"verified": entry["data_hash"] == data_hash, "anchor_status": "confirmed"}
+
+
+def service_with(entries=None):
+    service = BlockchainService.__new__(BlockchainService)
+    service.web3 = Web3()
+    service.contract = service.web3.eth.contract(address=Web3.to_checksum_address(CONTRACT), abi=MEDICAL_RECORDS_ABI)
+    service.anchoring = StubAnchoring(entries or {})
+    service.batches = []
+    # eth_call data -> ABI-encoded reply, None for a reverted call
+    service.replies = {}
+
+    def rpc_batch(calls):
+        service.batches.append(calls)
+        return [service.replies.get(call[1][0]["data"]) for call in calls]
+
+    service.rpc_batch = rpc_batch
+    return service
+
+def set_reply(service, function, types, values):
+    service.replies[function._encode_transaction_data()] = Web3.to_hex(service.web3.codec.encode(types, values))
+
+def test_unanchored_records_share_one_rpc_batch():
+    service = service_with()
+    functions = service.contract.functions
+    set_reply(service, functions.getDiagnosisHash("d1"), ["string"], ["aa"])
+    set_reply(service, functions.getDiagnosisHash("d2"), ["string"], ["bb"])
+    set_reply(service, functions.isMedicineVerified("m1"), ["bool"], [True])
+
+    results = service.verify_records_bulk([
+        {"record_type": "diagnosis", "record_id": "d1", "data_hash": "aa"},
+        {"record_type": "diagnosis", "record_id": "d2", "data_hash": "cc"},
+        {"record_type": "diagnosis", "record_id": "d3", "data_hash": "dd"},
+        {"record_type": "medicine", "record_id": "m1", "data_hash": "ee"}
+    ])
+
+    assert len(service.batches) == 1 and len(service.batches[0]) == 4
+    assert results["d1"]["verified"]
+    assert not results["d2"]["verified"] and results["d2"]["anchored_hash"] == "bb"
+    assert results["d3"] == {"verified": False, "anchor_status": "not_found"}
+    assert results["m1"]["verified"]
+
+def test_anchored_records_need_no_rpc():
+    service = service_with({("diagnosis", "d1"): {"data_hash": "aa"}})
+    results = service.verify_records_bulk([{"record_type": "diagnosis", "record_id": "d1", "data_hash": "aa"}])
+    assert results["d1"]["verified"]
+    assert service.batches == []
+
+def test_missing_expected_hash_is_not_verified():
+    service = service_with()
+    set_reply(service, service.contract.functions.getDiagnosisHash("d1"), ["string"], ["aa"])
+    assert not service.get_verification_details("d1", "diagnosis")["verified"]
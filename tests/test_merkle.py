@@ -0,0 +1,124 @@
+import hashlib
+import pytest
+from app.services import anchoring_service
+from app.services.anchoring_service import AnchoringService
+from app.utils.merkle import build_tree, hash_leaf, hash_pair, merkle_proof, merkle_root, verify_proof
+
+def leaves(count):
+    return [hash_leaf("diagnosis", str(i), hashlib.sha256(str(i).encode()).hexdigest()) for i in range(count)]
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 5, 7, 8, 9, 16, 17, 100])
+def test_every_leaf_proves_inclusion(count):
+    tree_leaves = leaves(count)
+    levels = build_tree(tree_leaves)
+    root = merkle_root(levels)
+    for index, leaf in enumerate(tree_leaves):
+        assert verify_proof(leaf, merkle_proof(levels, index), root)
+
+def test_proof_fails_for_other_leaf_or_root():
+    tree_leaves = leaves(9)
+    levels = build_tree(tree_leaves)
+    proof = merkle_proof(levels, 3)
+    tampered = hash_leaf("diagnosis", "3", "0" * 64)
+    assert not verify_proof(tampered, proof, merkle_root(levels))
+    assert not verify_proof(tree_leaves[3], proof, merkle_root(build_tree(leaves(8))))
+
+def test_single_leaf_is_its_own_root():
+    (leaf,) = leaves(1)
+    levels = build_tree([leaf])
+    assert merkle_root(levels) == leaf
+    assert merkle_proof(levels, 0) == []
+
+def test_unpaired_node_is_carried_up():
+    a, b, c = leaves(3)
+    assert merkle_root(build_tree([a, b, c])) == hash_pair(hash_pair(a, b), c)
+
+def test_pairs_hash_in_sorted_order():
+    a, b = leaves(2)
+    assert hash_pair(a, b) == hash_pair(b, a)
+
+def test_empty_tree_is_rejected():
+    with pytest.raises(ValueError):
+        build_tree([])
+
+def test_leaf_binds_type_and_id():
+    assert hash_leaf("diagnosis", "1", "ab") != hash_leaf("medicine", "1", "ab")
+    assert hash_leaf("diagnosis", "1", "ab") != hash_leaf("diagnosis", "2", "ab")
+
+
+class FakeBatches:
+    def __init__(self, batches):
+        self.batches = batches
+
+    def find_one(self, query, projection=None):
+        return self.batches.get(query["_id"])
+
+class FakeDatabase:
+    def __init__(self, batches):
+        self.batches = FakeBatches(batches)
+
+    def anchor_batches_collection(self):
+        return self.batches
+
+def anchored_entry(index=2, count=5, **fields):
+    data_hash = hashlib.sha256(str(index).encode()).hexdigest()
+    tree_leaves = [hash_leaf("diagnosis", str(i), hashlib.sha256(str(i).encode()).hexdigest()) for i in range(count)]
+    levels = build_tree(tree_leaves)
+    entry = {
+        "status": "anchored",
+        "batch_id": "batch",
+        "leaf": tree_leaves[index].hex(),
+        "root": merkle_root(levels).hex(),
+        "proof": [node.hex() for node in merkle_proof(levels, index)],
+        "data_hash": data_hash,
+        "transaction_hash": "0xabc",
+        **fields
+    }
+    return entry, str(index), data_hash
+
+@pytest.fixture
+def anchoring(monkeypatch):
+    def make(batch_status):
+        monkeypatch.setattr(anchoring_service, "db", FakeDatabase({"batch": {"_id": "batch", "status": batch_status}}))
+        return AnchoringService(blockchain=None)
+    return make
+
+def test_mined_root_is_verified(anchoring):
+    entry, record_id, data_hash = anchored_entry(root_block=42)
+    result = anchoring("confirmed").verify_entry(entry, "diagnosis", record_id, data_hash)
+    assert result["verified"] and result["proof_valid"]
+    assert result["anchor_status"] == "confirmed"
+    assert result["block_number"] == 42
+
+@pytest.mark.parametrize("batch_status, anchor_status", [
+    ("submitted", "submitted"),
+    ("confirmed", "submitted"),  # mined but not indexed yet
+    ("simulated", "simulated"),
+    ("failed", "failed")
+])
+def test_unmined_root_is_not_verified(anchoring, batch_status, anchor_status):
+    entry, record_id, data_hash = anchored_entry()
+    result = anchoring(batch_status).verify_entry(entry, "diagnosis", record_id, data_hash)
+    assert result["proof_valid"]
+    assert not result["verified"]
+    assert result["anchor_status"] == anchor_status
+
+def test_changed_record_fails_proof(anchoring):
+    entry, record_id, _ = anchored_entry(root_block=42)
+    result = anchoring("confirmed").verify_entry(entry, "diagnosis", record_id, "f" * 64)
+    assert not result["verified"] and not result["proof_valid"]
+
+def test_queued_leaf_is_pending(anchoring):
+    result = anchoring("submitted").verify_entry({"status": "batching"}, "diagnosis", "1", "ab")
+    assert result == {"verified": False, "anchor_status": "pending"}
+
+@pytest.mark.parametrize("entry, batch_status, expected", [
+    ({"status": "pending"}, None, {"status": "queued"}),
+    ({"status": "anchored", "transaction_hash": "0xabc", "root_block": 42}, "confirmed",
+     {"status": "confirmed", "transaction_hash": "0xabc", "block_number": 42}),
+    ({"status": "anchored", "transaction_hash": "0xabc"}, "submitted", {"status": "submitted", "transaction_hash": "0xabc"}),
+    ({"status": "anchored", "transaction_hash": "0xabc"}, "simulated", {"status": "simulated", "transaction_hash": "0xabc"}),
+    ({"status": "anchored", "transaction_hash": "0xabc"}, "failed", {"status": "queued"})
+])
+def test_queued_records_follow_their_leaf(anchoring, entry, batch_status, expected):
+    assert anchoring(batch_status).record_fields({"batch_id": "batch", **entry}) == expected
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from app.services import principal_cache as principal_cache_module
+from app.services.principal_cache import PrincipalCache
+
+USER_ID = str(ObjectId())
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length):
+        return self.documents
+
+
+class FakeUsers:
+    def __init__(self, user):
+        self.user = user
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        return dict(self.user) if query["_id"] == self.user["_id"] else None
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        self.user.update(update["$set"])
+        self.user["token_version"] = self.user.get("token_version", 0) + update["$inc"]["token_version"]
+        self.user["tokens_revoked_at"] = datetime.utcnow()
+        return dict(self.user)
+
+    def find(self, query, projection=None):
+        revoked_at = self.user.get("tokens_revoked_at")
+        return FakeCursor([dict(self.user)] if revoked_at and revoked_at > query["tokens_revoked_at"]["$gt"] else [])
+
+
+class FakeDatabase:
+    def __init__(self, user):
+        self.users = FakeUsers(user)
+
+    def users_collection(self):
+        return self.users
+
+
+def cache_with(monkeypatch, **user):
+    database = FakeDatabase({"_id": ObjectId(USER_ID), "email": "a@example.com", **user})
+    monkeypatch.setattr(principal_cache_module, "async_db", database)
+    return PrincipalCache(), database.users
+
+
+def test_current_version_is_served_from_the_cache(monkeypatch):
+    cache, users = cache_with(monkeypatch, token_version=2)
+    assert asyncio.run(cache.get(USER_ID, 2))["email"] == "a@example.com"
+    assert asyncio.run(cache.get(USER_ID, 2))["email"] == "a@example.com"
+    assert users.reads == 1
+
+def test_older_version_is_rejected(monkeypatch):
+    cache, users = cache_with(monkeypatch, token_version=2)
+    asyncio.run(cache.get(USER_ID, 2))
+    assert asyncio.run(cache.get(USER_ID, 1)) is None
+    assert users.reads == 1
+
+def test_token_version_is_not_part_of_the_profile(monkeypatch):
+    cache, _ = cache_with(monkeypatch, token_version=2)
+    assert "token_version" not in asyncio.run(cache.get(USER_ID, 2))
+
+def test_revoke_rejects_earlier_tokens(monkeypatch):
+    cache, users = cache_with(monkeypatch)
+    asyncio.run(cache.get(USER_ID))
+    assert asyncio.run(cache.revoke(USER_ID, {"hashed_password": "new"})) == 1
+    assert users.user["hashed_password"] == "new"
+    assert asyncio.run(cache.get(USER_ID, 0)) is None
+    assert asyncio.run(cache.get(USER_ID, 1)) is not None
+
+def test_revocation_by_another_process_is_applied(monkeypatch):
+    cache, users = cache_with(monkeypatch)
+    other_process = PrincipalCache()
+    cache.revocation_interval = 0
+    asyncio.run(cache.get(USER_ID))
+    asyncio.run(other_process.revoke(USER_ID))
+    assert asyncio.run(cache.get(USER_ID, 0)) is None
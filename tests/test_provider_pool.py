@@ -0,0 +1,151 @@
+import pytest
+import requests
+from web3 import Web3
+from app.services import provider_pool
+from app.services.provider_pool import ProviderEndpoint, ProviderPool
+
+URIS = ["http://rpc-a.test", "http://rpc-b.test", "http://rpc-c.test"]
+
+
+class StubProvider:
+    """Stands in for an endpoint's HTTPProvider; raises or answers eth_blockNumber"""
+
+    def __init__(self, block_number=100, error=None):
+        self.block_number = block_number
+        self.error = error
+        self.calls = []
+
+    def make_request(self, method, params):
+        self.calls.append(method)
+        if self.error:
+            raise self.error
+        return {"jsonrpc": "2.0", "id": 1, "result": hex(self.block_number)}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv("PROVIDER_EWMA_ALPHA", "0.5")
+    pool = ProviderPool(URIS)
+    for endpoint in pool.endpoints:
+        endpoint.provider = StubProvider()
+    yield pool
+    pool.close()
+
+def endpoint(pool, uri):
+    return next(e for e in pool.endpoints if e.uri == uri)
+
+def stub_batch_call(monkeypatch, answers):
+    """answers maps uri -> block number, or an exception to raise"""
+    def fake_batch_call(uri, calls, session=None, timeout=None):
+        answer = answers[uri]
+        if isinstance(answer, Exception):
+            raise answer
+        return [hex(answer) for _ in calls]
+    monkeypatch.setattr(provider_pool, "batch_call", fake_batch_call)
+
+
+# EWMA
+
+def test_first_sample_seeds_the_average():
+    endpoint = ProviderEndpoint(URIS[0], timeout=1, alpha=0.3)
+    endpoint.record_success(0.2)
+    assert endpoint.latency == pytest.approx(0.2)
+
+def test_later_samples_are_weighted_by_alpha():
+    endpoint = ProviderEndpoint(URIS[0], timeout=1, alpha=0.3)
+    for sample in (0.2, 0.5, 0.1):
+        endpoint.record_success(sample)
+    # 0.2 -> 0.3*0.5 + 0.7*0.2 = 0.29 -> 0.3*0.1 + 0.7*0.29 = 0.233
+    assert endpoint.latency == pytest.approx(0.233)
+
+def test_success_restores_a_failed_endpoint():
+    endpoint = ProviderEndpoint(URIS[0], timeout=1, alpha=0.3)
+    endpoint.record_failure()
+    endpoint.record_failure()
+    assert not endpoint.healthy and endpoint.errors == 2
+    endpoint.record_success(0.1)
+    assert endpoint.healthy and endpoint.errors == 0
+
+
+# Selection
+
+def test_healthy_endpoints_rank_by_latency_then_unmeasured_then_unhealthy(pool):
+    a, b, c = pool.endpoints
+    a.record_success(0.3)
+    b.record_success(0.1)
+    assert pool.ranked() == [b, a, c]
+    b.record_failure()
+    assert pool.ranked() == [a, c, b]
+
+def test_requests_go_to_the_fastest_endpoint(pool):
+    slow, fast, _ = pool.endpoints
+    slow.record_success(0.5)
+    fast.record_success(0.05)
+    assert pool.make_request("eth_blockNumber", [])["result"] == hex(100)
+    assert fast.provider.calls == ["eth_blockNumber"]
+    assert slow.provider.calls == []
+
+
+# Failover
+
+@pytest.mark.parametrize("error", [requests.ConnectionError("refused"), requests.Timeout("timed out")])
+def test_transport_errors_fail_over_to_the_next_endpoint(pool, error):
+    first, second, _ = pool.endpoints
+    first.record_success(0.01)
+    second.record_success(0.02)
+    first.provider.error = error
+
+    assert pool.make_request("eth_blockNumber", [])["result"] == hex(100)
+    assert second.provider.calls == ["eth_blockNumber"]
+    assert not first.healthy
+    assert pool.ranked()[-1] is first
+
+def test_all_endpoints_down_raises_the_last_error(pool):
+    for endpoint in pool.endpoints:
+        endpoint.provider.error = requests.ConnectionError(endpoint.uri)
+    with pytest.raises(requests.ConnectionError):
+        pool.make_request("eth_blockNumber", [])
+    assert not pool.is_connected()
+
+def test_json_rpc_errors_do_not_fail_over(pool):
+    first = pool.ranked()[0]
+    first.provider.make_request = lambda method, params: {"jsonrpc": "2.0", "id": 1, "error": {"code": 3}}
+    assert "error" in pool.make_request("eth_call", [])
+    assert first.healthy
+
+def test_batches_fail_over(pool, monkeypatch):
+    stub_batch_call(monkeypatch, {URIS[0]: requests.ConnectionError("refused"), URIS[1]: 120, URIS[2]: 120})
+    endpoint(pool, URIS[0]).record_success(0.01)
+    assert pool.batch([("eth_blockNumber", []), ("eth_blockNumber", [])]) == [hex(120), hex(120)]
+    assert not endpoint(pool, URIS[0]).healthy
+
+def test_web3_calls_route_through_the_pool(pool):
+    pool.endpoints[1].provider.error = requests.ConnectionError("refused")
+    pool.endpoints[1].record_success(0.001)
+    assert Web3(pool).eth.block_number == 100
+
+
+# Probes
+
+def test_probe_marks_lagging_and_failing_endpoints_unhealthy(pool, monkeypatch):
+    pool.max_block_lag = 5
+    stub_batch_call(monkeypatch, {URIS[0]: 200, URIS[1]: 190, URIS[2]: requests.Timeout("timed out")})
+    pool.probe()
+    assert [e.healthy for e in pool.endpoints] == [True, False, False]
+    assert [e.block_number for e in pool.endpoints[:2]] == [200, 190]
+    assert pool.ranked()[0].uri == URIS[0]
+
+def test_probe_within_lag_keeps_endpoints_healthy(pool, monkeypatch):
+    pool.max_block_lag = 5
+    stub_batch_call(monkeypatch, {URIS[0]: 200, URIS[1]: 196, URIS[2]: 200})
+    pool.probe()
+    assert all(e.healthy for e in pool.endpoints)
+    assert all(e.latency is not None for e in pool.endpoints)
+
+def test_probe_recovers_an_endpoint_that_caught_up(pool, monkeypatch):
+    stub_batch_call(monkeypatch, {URIS[0]: 200, URIS[1]: 100, URIS[2]: 200})
+    pool.probe()
+    assert not endpoint(pool, URIS[1]).healthy
+    stub_batch_call(monkeypatch, {URIS[0]: 201, URIS[1]: 201, URIS[2]: 201})
+    pool.probe()
+    assert endpoint(pool, URIS[1]).healthy
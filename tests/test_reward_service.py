@@ -0,0 +1,125 @@
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from bson.decimal128 import Decimal128
+from app.services import reward_service
+from app.services.confirmation_tracker import ConfirmationTracker
+from app.services.reward_service import SCALE, RewardService
+
+WALLET = "0x" + "ab" * 20
+SIGNER = "0x" + "cd" * 20
+
+
+class FakeCollection:
+    def __init__(self, documents=None):
+        self.documents = documents or []
+        self.updates = []
+
+    def find_one(self, query, projection=None):
+        for document in self.documents:
+            if all(self._get(document, field) == value for field, value in query.items()):
+                return document
+        return None
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+        document = self.find_one(query)
+        if document is not None:
+            document.update(update["$set"])
+
+    @staticmethod
+    def _get(document, path):
+        for key in path.split("."):
+            document = (document or {}).get(key)
+        return document
+
+
+class FakeDatabase:
+    def __init__(self, records=(), indexed_block=-1):
+        self.records = FakeCollection(list(records))
+        self.checkpoints = FakeCollection([{"_id": "contract_events", "last_block": indexed_block}])
+
+    def blockchain_records_collection(self):
+        return self.records
+
+    def indexer_checkpoints_collection(self):
+        return self.checkpoints
+
+
+def rewards_with(rpc_results=None, minted=0.0):
+    blockchain = SimpleNamespace(
+        account=SimpleNamespace(address=SIGNER),
+        block_tracker=SimpleNamespace(block_number=200),
+        rpc_batch=lambda calls: rpc_results,
+        get_token_state=lambda wallet: {"user_balance": minted}
+    )
+    blockchain.confirmations = ConfirmationTracker(blockchain)
+    return RewardService(blockchain)
+
+def mint_record(**fields):
+    return {
+        "_id": "record",
+        "transaction_hash": "0xnew",
+        "replaced_transaction_hashes": ["0xold"],
+        "status": "failed",
+        "metadata": {"settlement_id": "s1", "wallet_address": WALLET, "nonce": 4},
+        **fields
+    }
+
+def tokens(amount):
+    return Decimal128(Decimal(amount) * SCALE)
+
+
+# Failed mints
+
+def test_mined_replaced_hash_is_not_released(monkeypatch):
+    database = FakeDatabase([mint_record()])
+    monkeypatch.setattr(reward_service, "db", database)
+    receipt = {"blockNumber": hex(150), "gasUsed": "0x0", "status": "0x1"}
+    rewards = rewards_with([None, receipt, None, None, hex(5)])
+
+    assert not rewards._mint_unmined(database.records.documents[0])
+    record = database.records.documents[0]
+    assert record["status"] == "confirmed"
+    assert record["transaction_hash"] == "0xold"
+    assert record["block_number"] == 150
+
+def test_reverted_mint_is_released(monkeypatch):
+    monkeypatch.setattr(reward_service, "db", FakeDatabase())
+    receipt = {"blockNumber": hex(150), "gasUsed": "0x0", "status": "0x0"}
+    assert rewards_with([receipt, None, None, None, hex(5)])._mint_unmined(mint_record())
+
+def test_nonce_taken_by_another_transaction_is_released(monkeypatch):
+    monkeypatch.setattr(reward_service, "db", FakeDatabase())
+    assert rewards_with([None, None, None, None, hex(5)])._mint_unmined(mint_record())
+
+def test_unmined_nonce_is_not_released(monkeypatch):
+    # The mint is only slow: nothing at nonce 4 has been mined yet
+    monkeypatch.setattr(reward_service, "db", FakeDatabase())
+    assert not rewards_with([None, None, None, None, hex(4)])._mint_unmined(mint_record())
+
+def test_unknown_nonce_is_not_released(monkeypatch):
+    monkeypatch.setattr(reward_service, "db", FakeDatabase())
+    record = mint_record(metadata={"settlement_id": "s1", "wallet_address": WALLET})
+    assert not rewards_with([None, None, None, None, hex(9)])._mint_unmined(record)
+
+def test_nonce_is_read_from_the_node_when_not_stored(monkeypatch):
+    monkeypatch.setattr(reward_service, "db", FakeDatabase())
+    record = mint_record(metadata={"settlement_id": "s1", "wallet_address": WALLET})
+    assert rewards_with([None, None, None, {"nonce": hex(4)}, hex(9)])._mint_unmined(record)
+
+
+# Balances
+
+@pytest.mark.parametrize("status, block_number, indexed_block, expected", [
+    ("submitted", None, 100, 13.0),   # mint not mined: settling is still unsettled
+    ("confirmed", 150, 100, 13.0),    # mined but not indexed into the on-chain balance yet
+    ("confirmed", 90, 100, 3.0)       # indexed: settling is already in the minted balance
+])
+def test_settling_is_counted_once(monkeypatch, status, block_number, indexed_block, expected):
+    record = mint_record(status=status, block_number=block_number)
+    monkeypatch.setattr(reward_service, "db", FakeDatabase([record], indexed_block))
+    account = {"pending": tokens(3), "settling": tokens(10), "settlement_id": "s1"}
+    balances = rewards_with(minted=50.0)._balances(WALLET, account)
+    assert balances["unsettled_rewards"] == pytest.approx(expected)
+    assert balances["balance"] == pytest.approx(50.0 + expected)
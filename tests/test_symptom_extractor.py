@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from app.services.diagnosis_service import diagnosis_service
+from app.utils.symptom_extractor import symptom_extractor
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I have a productive cough", ["cough"]),                        # "cough" inside "productive cough"
+    ("short of breath and shortness of breath", ["shortness of breath"]),
+    ("chest tightness and chest pain", ["chest pain"]),
+    ("stomach ache and a headache", ["abdominal pain", "headache"]),
+    ("Feverish, dry cough", ["fever", "cough"])
+])
+def test_overlapping_matches_are_reported_once(text, expected):
+    assert symptom_extractor.extract(text) == expected
+
+def test_partial_words_do_not_match():
+    assert symptom_extractor.extract("bike crash yesterday") == []
+
+@pytest.mark.parametrize("text", [
+    "no fever",
+    "denies fever",
+    "patient doesn't have a fever",
+    "no cough or fever"
+])
+def test_negated_matches_are_skipped(text):
+    assert "fever" not in symptom_extractor.extract(text)
+
+def test_negation_stops_at_a_clause_break():
+    assert symptom_extractor.extract("no fever, cough") == ["cough"]
+    assert symptom_extractor.extract("no fever but a bad cough") == ["cough"]
+    assert symptom_extractor.extract("no fever. Headache since monday") == ["headache"]
+
+def test_negation_only_reaches_a_few_words_back():
+    assert symptom_extractor.extract("no sleep for two whole nights and now a fever") == ["fever"]
+
+def test_extract_all_merges_in_order_of_first_mention():
+    assert symptom_extractor.extract_all(["headache", "fever and headache", None]) == ["headache", "fever"]
+
+
+def test_rules_fall_back_to_raw_symptoms(monkeypatch):
+    monkeypatch.setattr(diagnosis_service, "huggingface_api_key", None)
+    monkeypatch.setattr(symptom_extractor, "extract_all", lambda symptoms: [])
+    diagnosis = asyncio.run(diagnosis_service.generate_diagnosis({"symptoms": [" Rash "]}))
+    assert diagnosis["diagnosis"] in ("Allergic Reaction", "Eczema", "Psoriasis")
+    assert diagnosis["extracted_symptoms"] == []
@@ -0,0 +1,380 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from eth_account import Account
+from app.services import confirmation_tracker, transaction_pipeline
+from app.services.confirmation_tracker import ConfirmationTracker
+from app.services.transaction_pipeline import GasPriceStrategy, NonceManager, TransactionPipeline
+
+SIGNER_KEY = "0x" + "11" * 32
+CONTRACT = "0x" + "22" * 20
+
+
+class FakeCollection:
+    """The subset of a pymongo collection the pipeline and tracker use"""
+
+    def __init__(self, documents=None):
+        self.documents = documents or []
+
+    @staticmethod
+    def _matches(document, query):
+        for field, condition in query.items():
+            value = document.get(field)
+            if not isinstance(condition, dict):
+                if value != condition:
+                    return False
+                continue
+            for operator, operand in condition.items():
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$lt" and not (value is not None and value < operand):
+                    return False
+        return True
+
+    def find(self, query, projection=None):
+        return [dict(d) for d in self.documents if self._matches(d, query)]
+
+    def update_many(self, query, update):
+        for document in self.documents:
+            if not self._matches(document, query):
+                continue
+            document.update(update.get("$set", {}))
+            for field, value in update.get("$addToSet", {}).items():
+                values = document.setdefault(field, [])
+                if value not in values:
+                    values.append(value)
+
+    def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.update_many(request._filter, request._doc)
+
+
+class FakeDatabase:
+    def __init__(self, records=None, batches=None, leaves=None):
+        self.records = FakeCollection(records)
+        self.batches = FakeCollection(batches)
+        self.leaves = FakeCollection(leaves)
+
+    def blockchain_records_collection(self):
+        return self.records
+
+    def anchor_batches_collection(self):
+        return self.batches
+
+    def anchor_leaves_collection(self):
+        return self.leaves
+
+
+class FakeEth:
+    def __init__(self, pending_nonce=0):
+        self.pending_nonce = pending_nonce
+        self.mined_nonce = pending_nonce
+        self.gas_price = 10
+        self.sent = []
+        self.count_calls = 0
+
+    def get_transaction_count(self, address, block_identifier):
+        self.count_calls += 1
+        return self.pending_nonce if block_identifier == "pending" else self.mined_nonce
+
+    def send_raw_transaction(self, raw):
+        self.sent.append(raw)
+
+
+class FakeContractFunction:
+    def __init__(self, error=None):
+        self.error = error
+
+    def build_transaction(self, params):
+        if self.error:
+            raise self.error
+        return {**params, "to": CONTRACT, "data": "0x1234"}
+
+
+class RecordingAccount:
+    """A real local signer that remembers what it signed"""
+
+    def __init__(self):
+        self._account = Account.from_key(SIGNER_KEY)
+        self.address = self._account.address
+        self.signed = []
+
+    def sign_transaction(self, transaction):
+        self.signed.append(transaction)
+        return self._account.sign_transaction(transaction)
+
+
+def fake_blockchain(pending_nonce=0, base_fee=100):
+    return SimpleNamespace(
+        web3=SimpleNamespace(eth=FakeEth(pending_nonce)),
+        account=RecordingAccount(),
+        chain_id=1337,
+        block_tracker=SimpleNamespace(base_fee=base_fee, gas_price=None, block_number=0)
+    )
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(transaction_pipeline, "db", database)
+    monkeypatch.setattr(confirmation_tracker, "db", database)
+    return database
+
+
+@pytest.fixture
+def pipeline(fake_db):
+    return TransactionPipeline(fake_blockchain(pending_nonce=7))
+
+
+# Nonces
+
+def test_nonces_are_seeded_once_then_counted_locally():
+    eth = FakeEth(pending_nonce=5)
+    nonces = NonceManager(SimpleNamespace(eth=eth), "0xsigner")
+    assert [nonces.next() for _ in range(3)] == [5, 6, 7]
+    assert eth.count_calls == 1
+
+def test_only_the_latest_nonce_can_be_released():
+    nonces = NonceManager(SimpleNamespace(eth=FakeEth(pending_nonce=5)), "0xsigner")
+    first, second = nonces.next(), nonces.next()
+    assert not nonces.release(first)
+    assert nonces.release(second)
+    assert nonces.next() == second
+
+def test_resync_rereads_the_node():
+    eth = FakeEth(pending_nonce=5)
+    nonces = NonceManager(SimpleNamespace(eth=eth), "0xsigner")
+    nonces.next()
+    eth.pending_nonce = 9
+    nonces.resync()
+    assert nonces.next() == 9
+
+
+# Fees
+
+def test_eip1559_fees_leave_base_fee_headroom():
+    fees = GasPriceStrategy(fake_blockchain(base_fee=100)).fees()
+    assert fees["maxPriorityFeePerGas"] > 0
+    assert fees["maxFeePerGas"] == 200 + fees["maxPriorityFeePerGas"]
+
+def test_legacy_fees_without_base_fee():
+    assert set(GasPriceStrategy(fake_blockchain(base_fee=None)).fees()) == {"gasPrice"}
+
+def test_bump_strictly_raises_every_fee():
+    fees = {"maxFeePerGas": 1000, "maxPriorityFeePerGas": 8}
+    bumped = GasPriceStrategy.bump(fees, 1.125)
+    assert all(bumped[key] > fees[key] * 1.1 for key in fees)
+
+
+# Submission
+
+def test_submit_signs_consecutive_nonces(pipeline):
+    first = pipeline.submit(FakeContractFunction())
+    second = pipeline.submit(FakeContractFunction())
+    assert first != second
+    assert sorted(pipeline._in_flight) == [7, 8]
+    assert pipeline._in_flight[7]["hash"] == first
+    assert pipeline._in_flight[8]["transaction"]["nonce"] == 8
+
+def test_failed_build_gives_the_nonce_back(pipeline):
+    with pytest.raises(ValueError):
+        pipeline.submit(FakeContractFunction(error=ValueError("execution reverted")))
+    pipeline.submit(FakeContractFunction())
+    assert list(pipeline._in_flight) == [7]
+    assert pipeline.blockchain.web3.eth.sent == []
+
+def test_cancel_fills_the_nonce_with_a_self_transfer(pipeline):
+    pipeline.submit(FakeContractFunction())
+    fees = pipeline._in_flight[7]["fees"]
+    pipeline._cancel(7, pipeline._in_flight[7])
+
+    cancel = pipeline.blockchain.account.signed[-1]
+    assert cancel["nonce"] == 7
+    assert cancel["to"] == cancel["from"] == pipeline.blockchain.account.address
+    assert cancel["value"] == 0
+    assert all(cancel[key] > fees[key] for key in fees)
+    assert len(pipeline.blockchain.web3.eth.sent) == 1
+    assert 7 not in pipeline._in_flight
+
+def test_failed_build_behind_a_later_nonce_is_cancelled(pipeline, monkeypatch):
+    cancelled = []
+    monkeypatch.setattr(pipeline, "_cancel", lambda nonce, entry: cancelled.append(nonce))
+    original_next = pipeline.nonces.next
+
+    def next_and_race():
+        nonce = original_next()
+        original_next()  # another submit takes the following nonce before this one signs
+        return nonce
+
+    monkeypatch.setattr(pipeline.nonces, "next", next_and_race)
+    with pytest.raises(ValueError):
+        pipeline.submit(FakeContractFunction(error=ValueError("boom")))
+    assert cancelled == [7]
+
+
+# Replacement
+
+def test_stuck_transaction_is_replaced_at_the_same_nonce(pipeline, fake_db):
+    pipeline.replace_after = 0
+    old_hash = pipeline.submit(FakeContractFunction())
+    fake_db.records.documents.append({"transaction_hash": old_hash, "status": "submitted"})
+    old_fees = pipeline._in_flight[7]["fees"]
+
+    pipeline._replace_stuck()
+
+    entry = pipeline._in_flight[7]
+    assert entry["hash"] != old_hash
+    assert entry["replacements"] == 1
+    assert entry["transaction"]["nonce"] == 7
+    assert all(entry["fees"][key] > old_fees[key] for key in old_fees)
+    record = fake_db.records.documents[0]
+    assert record["transaction_hash"] == entry["hash"]
+    assert record["replaced_transaction_hashes"] == [old_hash]
+
+def test_mined_nonces_are_not_replaced(pipeline):
+    pipeline.replace_after = 0
+    pipeline.submit(FakeContractFunction())
+    pipeline.blockchain.web3.eth.mined_nonce = 8
+    pipeline._replace_stuck()
+    assert pipeline._in_flight == {}
+
+def test_replacements_stop_at_the_limit(pipeline):
+    pipeline.replace_after = 0
+    pipeline.max_replacements = 2
+    pipeline.submit(FakeContractFunction())
+    for _ in range(4):
+        pipeline._replace_stuck()
+    assert pipeline._in_flight[7]["replacements"] == 2
+
+def reject_with(pipeline, message):
+    def reject(raw):
+        raise ValueError(message)
+    pipeline.blockchain.web3.eth.send_raw_transaction = reject
+
+def test_nonce_too_low_leaves_the_outcome_to_the_tracker(pipeline, fake_db):
+    pipeline.replace_after = 0
+    old_hash = pipeline.submit(FakeContractFunction())
+    fake_db.records.documents.append({"transaction_hash": old_hash, "status": "submitted"})
+    pipeline._replace_stuck()  # the original is mined before its replacement goes out
+    new_hash = pipeline._in_flight[7]["hash"]
+
+    reject_with(pipeline, "nonce too low")
+    pipeline._broadcast(7, pipeline._in_flight[7])
+
+    assert 7 not in pipeline._in_flight
+    record = fake_db.records.documents[0]
+    assert record["status"] == "submitted"
+    assert record["transaction_hash"] == new_hash
+    assert record["replaced_transaction_hashes"] == [old_hash]
+
+def test_resync_never_reuses_a_nonce_in_flight(pipeline):
+    for _ in range(3):
+        pipeline.submit(FakeContractFunction())  # nonces 7, 8, 9
+    eth = pipeline.blockchain.web3.eth
+    eth.pending_nonce = 8  # the node has only seen nonce 7 so far
+
+    reject_with(pipeline, "nonce too low")
+    pipeline._broadcast(7, pipeline._in_flight[7])
+
+    assert sorted(pipeline._in_flight) == [8, 9]
+    assert pipeline.nonces.next() == 10
+
+def test_resync_follows_a_node_that_is_ahead(pipeline):
+    pipeline.submit(FakeContractFunction())
+    pipeline.blockchain.web3.eth.pending_nonce = 20  # nonces used by another sender
+    reject_with(pipeline, "nonce too low")
+    pipeline._broadcast(7, pipeline._in_flight[7])
+    assert pipeline.nonces.next() == 20
+
+def test_underpriced_replacement_stays_in_flight(pipeline, fake_db):
+    pipeline.replace_after = 0
+    pipeline.submit(FakeContractFunction())
+    pipeline._replace_stuck()
+    reject_with(pipeline, "replacement transaction underpriced")
+
+    pipeline._broadcast(7, pipeline._in_flight[7])
+
+    assert pipeline._in_flight[7]["replacements"] == 1
+    assert pipeline.blockchain.account.signed[-1]["to"] == CONTRACT  # no cancel was sent
+
+def test_failed_replacement_broadcast_is_not_cancelled(pipeline, monkeypatch):
+    monkeypatch.setattr(transaction_pipeline.time, "sleep", lambda seconds: None)
+    pipeline.replace_after = 0
+    pipeline.submit(FakeContractFunction())
+    pipeline._replace_stuck()
+    reject_with(pipeline, "connection reset")
+
+    pipeline._broadcast(7, pipeline._in_flight[7])
+
+    assert 7 in pipeline._in_flight
+    assert pipeline.blockchain.account.signed[-1]["to"] == CONTRACT
+
+def test_failed_first_broadcast_is_failed_and_cancelled(pipeline, fake_db, monkeypatch):
+    monkeypatch.setattr(transaction_pipeline.time, "sleep", lambda seconds: None)
+    tx_hash = pipeline.submit(FakeContractFunction())
+    fake_db.records.documents.append({"transaction_hash": tx_hash, "status": "submitted"})
+    reject_with(pipeline, "connection reset")
+
+    pipeline._broadcast(7, pipeline._in_flight[7])
+
+    assert fake_db.records.documents[0]["status"] == "failed"
+    assert pipeline.blockchain.account.signed[-1]["to"] == pipeline.blockchain.account.address
+    assert 7 not in pipeline._in_flight
+
+
+# Confirmation of replaced transactions
+
+def receipt(block_number, status=1):
+    return {"blockNumber": hex(block_number), "gasUsed": hex(21_000), "status": hex(status)}
+
+def tracker_with(receipts, block_number=110):
+    blockchain = SimpleNamespace(
+        block_tracker=SimpleNamespace(block_number=block_number),
+        rpc_batch=lambda calls: [receipts.get(params[0]) for _, params in calls],
+        transaction_watcher=SimpleNamespace(notify=lambda: None)
+    )
+    return ConfirmationTracker(blockchain)
+
+def test_mined_original_wins_over_its_replacement(fake_db):
+    fake_db.records.documents.append({
+        "transaction_hash": "0xnew", "replaced_transaction_hashes": ["0xold"], "status": "submitted"
+    })
+    fake_db.leaves.documents.append({"transaction_hash": "0xnew"})
+
+    pending = tracker_with({"0xold": receipt(100)}).reconcile()
+
+    record = fake_db.records.documents[0]
+    assert pending == 0
+    assert record["transaction_hash"] == "0xold"
+    assert record["status"] == "confirmed"
+    assert record["block_number"] == 100
+    assert fake_db.leaves.documents[0]["transaction_hash"] == "0xold"
+
+def test_mined_replacement_is_confirmed(fake_db):
+    fake_db.batches.documents.append({
+        "transaction_hash": "0xnew", "replaced_transaction_hashes": ["0xold"], "status": "submitted"
+    })
+    tracker_with({"0xnew": receipt(100)}).reconcile()
+    batch = fake_db.batches.documents[0]
+    assert batch["transaction_hash"] == "0xnew"
+    assert batch["status"] == "confirmed"
+
+def test_unmined_transactions_stay_pending_until_dropped(fake_db):
+    now = datetime.utcnow()
+    fake_db.records.documents.extend([
+        {"transaction_hash": "0xrecent", "status": "submitted", "created_at": now},
+        {"transaction_hash": "0xstale", "status": "submitted", "created_at": now - timedelta(days=1)}
+    ])
+    assert tracker_with({}).reconcile() == 2
+    recent, stale = fake_db.records.documents
+    assert recent["status"] == "submitted"
+    assert stale["status"] == "failed" and stale["error"] == "dropped"
+
+def test_shallow_receipt_is_not_yet_confirmed(fake_db):
+    fake_db.records.documents.append({"transaction_hash": "0xtx", "status": "submitted"})
+    assert tracker_with({"0xtx": receipt(110)}).reconcile() == 1
+    record = fake_db.records.documents[0]
+    assert record["status"] == "submitted"
+    assert record["confirmations"] == 1